@@ -1,34 +1,511 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Depends, Header
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring, ReadPreference, ReplaceOne, ReturnDocument, UpdateOne, UpdateMany
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 import os
+import abc
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Type, Callable, Awaitable
 import uuid
+import hashlib
+import json
+import zlib
+import time
+import threading
+import asyncio
+import math
+import heapq
+import random
+from collections import deque, OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from datetime import datetime, timezone, timedelta
-import httpx
+from email.utils import format_datetime, parsedate_to_datetime
+import jwt
 import socketio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# ============ Metrics ============
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+class MetricsRegistry:
+    """In-process counters, gauges and histograms rendered in Prometheus text format.
+
+    Values are per worker process; Motor listener callbacks run on executor
+    threads, hence the lock.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.descriptions: Dict[str, Tuple[str, str]] = {}
+        self.counters: Dict[str, Dict[Tuple, float]] = {}
+        self.gauges: Dict[str, Dict[Tuple, float]] = {}
+        self.histograms: Dict[str, Dict[Tuple, List[float]]] = {}
+        self.buckets: Dict[str, Tuple[float, ...]] = {}
+    
+    def counter(self, name: str, help_text: str):
+        self.descriptions[name] = ("counter", help_text)
+        self.counters[name] = {}
+    
+    def gauge(self, name: str, help_text: str):
+        self.descriptions[name] = ("gauge", help_text)
+        self.gauges[name] = {}
+    
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.descriptions[name] = ("histogram", help_text)
+        self.histograms[name] = {}
+        self.buckets[name] = buckets
+    
+    def inc(self, name: str, labels: Optional[Dict[str, str]] = None, value: float = 1.0):
+        key = tuple(sorted((labels or {}).items()))
+        with self.lock:
+            series = self.counters[name] if name in self.counters else self.gauges[name]
+            series[key] = series.get(key, 0.0) + value
+    
+    def set(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        key = tuple(sorted((labels or {}).items()))
+        with self.lock:
+            self.gauges[name][key] = value
+    
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        key = tuple(sorted((labels or {}).items()))
+        buckets = self.buckets[name]
+        with self.lock:
+            # [count per bucket..., +Inf count, sum]
+            state = self.histograms[name].setdefault(key, [0.0] * (len(buckets) + 2))
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += 1
+            state[-1] += value
+    
+    def value(self, name: str, labels: Optional[Dict[str, str]] = None) -> float:
+        key = tuple(sorted((labels or {}).items()))
+        series = self.counters.get(name) or self.gauges.get(name) or {}
+        return series.get(key, 0.0)
+    
+    @staticmethod
+    def format_labels(key: Tuple, extra: Optional[Tuple] = None) -> str:
+        items = list(key) + ([extra] if extra else [])
+        if not items:
+            return ""
+        escaped = []
+        for k, v in items:
+            v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            escaped.append(f'{k}="{v}"')
+        return "{" + ",".join(escaped) + "}"
+    
+    def render(self) -> str:
+        lines = []
+        with self.lock:
+            for name, (kind, help_text) in self.descriptions.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "histogram":
+                    for key, state in self.histograms[name].items():
+                        # Bucket counts are stored cumulatively by observe()
+                        for i, bound in enumerate(self.buckets[name]):
+                            lines.append(f"{name}_bucket{self.format_labels(key, ('le', repr(float(bound))))} {state[i]:g}")
+                        lines.append(f"{name}_bucket{self.format_labels(key, ('le', '+Inf'))} {state[-2]:g}")
+                        lines.append(f"{name}_sum{self.format_labels(key)} {state[-1]:g}")
+                        lines.append(f"{name}_count{self.format_labels(key)} {state[-2]:g}")
+                else:
+                    series = self.counters[name] if kind == "counter" else self.gauges[name]
+                    for key, value in series.items():
+                        lines.append(f"{name}{self.format_labels(key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+metrics.counter("http_requests_total", "HTTP requests by method, route and status")
+metrics.histogram("http_request_duration_seconds", "HTTP request latency by method and route")
+metrics.gauge("http_requests_in_flight", "HTTP requests currently being served")
+metrics.histogram("http_request_mongo_commands", "MongoDB commands issued per HTTP request", COUNT_BUCKETS)
+metrics.histogram("http_request_mongo_seconds", "Time spent in MongoDB per HTTP request")
+metrics.counter("mongo_commands_total", "MongoDB commands by collection and operation")
+metrics.counter("mongo_command_failures_total", "Failed MongoDB commands by collection and operation")
+metrics.histogram("mongo_command_duration_seconds", "MongoDB command latency by collection and operation")
+
+# Per-request accumulator for DB calls; Motor copies the context onto its executor threads
+request_db_stats: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_db_stats", default=None)
+
+# ============ Slow Query Profiling ============
+
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "false").lower() == "true"
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "100"))
+PROFILING_EXPLAIN = os.environ.get("PROFILING_EXPLAIN", "false").lower() == "true"
+
+metrics.counter("mongo_slow_commands_total", "MongoDB commands slower than SLOW_QUERY_MS")
+
+# Where each command keeps the filter it runs
+FILTER_FIELDS = {
+    "find": "filter",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+}
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct"}
+
+def query_shape(value: Any) -> Any:
+    """Strip literal values from a filter, keeping field names and operators"""
+    if isinstance(value, dict):
+        return {k: query_shape(v) for k, v in value.items()}
+    if isinstance(value, list):
+        shapes = [query_shape(v) for v in value if isinstance(v, (dict, list))]
+        return shapes or ["?"]
+    return "?"
+
+def command_filter(command: Dict[str, Any], command_name: str) -> Any:
+    """Extract the filter (or $match stages) a command runs"""
+    if command_name in FILTER_FIELDS:
+        return command.get(FILTER_FIELDS[command_name], {})
+    if command_name == "aggregate":
+        return [stage["$match"] for stage in command.get("pipeline", []) if "$match" in stage]
+    if command_name == "update":
+        return [u.get("q", {}) for u in command.get("updates", [])[:1]]
+    if command_name == "delete":
+        return [d.get("q", {}) for d in command.get("deletes", [])[:1]]
+    return {}
+
+def summarize_plan(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce explain() output to plan stages and execution counters"""
+    summary: Dict[str, Any] = {"stages": [], "docs_examined": None, "keys_examined": None, "returned": None}
+    
+    def walk_plan(plan: Dict[str, Any]):
+        if "stage" in plan:
+            summary["stages"].append(plan["stage"])
+        for child in [plan.get("inputStage")] + plan.get("inputStages", []):
+            if isinstance(child, dict):
+                walk_plan(child)
+    
+    def find(node: Any):
+        if isinstance(node, dict):
+            if "queryPlanner" in node and not summary["stages"]:
+                # Slot-based engine nests the classic plan tree under queryPlan
+                winning = node["queryPlanner"].get("winningPlan", {})
+                walk_plan(winning.get("queryPlan", winning))
+            if "executionStats" in node and summary["docs_examined"] is None:
+                stats = node["executionStats"]
+                summary["docs_examined"] = stats.get("totalDocsExamined")
+                summary["keys_examined"] = stats.get("totalKeysExamined")
+                summary["returned"] = stats.get("nReturned")
+            for child in node.values():
+                find(child)
+        elif isinstance(node, list):
+            for child in node:
+                find(child)
+    
+    find(explain)
+    summary["collscan"] = "COLLSCAN" in summary["stages"]
+    return summary
+
+class SlowQueryLog:
+    """Aggregate slow MongoDB commands by collection, operation, filter shape and endpoint"""
+    
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, explain: bool = PROFILING_EXPLAIN, max_entries: int = 500):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries: Dict[Tuple[str, str, str, str], Dict[str, Any]] = {}
+        self.recent: deque = deque(maxlen=100)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def record(self, collection: str, command_name: str, command: Dict[str, Any], endpoint: str, duration_ms: float):
+        shape = json.dumps(query_shape(command_filter(command, command_name)), sort_keys=True)
+        key = (collection, command_name, shape, endpoint)
+        now = datetime.now(timezone.utc)
+        
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                if len(self.entries) >= self.max_entries:
+                    return
+                entry = self.entries[key] = {
+                    "collection": collection,
+                    "command": command_name,
+                    "filter_shape": json.loads(shape),
+                    "endpoint": endpoint,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "last_seen": now,
+                    "plan": None
+                }
+                needs_explain = self.explain and command_name in EXPLAINABLE_COMMANDS
+            else:
+                needs_explain = False
+            
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            entry["last_seen"] = now
+            self.recent.append({"collection": collection, "command": command_name, "endpoint": endpoint, "duration_ms": round(duration_ms, 2), "at": now})
+        
+        metrics.inc("mongo_slow_commands_total", {"collection": collection, "command": command_name})
+        logger.warning(f"Slow query {duration_ms:.1f}ms {collection}.{command_name} {shape} from {endpoint}")
+        
+        if needs_explain and self.loop is not None:
+            # Listener callbacks run on Motor's executor threads; explain on the event loop
+            asyncio.run_coroutine_threadsafe(self.capture_plan(key, command), self.loop)
+    
+    async def capture_plan(self, key: Tuple[str, str, str, str], command: Dict[str, Any]):
+        explainable = {k: v for k, v in command.items() if not k.startswith("$") and k not in ("lsid", "txnNumber", "readConcern")}
+        try:
+            explain = await db.command({"explain": explainable, "verbosity": "executionStats"})
+        except Exception as e:
+            logger.error(f"Failed to explain slow query on {key[0]}: {e}")
+            return
+        
+        with self.lock:
+            if key in self.entries:
+                self.entries[key]["plan"] = summarize_plan(explain)
+    
+    def report(self) -> Dict[str, Any]:
+        with self.lock:
+            entries = sorted(self.entries.values(), key=lambda e: e["total_ms"], reverse=True)
+            return {
+                "threshold_ms": self.threshold_ms,
+                "explain": self.explain,
+                "queries": [{**e, "avg_ms": round(e["total_ms"] / e["count"], 2), "total_ms": round(e["total_ms"], 2), "max_ms": round(e["max_ms"], 2)} for e in entries],
+                "recent": list(self.recent)
+            }
+    
+    def reset(self):
+        with self.lock:
+            self.entries.clear()
+            self.recent.clear()
+
+slow_query_log = SlowQueryLog()
+
+class CommandMonitor(monitoring.CommandListener):
+    """Record every MongoDB command into `metrics` and the current request's DB stats"""
+    
+    def __init__(self):
+        self.inflight: Dict[Tuple[Any, int], Tuple[str, Optional[Dict[str, Any]]]] = {}
+    
+    def started(self, event):
+        collection = event.command.get("collection" if event.command_name == "getMore" else event.command_name)
+        if not isinstance(collection, str):
+            collection = "admin"
+        # Only keep a copy of the command when it may be needed for the slow query log
+        command = dict(event.command) if PROFILING_ENABLED and event.command_name != "explain" else None
+        self.inflight[(event.connection_id, event.request_id)] = (collection, command)
+    
+    def succeeded(self, event):
+        self.finish(event, failed=False)
+    
+    def failed(self, event):
+        self.finish(event, failed=True)
+    
+    def finish(self, event, failed: bool):
+        collection, command = self.inflight.pop((event.connection_id, event.request_id), ("unknown", None))
+        duration = event.duration_micros / 1_000_000
+        labels = {"collection": collection, "command": event.command_name}
+        
+        metrics.inc("mongo_commands_total", labels)
+        metrics.observe("mongo_command_duration_seconds", duration, labels)
+        if failed:
+            metrics.inc("mongo_command_failures_total", labels)
+        
+        stats = request_db_stats.get()
+        if stats is not None:
+            stats["count"] += 1
+            stats["duration"] += duration
+        
+        if command is not None and duration * 1000 >= slow_query_log.threshold_ms:
+            scope = stats.get("scope") if stats else None
+            route = scope.get("route") if scope else None
+            endpoint = f"{scope['method']} {getattr(route, 'path', scope['path'])}" if scope else "background"
+            slow_query_log.record(collection, event.command_name, command, endpoint, duration * 1000)
+
+command_monitor = CommandMonitor()
+
+# ============ Connection Pool ============
+
+# Driver defaults queue forever for a connection and wait 30s to find a server; fail
+# fast instead so a saturated pool shows up as errors and wait time, not hung requests
+MONGO_CLIENT_OPTIONS = {
+    "maxPoolSize": int(os.environ.get("MONGO_MAX_POOL_SIZE", "100")),
+    "minPoolSize": int(os.environ.get("MONGO_MIN_POOL_SIZE", "0")),
+    "maxIdleTimeMS": int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", "300000")),
+    "waitQueueTimeoutMS": int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+    "serverSelectionTimeoutMS": int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+    "connectTimeoutMS": int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", "10000")),
+    "socketTimeoutMS": int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", "30000")),
+}
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+# Public listings tolerate replication lag; everything else reads from the primary
+LISTING_READ_PREFERENCE = READ_PREFERENCES[os.environ.get("MONGO_LISTING_READ_PREFERENCE", "secondaryPreferred")]
+
+metrics.gauge("mongo_pool_connections", "Open MongoDB connections by server and state (open, in_use)")
+metrics.gauge("mongo_pool_waiting", "Operations waiting for a pooled connection by server")
+metrics.histogram("mongo_pool_wait_seconds", "Time spent waiting to check out a pooled connection")
+metrics.counter("mongo_pool_checkout_failures_total", "Connection checkouts that failed by reason")
+metrics.counter("mongo_pool_cleared_total", "Connection pools cleared after a server error by server")
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Track per-server pool occupancy and checkout wait times for /health and `metrics`"""
+    
+    def __init__(self, window: int = 1000):
+        self.lock = threading.Lock()
+        self.pools: Dict[str, Dict[str, int]] = {}
+        self.waits: deque = deque(maxlen=window)
+        # Checkout start and finish happen on the same executor thread
+        self.local = threading.local()
+    
+    def pool(self, address) -> Dict[str, int]:
+        server = f"{address[0]}:{address[1]}"
+        return self.pools.setdefault(server, {"open": 0, "in_use": 0, "waiting": 0, "cleared": 0})
+    
+    def update(self, address, **deltas: int):
+        server = f"{address[0]}:{address[1]}"
+        with self.lock:
+            pool = self.pool(address)
+            for field, delta in deltas.items():
+                pool[field] += delta
+            snapshot = dict(pool)
+        metrics.set("mongo_pool_connections", snapshot["open"], {"server": server, "state": "open"})
+        metrics.set("mongo_pool_connections", snapshot["in_use"], {"server": server, "state": "in_use"})
+        metrics.set("mongo_pool_waiting", snapshot["waiting"], {"server": server})
+    
+    def finish_wait(self, address, **deltas: int):
+        started = getattr(self.local, "started", None)
+        self.local.started = None
+        if started is not None:
+            wait = time.perf_counter() - started
+            metrics.observe("mongo_pool_wait_seconds", wait)
+            with self.lock:
+                self.waits.append(wait)
+        self.update(address, waiting=-1, **deltas)
+    
+    def pool_created(self, event):
+        self.update(event.address)
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        metrics.inc("mongo_pool_cleared_total", {"server": f"{event.address[0]}:{event.address[1]}"})
+        self.update(event.address, cleared=1)
+    
+    def pool_closed(self, event):
+        with self.lock:
+            self.pools.pop(f"{event.address[0]}:{event.address[1]}", None)
+    
+    def connection_created(self, event):
+        self.update(event.address, open=1)
+    
+    def connection_ready(self, event):
+        pass
+    
+    def connection_closed(self, event):
+        self.update(event.address, open=-1)
+    
+    def connection_check_out_started(self, event):
+        self.local.started = time.perf_counter()
+        self.update(event.address, waiting=1)
+    
+    def connection_check_out_failed(self, event):
+        metrics.inc("mongo_pool_checkout_failures_total", {"reason": str(event.reason)})
+        self.finish_wait(event.address)
+    
+    def connection_checked_out(self, event):
+        self.finish_wait(event.address, in_use=1)
+    
+    def connection_checked_in(self, event):
+        self.update(event.address, in_use=-1)
+    
+    def report(self) -> Dict[str, Any]:
+        with self.lock:
+            pools = {server: dict(pool) for server, pool in self.pools.items()}
+            waits = list(self.waits)
+        
+        max_pool_size = MONGO_CLIENT_OPTIONS["maxPoolSize"]
+        for pool in pools.values():
+            pool["utilization"] = round(pool["in_use"] / max_pool_size, 3) if max_pool_size else 0.0
+        
+        ordered = sorted(waits)
+        def wait_ms(pct: float) -> float:
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))] * 1000, 3)
+        
+        return {
+            "max_pool_size": max_pool_size,
+            "servers": pools,
+            "wait_ms": {"samples": len(ordered), "p50": wait_ms(50), "p95": wait_ms(95), "max": wait_ms(100)}
+        }
+
+pool_monitor = PoolMonitor()
+
+# MongoDB connection, created when the app starts (see connect_database)
+client = None
+db = None
+# Read-only listing endpoints query through this handle
+db_read = None
+
+def connect_database():
+    """Create the Motor client; motor is imported here so it stays off the import path"""
+    global client, db, db_read
+    if db is not None:
+        return
+    
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(
+        os.environ['MONGO_URL'],
+        event_listeners=[command_monitor, pool_monitor],
+        **MONGO_CLIENT_OPTIONS
+    )
+    db = client[os.environ['DB_NAME']]
+    db_read = client.get_database(os.environ['DB_NAME'], read_preference=LISTING_READ_PREFERENCE)
 
 # Socket.IO setup
 sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
 
-# Create the main app
-app = FastAPI()
+class DeferredRouter(APIRouter):
+    """Record route declarations and build them once, directly on the app, in create_app.
+
+    A plain APIRouter builds each route when it is declared and include_router
+    builds it again on the app, which doubles the largest cost of importing server.py.
+    """
+    
+    def __init__(self, prefix: str = ""):
+        super().__init__(prefix=prefix)
+        self.pending: List[Tuple[str, Callable, Dict[str, Any]]] = []
+    
+    def add_api_route(self, path: str, endpoint: Callable, **kwargs):
+        self.pending.append((path, endpoint, kwargs))
+    
+    def install(self, app: FastAPI):
+        for path, endpoint, kwargs in self.pending:
+            app.router.add_api_route(self.prefix + path, endpoint, **kwargs)
 
 # Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+api_router = DeferredRouter(prefix="/api")
+# Operational endpoints served outside /api
+root_router = DeferredRouter()
 
 # Configure logging
 logging.basicConfig(
@@ -87,6 +564,22 @@ class Job(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+class JobCard(BaseModel):
+    """Compact job shape for list views (no description/requirements)"""
+    job_id: str
+    employer_id: str
+    employer_name: str
+    title: str
+    job_type: str
+    salary_type: List[str]
+    salary_min: Optional[float] = None
+    salary_max: Optional[float] = None
+    salary_negotiable: bool = False
+    city: str
+    area: str
+    status: str = "active"
+    created_at: datetime
+
 class JobCreate(BaseModel):
     title: str
     description: str
@@ -101,113 +594,1635 @@ class JobCreate(BaseModel):
     longitude: Optional[float] = None
     requirements: Optional[str] = None
 
-class Application(BaseModel):
-    application_id: str
-    job_id: str
-    job_title: str
-    job_seeker_id: str
-    job_seeker_name: str
-    job_seeker_email: str
-    employer_id: str
-    cover_letter: Optional[str] = None
-    status: str = "pending"  # "pending", "accepted", "rejected"
-    created_at: datetime
+class Application(BaseModel):
+    application_id: str
+    job_id: str
+    job_title: str
+    job_seeker_id: str
+    job_seeker_name: str
+    job_seeker_email: str
+    employer_id: str
+    cover_letter: Optional[str] = None
+    status: str = "pending"  # "pending", "accepted", "rejected"
+    created_at: datetime
+    updated_at: Optional[datetime] = None  # Creation or last status change; missing on older applications
+
+class ApplicationCreate(BaseModel):
+    job_id: str
+    cover_letter: Optional[str] = None
+
+class Message(BaseModel):
+    message_id: str
+    sender_id: str
+    receiver_id: str
+    sender_name: str
+    content: str
+    read: bool = False
+    created_at: datetime
+
+class MessageCreate(BaseModel):
+    receiver_id: str
+    content: str
+
+class Review(BaseModel):
+    review_id: str
+    reviewer_id: str
+    reviewed_id: str
+    reviewer_name: str
+    rating: int  # 1-5
+    comment: Optional[str] = None
+    created_at: datetime
+
+class ReviewCreate(BaseModel):
+    reviewed_id: str
+    rating: int
+    comment: Optional[str] = None
+
+class PublicPost(BaseModel):
+    post_id: str
+    user_id: str
+    user_name: str
+    user_type: str
+    picture: Optional[str] = None
+    profession: Optional[str] = None
+    phone: Optional[str] = None
+    email: str
+    city: Optional[str] = None
+    area: Optional[str] = None
+    skills: Optional[List[str]] = []
+    experience_years: Optional[int] = None
+    bio: Optional[str] = None
+    status: str = "active"  # "active", "inactive"
+    created_at: datetime
+    updated_at: datetime
+
+class PublicPostCard(BaseModel):
+    """Compact public post shape for feed cards (no bio/contact details)"""
+    post_id: str
+    user_id: str
+    user_name: str
+    user_type: str
+    picture: Optional[str] = None
+    profession: Optional[str] = None
+    city: Optional[str] = None
+    area: Optional[str] = None
+    experience_years: Optional[int] = None
+    updated_at: datetime
+
+class Advertisement(BaseModel):
+    ad_id: str
+    title: str
+    description: Optional[str] = None
+    image_base64: Optional[str] = None  # Legacy inline image; uploads fill `images` instead
+    images: Optional[Dict[str, str]] = None  # Variant name ("thumb", "feed", "full") -> URL
+    link_url: Optional[str] = None
+    location: str  # "home", "feed", "jobs", "all"
+    priority: int = 0  # Higher number = higher priority
+    status: str = "active"  # "active", "inactive"
+    daily_budget: Optional[int] = None  # Max impressions per UTC day, paced evenly
+    frequency_cap: Optional[int] = None  # Max impressions per viewer per window (default AD_FREQUENCY_CAP)
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    created_by: str
+    created_at: datetime
+    updated_at: datetime
+
+class AdvertisementCard(BaseModel):
+    """Compact advertisement shape for list views (variant URLs, no inline image payload)"""
+    ad_id: str
+    title: str
+    images: Optional[Dict[str, str]] = None
+    link_url: Optional[str] = None
+    location: str
+    priority: int = 0
+
+class ServedAdvertisement(BaseModel):
+    """Ad as displayed: variant URLs, or the legacy inline image for ads without them"""
+    ad_id: str
+    title: str
+    description: Optional[str] = None
+    images: Optional[Dict[str, str]] = None
+    image_base64: Optional[str] = None
+    link_url: Optional[str] = None
+    location: str
+
+class AdvertisementCreate(BaseModel):
+    title: str
+    description: Optional[str] = None
+    image_base64: Optional[str] = None  # Prefer POST /ads/{ad_id}/image
+    link_url: Optional[str] = None
+    location: str = "all"
+    priority: int = 0
+    daily_budget: Optional[int] = None
+    frequency_cap: Optional[int] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+class AdvertisementUpdate(BaseModel):
+    title: Optional[str] = None
+    description: Optional[str] = None
+    image_base64: Optional[str] = None
+    link_url: Optional[str] = None
+    location: Optional[str] = None
+    priority: Optional[int] = None
+    status: Optional[str] = None
+    daily_budget: Optional[int] = None
+    frequency_cap: Optional[int] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+class AdEvent(BaseModel):
+    ad_id: str
+    event: str  # "click" (impressions are recorded by /ads/serve)
+    at: Optional[datetime] = None  # When the client saw it; defaults to receipt time
+
+class AdEventBatch(BaseModel):
+    events: List[AdEvent]
+
+class SessionData(BaseModel):
+    user_id: str
+    email: str
+    name: str
+    picture: Optional[str] = None
+    session_token: str
+
+# ============ Field Projection ============
+
+def resolve_projection(
+    model: Type[BaseModel],
+    card_model: Type[BaseModel],
+    key_field: str,
+    fields: Optional[str] = None,
+    view: str = "full"
+) -> Tuple[Dict[str, int], Optional[Type[BaseModel]]]:
+    """Translate `fields=` / `view=` query params into a MongoDB projection and response model.
+
+    An explicit `fields` list wins over `view` and returns plain dicts (the key field
+    is always included); `view=card` and `view=full` map to the matching models.
+    """
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in model.model_fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        
+        if key_field not in requested:
+            requested.insert(0, key_field)
+        
+        return {"_id": 0, **{f: 1 for f in requested}}, None
+    
+    if view == "card":
+        return {"_id": 0, **{f: 1 for f in card_model.model_fields}}, card_model
+    
+    if view == "full":
+        return {"_id": 0}, model
+    
+    raise HTTPException(status_code=400, detail="view must be 'card' or 'full'")
+
+def project_documents(docs: List[Dict[str, Any]], model: Optional[Type[BaseModel]]) -> List[Any]:
+    """Wrap projected documents in their response model (plain dicts for sparse fieldsets)"""
+    if model is None:
+        return docs
+    return [model(**doc) for doc in docs]
+
+# ============ HTTP Caching ============
+
+# Cache-Control policy per cacheable route
+CACHE_CONTROL = {
+    "job": "public, max-age=60",
+    "user": "public, max-age=60",
+    "ad": "public, max-age=300",
+    "review_stats": "public, max-age=120",
+    "professions": "public, max-age=600",
+}
+
+def make_etag(*parts: Any) -> str:
+    """Build a weak ETag from version parts (id + updated_at) or a whole document"""
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+    return f'W/"{digest[:24]}"'
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against the current representation"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Weak comparison: W/"x" matches "x"
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    
+    return False
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    policy: str,
+    etag: str,
+    last_modified: Optional[datetime] = None
+) -> Optional[Response]:
+    """Return a 304 if the client copy is current, otherwise stamp caching headers on `response`"""
+    if last_modified and last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL[policy]}
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    
+    response.headers.update(headers)
+    return None
+
+# ============ Request Coalescing ============
+
+metrics.counter("singleflight_calls_total", "Single-flight reads by namespace and role (leader or coalesced)")
+
+class SingleFlight:
+    """Share one in-flight load between concurrent callers asking for the same key.
+
+    The first caller starts the load as a task; callers arriving before it finishes
+    await the same task. Results are shared, so callers must not mutate them.
+    """
+    
+    def __init__(self):
+        self.inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+    
+    async def do(self, namespace: str, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        flight_key = (namespace, key)
+        task = self.inflight.get(flight_key)
+        
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self.inflight[flight_key] = task
+            task.add_done_callback(lambda t: self.finish(flight_key, t))
+            metrics.inc("singleflight_calls_total", {"namespace": namespace, "role": "leader"})
+        else:
+            metrics.inc("singleflight_calls_total", {"namespace": namespace, "role": "coalesced"})
+        
+        # Shield so one caller disconnecting doesn't cancel the load for everyone else
+        return await asyncio.shield(task)
+    
+    def finish(self, flight_key: Tuple[str, str], task: asyncio.Future):
+        if self.inflight.get(flight_key) is task:
+            del self.inflight[flight_key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter went away
+            task.exception()
+
+single_flight = SingleFlight()
+
+# ============ Write-Behind Queue ============
+
+WRITE_BEHIND_INTERVAL = float(os.environ.get("WRITE_BEHIND_INTERVAL_MS", "250")) / 1000
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get("WRITE_BEHIND_MAX_PENDING", "500"))
+
+metrics.counter("write_behind_enqueued_total", "Writes handed to the write-behind queue by collection")
+metrics.counter("write_behind_coalesced_total", "Queued writes merged into an already pending write by collection")
+metrics.counter("write_behind_flushed_total", "Write operations flushed with bulk_write by collection")
+metrics.counter("write_behind_flush_failures_total", "Failed bulk_write flushes by collection")
+
+class PeriodicFlusher(abc.ABC):
+    """Background loop calling `flush` every `interval`, early when `wakeup` is set, and once more on stop"""
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.wakeup = asyncio.Event()
+        self.stopping = False
+        self.task: Optional[asyncio.Task] = None
+    
+    @abc.abstractmethod
+    def has_pending(self) -> bool:
+        """Whether there is anything for `flush` to write"""
+    
+    @abc.abstractmethod
+    async def flush(self):
+        """Write everything pending; on cancellation, keep what was not written for the next flush"""
+    
+    async def run(self):
+        while not self.stopping:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            if self.has_pending() and not self.stopping:
+                await self.flush()
+    
+    def start(self):
+        if self.task is None:
+            self.stopping = False
+            self.task = asyncio.create_task(self.run())
+    
+    async def stop(self):
+        if self.task is not None:
+            # Let an in-flight flush finish instead of cancelling it, then drain what's left
+            self.stopping = True
+            self.wakeup.set()
+            await self.task
+            self.task = None
+        await self.flush()
+
+class WriteBehindQueue(PeriodicFlusher):
+    """Coalesce idempotent `$set` updates per key and flush them with bulk_write.
+
+    Writes are flushed every WRITE_BEHIND_INTERVAL or as soon as
+    WRITE_BEHIND_MAX_PENDING keys are waiting, and once more on shutdown.
+    A later write for the same key replaces the pending filter and merges its fields.
+    """
+    
+    def __init__(self, interval: float = WRITE_BEHIND_INTERVAL, max_pending: int = WRITE_BEHIND_MAX_PENDING):
+        super().__init__(interval)
+        self.max_pending = max_pending
+        self.pending: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.size = 0
+    
+    def enqueue(
+        self,
+        collection: str,
+        key: str,
+        filter: Dict[str, Any],
+        fields: Dict[str, Any],
+        many: bool = False,
+        upsert: bool = False,
+        set_on_insert: Optional[Dict[str, Any]] = None
+    ):
+        entries = self.pending.setdefault(collection, {})
+        entry = entries.get(key)
+        metrics.inc("write_behind_enqueued_total", {"collection": collection})
+        
+        if entry:
+            entry["filter"] = filter
+            entry["set"].update(fields)
+            metrics.inc("write_behind_coalesced_total", {"collection": collection})
+            return
+        
+        entries[key] = {
+            "filter": filter,
+            "set": dict(fields),
+            "many": many,
+            "upsert": upsert,
+            "set_on_insert": set_on_insert
+        }
+        self.size += 1
+        if self.size >= self.max_pending:
+            self.wakeup.set()
+    
+    def build_operation(self, entry: Dict[str, Any]):
+        update: Dict[str, Any] = {"$set": entry["set"]}
+        if entry["set_on_insert"]:
+            update["$setOnInsert"] = entry["set_on_insert"]
+        if entry["many"]:
+            return UpdateMany(entry["filter"], update, upsert=entry["upsert"])
+        return UpdateOne(entry["filter"], update, upsert=entry["upsert"])
+    
+    def requeue(self, collection: str, entries: Dict[str, Dict[str, Any]]):
+        """Put entries back for the next flush unless a newer write for the key superseded them"""
+        pending = self.pending.setdefault(collection, {})
+        for key, entry in entries.items():
+            if key not in pending:
+                pending[key] = entry
+                self.size += 1
+    
+    async def flush(self):
+        pending, self.pending, self.size = self.pending, {}, 0
+        remaining = list(pending.items())
+        
+        while remaining:
+            collection, entries = remaining[0]
+            operations = [self.build_operation(entry) for entry in entries.values()]
+            try:
+                await db[collection].bulk_write(operations, ordered=False)
+                metrics.inc("write_behind_flushed_total", {"collection": collection}, len(operations))
+            except asyncio.CancelledError:
+                # Cancelled mid-write: `$set`s are idempotent, so keep everything not known to be written
+                for collection, entries in remaining:
+                    self.requeue(collection, entries)
+                raise
+            except Exception as e:
+                logger.error(f"Write-behind flush to {collection} failed: {e}")
+                metrics.inc("write_behind_flush_failures_total", {"collection": collection})
+                self.requeue(collection, entries)
+            remaining.pop(0)
+    
+    def has_pending(self) -> bool:
+        return self.size > 0
+
+write_behind = WriteBehindQueue()
+
+# ============ Cache Invalidation ============
+
+# "auto" tails change streams and drops to polling when the deployment can't serve them
+# (standalone mongod); "local" only delivers invalidations published by this process
+INVALIDATION_SOURCE = os.environ.get("INVALIDATION_SOURCE", "auto")
+INVALIDATION_POLL_SECONDS = float(os.environ.get("INVALIDATION_POLL_SECONDS", "2"))
+INVALIDATION_CHECKPOINT_SECONDS = 1.0
+
+# collection -> (key field, field polling watches for changes)
+INVALIDATION_COLLECTIONS = {
+    "users": ("user_id", "updated_at"),
+    "jobs": ("job_id", "updated_at"),
+    "advertisements": ("ad_id", "updated_at"),
+}
+
+# Top-level fields whose updates never affect cached data (maintained counters)
+INVALIDATION_IGNORED_FIELDS = {"jobs": {"application_counts"}}
+
+# Server errors meaning change streams are unsupported here rather than temporarily failing
+CHANGE_STREAM_UNSUPPORTED = {40573, 40324, 136}
+CHANGE_STREAM_HISTORY_LOST = 286
+
+metrics.counter("cache_invalidations_total", "Invalidations dispatched to registered caches by collection and origin")
+metrics.gauge("invalidation_source_info", "Active invalidation source (1 for the one in use)")
+
+class InvalidationBus:
+    """Fan out per-collection / per-key invalidations to the in-process caches that registered for them.
+
+    A key of None means "anything in the collection may have changed" and is sent when
+    events were lost or can't be attributed to a key (e.g. deletes seen by a change stream).
+    """
+    
+    def __init__(self):
+        self.handlers: Dict[str, List[Callable[[Optional[str]], None]]] = {}
+        self.source: Optional[Any] = None
+    
+    def subscribe(self, collection: str, handler: Callable[[Optional[str]], None]):
+        self.handlers.setdefault(collection, []).append(handler)
+    
+    def publish(self, collection: str, key: Optional[str] = None, origin: str = "local"):
+        metrics.inc("cache_invalidations_total", {"collection": collection, "origin": origin})
+        for handler in self.handlers.get(collection, []):
+            try:
+                handler(key)
+            except Exception as e:
+                logger.error(f"Invalidation handler failed for {collection}/{key}: {e}")
+    
+    def publish_all(self, origin: str):
+        for collection in INVALIDATION_COLLECTIONS:
+            self.publish(collection, None, origin)
+    
+    def use(self, source):
+        self.source = source
+        for name in ("local", "change_stream", "polling"):
+            metrics.set("invalidation_source_info", 1 if name == source.name else 0, {"source": name})
+        source.start()
+    
+    async def start(self):
+        if self.source is not None:
+            return
+        if INVALIDATION_SOURCE == "local":
+            self.use(LocalInvalidationSource())
+        elif INVALIDATION_SOURCE == "polling":
+            self.use(PollingInvalidationSource(self))
+        else:
+            self.use(ChangeStreamInvalidationSource(self))
+    
+    async def stop(self):
+        if self.source is not None:
+            await self.source.stop()
+            self.source = None
+
+class LocalInvalidationSource:
+    """Single-process deployments and tests: only local publish() calls are delivered"""
+    
+    name = "local"
+    
+    def start(self):
+        pass
+    
+    async def stop(self):
+        pass
+
+class BackgroundInvalidationSource(abc.ABC):
+    """Runs a tailing loop as a task and checkpoints its position in invalidation_state"""
+    
+    name = ""
+    
+    def __init__(self, bus: InvalidationBus):
+        self.bus = bus
+        self.task: Optional[asyncio.Task] = None
+        self.last_checkpoint = 0.0
+    
+    async def load_state(self) -> Dict[str, Any]:
+        try:
+            return await db.invalidation_state.find_one({"_id": self.name}) or {}
+        except Exception as e:
+            logger.error(f"Failed to load {self.name} invalidation state: {e}")
+            return {}
+    
+    async def checkpoint(self, state: Dict[str, Any], force: bool = False):
+        now = time.monotonic()
+        if not force and now - self.last_checkpoint < INVALIDATION_CHECKPOINT_SECONDS:
+            return
+        self.last_checkpoint = now
+        try:
+            await db.invalidation_state.update_one(
+                {"_id": self.name},
+                {"$set": {**state, "updated_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"Failed to checkpoint {self.name} invalidation state: {e}")
+    
+    @abc.abstractmethod
+    async def run(self):
+        """Tail the source and dispatch changes until cancelled"""
+    
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+    
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self.task = None
+
+class ChangeStreamInvalidationSource(BackgroundInvalidationSource):
+    """One database-level change stream over the watched collections, resumed from the persisted token"""
+    
+    name = "change_stream"
+    
+    async def run(self):
+        state = await self.load_state()
+        token = state.get("resume_token")
+        pipeline = [
+            {"$match": {"ns.coll": {"$in": list(INVALIDATION_COLLECTIONS)}}},
+            {"$project": {"operationType": 1, "ns": 1, "documentKey": 1, "updateDescription": 1, **{
+                f"fullDocument.{key_field}": 1 for key_field, _ in INVALIDATION_COLLECTIONS.values()
+            }}}
+        ]
+        
+        while True:
+            try:
+                async with db.watch(pipeline, full_document="updateLookup", resume_after=token) as stream:
+                    logger.info(f"Tailing change stream (resumed: {token is not None})")
+                    async for change in stream:
+                        self.dispatch(change)
+                        token = stream.resume_token
+                        await self.checkpoint({"resume_token": token})
+            except asyncio.CancelledError:
+                if token is not None:
+                    await self.checkpoint({"resume_token": token}, force=True)
+                raise
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED:
+                    logger.warning(f"Change streams unavailable ({e}); falling back to polling")
+                    self.task = None
+                    self.bus.use(PollingInvalidationSource(self.bus))
+                    return
+                if e.code == CHANGE_STREAM_HISTORY_LOST:
+                    # The oplog rolled past our token; start fresh and drop everything cached
+                    logger.warning("Change stream resume token expired; invalidating all caches")
+                    token = None
+                    self.bus.publish_all(self.name)
+                    await self.checkpoint({"resume_token": None}, force=True)
+                    continue
+                logger.error(f"Change stream failed: {e}")
+            except Exception as e:
+                logger.error(f"Change stream failed: {e}")
+            await asyncio.sleep(1)
+    
+    def dispatch(self, change: Dict[str, Any]):
+        collection = change["ns"]["coll"]
+        key_field = INVALIDATION_COLLECTIONS[collection][0]
+        if change["operationType"] in ("drop", "rename", "dropDatabase", "invalidate"):
+            self.bus.publish(collection, None, self.name)
+            return
+        description = change.get("updateDescription") or {}
+        ignored = INVALIDATION_IGNORED_FIELDS.get(collection)
+        if ignored and description.get("updatedFields") and not description.get("removedFields"):
+            if all(field.split(".")[0] in ignored for field in description["updatedFields"]):
+                return
+        # Deletes (and updates whose document is already gone) only carry the _id
+        key = (change.get("fullDocument") or {}).get(key_field)
+        self.bus.publish(collection, key, self.name)
+
+def as_utc(value: datetime) -> datetime:
+    # The client isn't tz_aware, so stored datetimes come back naive (UTC)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+class PollingInvalidationSource(BackgroundInvalidationSource):
+    """Standalone deployments: re-read documents whose change field moved since the last poll.
+
+    Deletes are not visible to polling; only the deleting worker invalidates them.
+    """
+    
+    name = "polling"
+    
+    async def run(self):
+        state = await self.load_state()
+        now = datetime.now(timezone.utc)
+        since = {
+            collection: as_utc(state[collection]) if state.get(collection) else now
+            for collection in INVALIDATION_COLLECTIONS
+        }
+        # Keys already seen at exactly `since`: $gte catches same-millisecond writes without repeating these
+        boundary: Dict[str, set] = {collection: set() for collection in INVALIDATION_COLLECTIONS}
+        
+        while True:
+            try:
+                for collection, (key_field, change_field) in INVALIDATION_COLLECTIONS.items():
+                    docs = await db[collection].find(
+                        {change_field: {"$gte": since[collection]}},
+                        {"_id": 0, key_field: 1, change_field: 1}
+                    ).sort(change_field, 1).limit(1000).to_list(1000)
+                    for doc in docs:
+                        changed_at, key = as_utc(doc[change_field]), doc.get(key_field)
+                        if changed_at == since[collection] and key in boundary[collection]:
+                            continue
+                        self.bus.publish(collection, key, self.name)
+                        if changed_at > since[collection]:
+                            since[collection], boundary[collection] = changed_at, set()
+                        boundary[collection].add(key)
+                await self.checkpoint(since)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Invalidation polling failed: {e}")
+            await asyncio.sleep(INVALIDATION_POLL_SECONDS)
+
+invalidation_bus = InvalidationBus()
+
+# ============ Read-Through Cache ============
+
+CACHE_ENABLED = os.environ.get("CACHE_ENABLED", "true").lower() == "true"
+# "memory": per-worker LRU only; "mongo": LRU in front of a cache_entries collection shared by all workers
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "10000"))
+PROFILE_CACHE_TTL = float(os.environ.get("PROFILE_CACHE_TTL_SECONDS", "60"))
+FEED_CACHE_TTL = float(os.environ.get("FEED_CACHE_TTL_SECONDS", "30"))
+# Only the first pages of the public feed are hot enough to be worth caching
+FEED_CACHE_MAX_SKIP = int(os.environ.get("FEED_CACHE_MAX_SKIP", "100"))
+
+metrics.counter("cache_requests_total", "Cache lookups by cache, tier and result (hit, miss, bypass)")
+metrics.gauge("cache_hit_ratio", "Fraction of lookups served from any cache tier since start, by cache")
+metrics.gauge("cache_entries", "Entries held in the in-process cache tier by cache")
+
+class MongoCacheBackend:
+    """Shared tier: entries in cache_entries, expired by a TTL index (and checked on read, the TTL monitor lags)"""
+    
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        doc = await db.cache_entries.find_one(
+            {"_id": f"{namespace}:{key}", "expires_at": {"$gt": datetime.now(timezone.utc)}}
+        )
+        return doc["value"] if doc else None
+    
+    async def set(self, namespace: str, key: str, value: Any, ttl: float):
+        await db.cache_entries.replace_one(
+            {"_id": f"{namespace}:{key}"},
+            {"namespace": namespace, "value": value, "expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl)},
+            upsert=True
+        )
+    
+    async def delete(self, namespace: str, key: Optional[str]):
+        if key is None:
+            await db.cache_entries.delete_many({"namespace": namespace})
+        else:
+            await db.cache_entries.delete_one({"_id": f"{namespace}:{key}"})
+
+class TieredCache:
+    """In-process LRU (with TTL) in front of an optional shared backend; misses load through single_flight.
+
+    Writers call invalidate() after changing the source data, which clears this
+    worker's LRU and the shared tier; other workers drop their LRU entries when the
+    change reaches them on invalidation_bus. None results are not cached.
+    """
+    
+    def __init__(self, namespace: str, ttl: float, max_entries: int = CACHE_MAX_ENTRIES,
+                 shared: Optional[MongoCacheBackend] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.shared = shared
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.lookups = 0
+    
+    def record(self, tier: str, result: str):
+        self.lookups += 1
+        if result == "hit":
+            self.hits += 1
+        metrics.inc("cache_requests_total", {"cache": self.namespace, "tier": tier, "result": result})
+        metrics.set("cache_hit_ratio", self.hits / self.lookups, {"cache": self.namespace})
+    
+    def store_local(self, key: str, value: Any):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        metrics.set("cache_entries", len(self.entries), {"cache": self.namespace})
+    
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        if not CACHE_ENABLED:
+            return await single_flight.do(self.namespace, key, loader)
+        
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.entries.move_to_end(key)
+            self.record("local", "hit")
+            return entry[1]
+        
+        if self.shared is not None:
+            try:
+                value = await self.shared.get(self.namespace, key)
+            except Exception as e:
+                logger.error(f"Shared cache read failed for {self.namespace}:{key}: {e}")
+                value = None
+            if value is not None:
+                self.store_local(key, value)
+                self.record("shared", "hit")
+                return value
+        
+        self.record("local" if self.shared is None else "shared", "miss")
+        value = await single_flight.do(self.namespace, key, loader)
+        if value is not None:
+            self.store_local(key, value)
+            if self.shared is not None:
+                try:
+                    await self.shared.set(self.namespace, key, value, self.ttl)
+                except Exception as e:
+                    logger.error(f"Shared cache write failed for {self.namespace}:{key}: {e}")
+        return value
+    
+    def drop_local(self, key: Optional[str] = None):
+        """Invalidation bus handler: forget one key, or everything when key is None"""
+        if key is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(key, None)
+        metrics.set("cache_entries", len(self.entries), {"cache": self.namespace})
+    
+    async def invalidate(self, key: Optional[str] = None):
+        """Write-through invalidation of this worker's LRU and the shared tier"""
+        self.drop_local(key)
+        if self.shared is not None:
+            try:
+                await self.shared.delete(self.namespace, key)
+            except Exception as e:
+                logger.error(f"Shared cache invalidation failed for {self.namespace}:{key}: {e}")
+
+shared_cache = MongoCacheBackend() if CACHE_BACKEND == "mongo" else None
+
+# Public profiles by user_id
+profile_cache = TieredCache("profile", PROFILE_CACHE_TTL, shared=shared_cache)
+invalidation_bus.subscribe("users", profile_cache.drop_local)
+
+# First pages of the public feed by filter combination; any post change drops them all
+feed_cache = TieredCache("feed", FEED_CACHE_TTL, max_entries=1000, shared=shared_cache)
+INVALIDATION_COLLECTIONS["public_posts"] = ("user_id", "updated_at")
+invalidation_bus.subscribe("public_posts", lambda key: feed_cache.drop_local())
+
+# ============ Job Feed Snapshots ============
+
+FEED_SNAPSHOT_SIZE = int(os.environ.get("FEED_SNAPSHOT_SIZE", "200"))
+FEED_SNAPSHOT_MAX_BUCKETS = int(os.environ.get("FEED_SNAPSHOT_MAX_BUCKETS", "256"))
+# Rebuild from the database now and then in case an invalidation was missed
+FEED_SNAPSHOT_MAX_AGE = float(os.environ.get("FEED_SNAPSHOT_MAX_AGE_SECONDS", "300"))
+REGEX_METACHARACTERS = set(".^$*+?{}[]\\|()")
+
+def as_stored(value: Any) -> Any:
+    """A value as a read would return it: datetimes naive UTC at BSON's millisecond precision"""
+    if isinstance(value, datetime) and value.tzinfo:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+class FeedBucket:
+    """Newest active jobs for one (city, job_type) filter, newest first"""
+    
+    def __init__(self, city: Optional[str], job_type: Optional[str], docs: List[Dict[str, Any]]):
+        self.city = city
+        self.job_type = job_type
+        self.docs = docs
+        # Fewer matches than the snapshot size exist, so the bucket holds all of them
+        self.exhaustive = len(docs) < FEED_SNAPSHOT_SIZE
+        self.built_at = time.monotonic()
+    
+    def matches(self, job: Dict[str, Any]) -> bool:
+        # Same semantics as get_jobs: exact job_type, case-insensitive substring city
+        if job.get("status") != "active":
+            return False
+        if self.job_type and job.get("job_type") != self.job_type:
+            return False
+        return not self.city or self.city in (job.get("city") or "").lower()
+    
+    def apply(self, job: Dict[str, Any]):
+        self.docs = [doc for doc in self.docs if doc["job_id"] != job["job_id"]]
+        if not self.matches(job):
+            return
+        
+        created_at = as_utc(job["created_at"])
+        index = next((i for i, doc in enumerate(self.docs) if as_utc(doc["created_at"]) < created_at), len(self.docs))
+        # Past the end of a partial snapshot the job's real position is unknown
+        if index == len(self.docs) and not self.exhaustive:
+            return
+        
+        self.docs.insert(index, job)
+        if len(self.docs) > FEED_SNAPSHOT_SIZE:
+            self.docs.pop()
+            self.exhaustive = False
+    
+    def remove(self, job_id: str):
+        self.docs = [doc for doc in self.docs if doc["job_id"] != job_id]
+
+class JobFeedSnapshots:
+    """Materialized first pages of /api/jobs per (city, job_type), kept current incrementally.
+
+    Buckets are built on first request and updated in place when create_job or
+    update_job_status touch a job, or when another worker's change arrives on
+    invalidation_bus. Pages beyond the snapshot, other filters and regex cities
+    fall through to the indexed query.
+    """
+    
+    def __init__(self):
+        self.buckets: OrderedDict = OrderedDict()
+        # Bumped on every change so a build racing a write doesn't store a stale snapshot
+        self.version = 0
+    
+    async def page(self, city: Optional[str], job_type: Optional[str], skip: int, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Jobs for this page from the snapshot, or None when the caller must query"""
+        servable = (
+            limit > 0 and skip >= 0 and skip + limit <= FEED_SNAPSHOT_SIZE
+            and not (city and REGEX_METACHARACTERS.intersection(city))
+        )
+        if not servable:
+            metrics.inc("cache_requests_total", {"cache": "job_feed", "tier": "snapshot", "result": "bypass"})
+            return None
+        
+        key = ((city or "").lower() or None, job_type or None)
+        bucket = self.buckets.get(key)
+        if bucket is None or time.monotonic() - bucket.built_at > FEED_SNAPSHOT_MAX_AGE:
+            metrics.inc("cache_requests_total", {"cache": "job_feed", "tier": "snapshot", "result": "miss"})
+            bucket = await single_flight.do("job_feed", repr(key), lambda: self.build(*key))
+        else:
+            metrics.inc("cache_requests_total", {"cache": "job_feed", "tier": "snapshot", "result": "hit"})
+            self.buckets.move_to_end(key)
+        
+        if skip + limit > len(bucket.docs) and not bucket.exhaustive:
+            # Removals shrank the snapshot below this page; rebuild on the next request
+            self.buckets.pop(key, None)
+            return None
+        
+        return bucket.docs[skip:skip + limit]
+    
+    async def build(self, city: Optional[str], job_type: Optional[str]) -> FeedBucket:
+        version = self.version
+        query: Dict[str, Any] = {"status": "active"}
+        if job_type:
+            query["job_type"] = job_type
+        if city:
+            query["city"] = {"$regex": city, "$options": "i"}
+        
+        docs = await db_read.jobs.find(query, {"_id": 0}).sort("created_at", -1).limit(FEED_SNAPSHOT_SIZE).to_list(FEED_SNAPSHOT_SIZE)
+        bucket = FeedBucket(city, job_type, docs)
+        
+        if version == self.version:
+            self.buckets[(city, job_type)] = bucket
+            if len(self.buckets) > FEED_SNAPSHOT_MAX_BUCKETS:
+                self.buckets.popitem(last=False)
+        return bucket
+    
+    def apply(self, job: Dict[str, Any]):
+        """Fold a created or changed job (full document) into every bucket"""
+        self.version += 1
+        job = {k: as_stored(v) for k, v in job.items() if k != "_id"}
+        for bucket in self.buckets.values():
+            bucket.apply(job)
+    
+    def on_invalidation(self, job_id: Optional[str]):
+        self.version += 1
+        if job_id is None:
+            self.buckets.clear()
+        else:
+            asyncio.ensure_future(self.refresh(job_id))
+    
+    async def refresh(self, job_id: str):
+        try:
+            job = await db.jobs.find_one({"job_id": job_id}, {"_id": 0})
+        except Exception as e:
+            logger.error(f"Failed to refresh job feed snapshots for {job_id}: {e}")
+            self.buckets.clear()
+            return
+        
+        if job:
+            self.apply(job)
+        else:
+            self.version += 1
+            for bucket in self.buckets.values():
+                bucket.remove(job_id)
+
+job_feed = JobFeedSnapshots()
+invalidation_bus.subscribe("jobs", job_feed.on_invalidation)
+
+# ============ Background Tasks ============
+
+TASK_WORKERS = int(os.environ.get("TASK_WORKERS", "4"))
+TASK_POLL_SECONDS = float(os.environ.get("TASK_POLL_SECONDS", "1"))
+# A task still "running" past its lease is assumed orphaned (worker died) and is claimed again
+TASK_LEASE = timedelta(seconds=int(os.environ.get("TASK_LEASE_SECONDS", "300")))
+TASK_RETRY_BASE_SECONDS = float(os.environ.get("TASK_RETRY_BASE_SECONDS", "5"))
+TASK_RETENTION = timedelta(days=7)
+
+metrics.counter("background_tasks_total", "Background task runs by task and outcome (done, retry, failed)")
+metrics.counter("background_tasks_enqueued_total", "Background tasks enqueued by task (deduplicated enqueues are not counted)")
+metrics.histogram("background_task_duration_seconds", "Background task run time by task")
+
+class TaskQueue:
+    """Durable follow-up work run off the request path.
+
+    Tasks are rows in background_tasks claimed atomically by a pool of in-process
+    workers, highest priority first. Failures retry with exponential backoff up to
+    the task's max_attempts; a pending task with the same dedup_key absorbs repeat
+    enqueues; each task type runs at most `concurrency` at a time per process.
+    """
+    
+    def __init__(self, workers: int = TASK_WORKERS):
+        self.workers = workers
+        self.worker_id = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.handlers: Dict[str, Callable[..., Awaitable[Any]]] = {}
+        self.options: Dict[str, Dict[str, int]] = {}
+        self.running: Dict[str, int] = {}
+        self.wakeup = asyncio.Event()
+        self.tasks: List[asyncio.Task] = []
+    
+    def task(self, name: Optional[str] = None, concurrency: int = 1, max_attempts: int = 5, priority: int = 0):
+        """Register a coroutine function as a task type; enqueue it by name with keyword payload"""
+        def register(func: Callable[..., Awaitable[Any]]):
+            task_name = name or func.__name__
+            self.handlers[task_name] = func
+            self.options[task_name] = {"concurrency": concurrency, "max_attempts": max_attempts, "priority": priority}
+            self.running[task_name] = 0
+            return func
+        return register
+    
+    async def enqueue(
+        self,
+        name: str,
+        payload: Optional[Dict[str, Any]] = None,
+        priority: Optional[int] = None,
+        delay: float = 0,
+        dedup_key: Optional[str] = None
+    ) -> Optional[str]:
+        """Queue a task; returns its id, or None when a pending task with the same dedup_key exists"""
+        now = datetime.now(timezone.utc)
+        task_id = f"task_{uuid.uuid4().hex[:12]}"
+        doc = {
+            "task_id": task_id,
+            "name": name,
+            "payload": payload or {},
+            "priority": self.options[name]["priority"] if priority is None else priority,
+            "status": "pending",
+            "attempts": 0,
+            "run_at": now + timedelta(seconds=delay),
+            "created_at": now
+        }
+        
+        if dedup_key is None:
+            await db.background_tasks.insert_one(doc)
+        else:
+            try:
+                result = await db.background_tasks.update_one(
+                    {"dedup_key": dedup_key, "status": "pending"},
+                    {"$setOnInsert": {**doc, "dedup_key": dedup_key}},
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                # A concurrent enqueue won the upsert race
+                return None
+            if result.upserted_id is None:
+                return None
+        
+        metrics.inc("background_tasks_enqueued_total", {"task": name})
+        self.wakeup.set()
+        return task_id
+    
+    async def claim(self) -> Optional[Dict[str, Any]]:
+        names = [name for name, count in self.running.items() if count < self.options[name]["concurrency"]]
+        if not names:
+            return None
+        
+        now = datetime.now(timezone.utc)
+        return await db.background_tasks.find_one_and_update(
+            {
+                "name": {"$in": names},
+                "$or": [
+                    {"status": "pending", "run_at": {"$lte": now}},
+                    {"status": "running", "locked_until": {"$lt": now}}
+                ]
+            },
+            {
+                "$set": {"status": "running", "locked_until": now + TASK_LEASE, "worker": self.worker_id},
+                "$inc": {"attempts": 1}
+            },
+            sort=[("priority", -1), ("run_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+    
+    async def execute(self, task: Dict[str, Any]):
+        name = task["name"]
+        owned = {"task_id": task["task_id"], "attempts": task["attempts"]}
+        start = time.perf_counter()
+        self.running[name] += 1
+        try:
+            await self.handlers[name](**task["payload"])
+        except asyncio.CancelledError:
+            # Shutting down: hand the task back without spending an attempt
+            await db.background_tasks.update_one(
+                owned, {"$set": {"status": "pending"}, "$inc": {"attempts": -1}, "$unset": {"locked_until": ""}}
+            )
+            raise
+        except Exception as e:
+            now = datetime.now(timezone.utc)
+            if task["attempts"] >= self.options[name]["max_attempts"]:
+                logger.error(f"Background task {name} ({task['task_id']}) failed permanently: {e}")
+                update = {"status": "failed", "finished_at": now, "last_error": str(e)}
+                outcome = "failed"
+            else:
+                backoff = TASK_RETRY_BASE_SECONDS * 2 ** (task["attempts"] - 1)
+                logger.warning(f"Background task {name} ({task['task_id']}) failed, retrying in {backoff:.0f}s: {e}")
+                update = {"status": "pending", "run_at": now + timedelta(seconds=backoff), "last_error": str(e)}
+                outcome = "retry"
+            await db.background_tasks.update_one(owned, {"$set": update, "$unset": {"locked_until": ""}})
+        else:
+            await db.background_tasks.update_one(
+                owned, {"$set": {"status": "done", "finished_at": datetime.now(timezone.utc)}, "$unset": {"locked_until": ""}}
+            )
+            outcome = "done"
+        finally:
+            self.running[name] -= 1
+            # A concurrency slot opened up; let idle workers look again
+            self.wakeup.set()
+        
+        metrics.inc("background_tasks_total", {"task": name, "outcome": outcome})
+        metrics.observe("background_task_duration_seconds", time.perf_counter() - start, {"task": name})
+    
+    async def work(self):
+        while True:
+            try:
+                task = await self.claim()
+            except Exception as e:
+                logger.error(f"Failed to claim background task: {e}")
+                task = None
+            
+            if task is None:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), TASK_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            try:
+                await self.execute(task)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to record background task {task['task_id']}: {e}")
+    
+    def start(self):
+        if not self.tasks:
+            self.tasks = [asyncio.create_task(self.work()) for _ in range(self.workers)]
+    
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+task_queue = TaskQueue()
+
+# ============ Data Lifecycle ============
+
+# Opt-in: expiring and archiving live data is a deployment decision
+LIFECYCLE_ENABLED = os.environ.get("LIFECYCLE_ENABLED", "false").lower() == "true"
+LIFECYCLE_INTERVAL = float(os.environ.get("LIFECYCLE_INTERVAL_SECONDS", "3600"))
+# Active jobs nobody has touched in this long are marked expired (0 disables)
+JOB_EXPIRY_DAYS = int(os.environ.get("JOB_EXPIRY_DAYS", "60"))
+# Age after which documents move to <collection>_archive (0 disables)
+JOB_ARCHIVE_DAYS = int(os.environ.get("JOB_ARCHIVE_DAYS", "30"))
+APPLICATION_ARCHIVE_DAYS = int(os.environ.get("APPLICATION_ARCHIVE_DAYS", "180"))
+MESSAGE_ARCHIVE_DAYS = int(os.environ.get("MESSAGE_ARCHIVE_DAYS", "365"))
+# Read messages older than this are folded into message_buckets (0 disables)
+MESSAGE_COMPACT_AFTER_DAYS = int(os.environ.get("MESSAGE_COMPACT_AFTER_DAYS", "7"))
+MESSAGE_BUCKET_SIZE = int(os.environ.get("MESSAGE_BUCKET_SIZE", "100"))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", "1000"))
+CLOSED_JOB_STATUSES = ["closed", "filled", "expired"]
+
+metrics.counter("lifecycle_documents_total", "Documents expired or archived by the lifecycle engine by collection and action")
+
+async def archive_documents(collection: str, query: Dict[str, Any]) -> int:
+    """Move documents matching `query` into <collection>_archive in batches; returns how many moved"""
+    moved = 0
+    while True:
+        docs = await db[collection].find(query).limit(ARCHIVE_BATCH_SIZE).to_list(ARCHIVE_BATCH_SIZE)
+        if not docs:
+            break
+        
+        archived_at = datetime.now(timezone.utc)
+        # Upserts by _id so a batch interrupted between copy and delete is safe to re-run
+        await db[f"{collection}_archive"].bulk_write(
+            [ReplaceOne({"_id": doc["_id"]}, {**doc, "archived_at": archived_at}, upsert=True) for doc in docs],
+            ordered=False
+        )
+        # Re-check the query so documents changed since the read stay live
+        result = await db[collection].delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}, **query})
+        moved += result.deleted_count
+        
+        if len(docs) < ARCHIVE_BATCH_SIZE or result.deleted_count == 0:
+            break
+    
+    if moved:
+        metrics.inc("lifecycle_documents_total", {"collection": collection, "action": "archived"}, moved)
+    return moved
+
+async def restore_documents(collection: str, query: Dict[str, Any]) -> int:
+    """Move documents matching `query` from <collection>_archive back to the live collection"""
+    docs = await db[f"{collection}_archive"].find(query).to_list(ARCHIVE_BATCH_SIZE)
+    if not docs:
+        return 0
+    
+    await db[collection].bulk_write(
+        [ReplaceOne({"_id": doc["_id"]}, {k: v for k, v in doc.items() if k != "archived_at"}, upsert=True) for doc in docs],
+        ordered=False
+    )
+    result = await db[f"{collection}_archive"].delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+    metrics.inc("lifecycle_documents_total", {"collection": collection, "action": "restored"}, result.deleted_count)
+    return result.deleted_count
+
+async def archive_applications(cutoff: datetime) -> int:
+    """Archive applications created before `cutoff` whose job is closed or already archived"""
+    moved = 0
+    job_ids = await db.applications.distinct("job_id", {"created_at": {"$lt": cutoff}})
+    for i in range(0, len(job_ids), ARCHIVE_BATCH_SIZE):
+        chunk = job_ids[i:i + ARCHIVE_BATCH_SIZE]
+        # Jobs still taking applications keep all of theirs live, however old
+        open_jobs = set(await db.jobs.distinct(
+            "job_id", {"job_id": {"$in": chunk}, "status": {"$nin": CLOSED_JOB_STATUSES}}
+        ))
+        closed = [job_id for job_id in chunk if job_id not in open_jobs]
+        if closed:
+            moved += await archive_documents(
+                "applications",
+                {"job_id": {"$in": closed}, "created_at": {"$lt": cutoff}}
+            )
+    return moved
+
+def conversation_key(user_a: str, user_b: str) -> str:
+    return ":".join(sorted([user_a, user_b]))
+
+async def append_to_buckets(key: str, messages: List[Dict[str, Any]]):
+    """Add messages (oldest first) to a conversation's buckets, topping up the newest one"""
+    ids = [msg["message_id"] for msg in messages]
+    # A batch interrupted before its delete is re-run; skip what already landed in a bucket
+    stored = set(await db.message_buckets.distinct(
+        "messages.message_id", {"conversation": key, "messages.message_id": {"$in": ids}}
+    ))
+    pending = [msg for msg in messages if msg["message_id"] not in stored]
+    if not pending:
+        return
+    
+    newest = await db.message_buckets.find_one(
+        {"conversation": key, "count": {"$lt": MESSAGE_BUCKET_SIZE}},
+        {"_id": 0, "bucket_id": 1, "count": 1},
+        sort=[("start", -1)]
+    )
+    if newest is not None:
+        head, rest = pending[:MESSAGE_BUCKET_SIZE - newest["count"]], pending[MESSAGE_BUCKET_SIZE - newest["count"]:]
+        result = await db.message_buckets.update_one(
+            {"bucket_id": newest["bucket_id"], "count": newest["count"]},
+            {
+                "$push": {"messages": {"$each": head, "$sort": {"created_at": 1}}},
+                "$inc": {"count": len(head)},
+                "$min": {"start": head[0]["created_at"]},
+                "$max": {"end": head[-1]["created_at"]}
+            }
+        )
+        if result.modified_count:
+            pending = rest
+    
+    participants = key.split(":")
+    for i in range(0, len(pending), MESSAGE_BUCKET_SIZE):
+        chunk = pending[i:i + MESSAGE_BUCKET_SIZE]
+        await db.message_buckets.insert_one({
+            "bucket_id": f"mb_{uuid.uuid4().hex[:12]}",
+            "conversation": key,
+            "participants": participants,
+            "start": chunk[0]["created_at"],
+            "end": chunk[-1]["created_at"],
+            "count": len(chunk),
+            "messages": chunk
+        })
+
+async def compact_messages() -> int:
+    """Fold read messages older than MESSAGE_COMPACT_AFTER_DAYS into per-conversation buckets"""
+    query = {
+        "read": True,
+        "created_at": {"$lt": datetime.now(timezone.utc) - timedelta(days=MESSAGE_COMPACT_AFTER_DAYS)}
+    }
+    compacted = 0
+    while True:
+        docs = await db.messages.find(query, {"_id": 0}).sort("created_at", 1).limit(ARCHIVE_BATCH_SIZE).to_list(ARCHIVE_BATCH_SIZE)
+        if not docs:
+            break
+        
+        by_conversation: Dict[str, List[Dict[str, Any]]] = {}
+        for doc in docs:
+            by_conversation.setdefault(conversation_key(doc["sender_id"], doc["receiver_id"]), []).append(doc)
+        for key, messages in by_conversation.items():
+            await append_to_buckets(key, messages)
+        
+        result = await db.messages.delete_many({"message_id": {"$in": [doc["message_id"] for doc in docs]}, **query})
+        compacted += result.deleted_count
+        
+        if len(docs) < ARCHIVE_BATCH_SIZE or result.deleted_count == 0:
+            break
+    
+    if compacted:
+        metrics.inc("lifecycle_documents_total", {"collection": "messages", "action": "compacted"}, compacted)
+    return compacted
+
+async def conversation_history(user_a: str, user_b: str, limit: int = 500) -> List[Dict[str, Any]]:
+    """Oldest `limit` messages between two users across individual, bucketed and archived storage"""
+    participants = {
+        "$or": [
+            {"sender_id": user_a, "receiver_id": user_b},
+            {"sender_id": user_b, "receiver_id": user_a}
+        ]
+    }
+    def created_at(msg: Dict[str, Any]) -> datetime:
+        return as_utc(msg["created_at"])
+    
+    messages: List[Dict[str, Any]] = []
+    for collection in ("messages_archive", "messages"):
+        messages += await db[collection].find(
+            participants,
+            {"_id": 0, "archived_at": 0}
+        ).sort("created_at", 1).to_list(limit)
+    messages = sorted(messages, key=created_at)[:limit]
+    
+    key = conversation_key(user_a, user_b)
+    for collection in ("message_buckets_archive", "message_buckets"):
+        cursor = db[collection].find({"conversation": key}, {"_id": 0, "start": 1, "messages": 1}).sort("start", 1)
+        async for bucket in cursor:
+            # Every later bucket starts after the newest message we'd keep
+            if len(messages) >= limit and as_utc(bucket["start"]) > created_at(messages[-1]):
+                break
+            messages = sorted(messages + bucket["messages"], key=created_at)[:limit]
+    
+    return messages
+
+@task_queue.task(max_attempts=3, priority=-10)
+async def run_lifecycle():
+    """Expire stale jobs, compact old messages and move old closed jobs, their applications and messages to archive collections"""
+    now = datetime.now(timezone.utc)
+    summary: Dict[str, int] = {}
+    
+    if JOB_EXPIRY_DAYS:
+        result = await db.jobs.update_many(
+            {"status": "active", "updated_at": {"$lt": now - timedelta(days=JOB_EXPIRY_DAYS)}},
+            {"$set": {"status": "expired", "updated_at": now}}
+        )
+        summary["jobs_expired"] = result.modified_count
+        if result.modified_count:
+            metrics.inc("lifecycle_documents_total", {"collection": "jobs", "action": "expired"}, result.modified_count)
+    
+    if JOB_ARCHIVE_DAYS:
+        summary["jobs_archived"] = await archive_documents(
+            "jobs",
+            {"status": {"$in": CLOSED_JOB_STATUSES}, "updated_at": {"$lt": now - timedelta(days=JOB_ARCHIVE_DAYS)}}
+        )
+    
+    if summary.get("jobs_expired") or summary.get("jobs_archived"):
+        invalidation_bus.publish("jobs", None)
+    
+    if APPLICATION_ARCHIVE_DAYS:
+        summary["applications_archived"] = await archive_applications(now - timedelta(days=APPLICATION_ARCHIVE_DAYS))
+    
+    if MESSAGE_COMPACT_AFTER_DAYS:
+        summary["messages_compacted"] = await compact_messages()
+    
+    if MESSAGE_ARCHIVE_DAYS:
+        # Unread messages stay live, where the inbox and dashboard count them
+        summary["messages_archived"] = await archive_documents(
+            "messages",
+            {"read": True, "created_at": {"$lt": now - timedelta(days=MESSAGE_ARCHIVE_DAYS)}}
+        )
+        summary["message_buckets_archived"] = await archive_documents(
+            "message_buckets",
+            {"end": {"$lt": now - timedelta(days=MESSAGE_ARCHIVE_DAYS)}}
+        )
+    
+    logger.info(f"Lifecycle run: {summary}")
+
+class LifecycleScheduler:
+    """Enqueue run_lifecycle once per interval across all workers (the slot is claimed in lifecycle_state)"""
+    
+    def __init__(self, interval: float = LIFECYCLE_INTERVAL):
+        self.interval = interval
+        self.task: Optional[asyncio.Task] = None
+    
+    async def tick(self):
+        now = datetime.now(timezone.utc)
+        claimed = await db.lifecycle_state.find_one_and_update(
+            {"_id": "lifecycle", "next_run": {"$lte": now}},
+            {"$set": {"next_run": now + timedelta(seconds=self.interval), "scheduled_at": now}}
+        )
+        if claimed is None:
+            try:
+                # First run ever; losing this race means another worker already scheduled it
+                await db.lifecycle_state.insert_one(
+                    {"_id": "lifecycle", "next_run": now + timedelta(seconds=self.interval), "scheduled_at": now}
+                )
+            except DuplicateKeyError:
+                return
+        
+        await task_queue.enqueue("run_lifecycle", dedup_key="run_lifecycle")
+    
+    async def run(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Failed to schedule lifecycle run: {e}")
+            await asyncio.sleep(min(self.interval, 60))
+    
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+    
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+lifecycle_scheduler = LifecycleScheduler()
+
+async def find_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Live job, or its archived copy once the lifecycle engine has moved it"""
+    job = await db.jobs.find_one({"job_id": job_id}, {"_id": 0})
+    if job is None:
+        job = await db.jobs_archive.find_one({"job_id": job_id}, {"_id": 0, "archived_at": 0})
+    return job
+
+# ============ Session Lifecycle ============
+
+SESSION_TTL = timedelta(days=int(os.environ.get("SESSION_TTL_DAYS", "7")))
+SESSION_MAX_PER_USER = int(os.environ.get("SESSION_MAX_PER_USER", "5"))
+# Sliding expiry is pushed out at most once per interval, not on every request
+SESSION_REFRESH_INTERVAL = timedelta(hours=float(os.environ.get("SESSION_REFRESH_HOURS", "24")))
+
+def set_session_cookie(response: Response, session_token: str):
+    response.set_cookie(
+        key="session_token",
+        value=session_token,
+        httponly=True,
+        secure=True,
+        samesite="none",
+        max_age=int(SESSION_TTL.total_seconds()),
+        path="/"
+    )
+
+def session_id(session_token: str) -> str:
+    """Opaque id for a session that can be shown to the client (signed tokens) without revealing the token"""
+    return hashlib.sha256(session_token.encode()).hexdigest()
+
+async def store_session(user_id: str, session_token: str):
+    """Upsert a session for the token and evict the user's least recently active sessions over the cap"""
+    now = datetime.now(timezone.utc)
+    await db.user_sessions.update_one(
+        {"session_token": session_token},
+        {
+            "$set": {"user_id": user_id, "sid": session_id(session_token), "expires_at": now + SESSION_TTL},
+            "$setOnInsert": {"created_at": now}
+        },
+        upsert=True
+    )
+    
+    stale = await db.user_sessions.find(
+        {"user_id": user_id},
+        {"_id": 0, "session_token": 1}
+    ).sort("expires_at", -1).skip(SESSION_MAX_PER_USER).to_list(None)
+    
+    if stale:
+        await db.user_sessions.delete_many(
+            {"session_token": {"$in": [session["session_token"] for session in stale]}}
+        )
+
+async def find_active_session(session_token: Optional[str] = None, sid: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Session document for the token (or its session_id), or None if missing or expired"""
+    session = await db.user_sessions.find_one(
+        {"session_token": session_token} if sid is None else {"sid": sid},
+        {"_id": 0}
+    )
+    
+    if not session:
+        return None
+    
+    # Check expiry (expired rows are also removed by the TTL index)
+    expires_at = session.get("expires_at")
+    if expires_at:
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if expires_at < datetime.now(timezone.utc):
+            return None
+        session["expires_at"] = expires_at
+    
+    return session
+
+def refresh_session(session_token: str, expires_at: Optional[datetime]) -> bool:
+    """Extend a session's expiry lazily, once SESSION_REFRESH_INTERVAL has passed since the last extension"""
+    now = datetime.now(timezone.utc)
+    if not expires_at or expires_at - now > SESSION_TTL - SESSION_REFRESH_INTERVAL:
+        return False
+    
+    write_behind.enqueue(
+        "user_sessions",
+        f"refresh:{session_token}",
+        {"session_token": session_token},
+        {"expires_at": now + SESSION_TTL}
+    )
+    return True
+
+# ============ Signed Session Tokens ============
 
-class ApplicationCreate(BaseModel):
-    job_id: str
-    cover_letter: Optional[str] = None
+# "opaque": every request looks up user_sessions; "jwt": the server issues short-lived
+# signed tokens verified in-process, and falls back to the session row only to renew them
+SESSION_TOKEN_MODE = os.environ.get("SESSION_TOKEN_MODE", "opaque")
+JWT_ALGORITHM = "HS256"
+JWT_TTL = timedelta(minutes=int(os.environ.get("JWT_TTL_MINUTES", "15")))
+# How long after expiry a signed token may still be renewed from its session; older ones need a new login
+JWT_RENEW_WINDOW = timedelta(hours=float(os.environ.get("JWT_RENEW_WINDOW_HOURS", "24")))
+REVOCATION_SYNC_SECONDS = float(os.environ.get("REVOCATION_SYNC_SECONDS", "30"))
+JWT_SECRET = os.environ['JWT_SECRET'] if SESSION_TOKEN_MODE == "jwt" else None
 
-class Message(BaseModel):
-    message_id: str
-    sender_id: str
-    receiver_id: str
-    sender_name: str
-    content: str
-    read: bool = False
-    created_at: datetime
+if SESSION_TOKEN_MODE == "jwt":
+    INVALIDATION_COLLECTIONS["revoked_tokens"] = ("jti", "revoked_at")
 
-class MessageCreate(BaseModel):
-    receiver_id: str
-    content: str
+def is_signed_token(token: str) -> bool:
+    return SESSION_TOKEN_MODE == "jwt" and token.count(".") == 2
 
-class Review(BaseModel):
-    review_id: str
-    reviewer_id: str
-    reviewed_id: str
-    reviewer_name: str
-    rating: int  # 1-5
-    comment: Optional[str] = None
-    created_at: datetime
+def issue_signed_token(user: User, session_token: str) -> str:
+    """Sign the claims get_current_user needs, anchored to the OAuth session (by its session_id) for renewal"""
+    now = datetime.now(timezone.utc)
+    created_at = user.created_at if user.created_at.tzinfo else user.created_at.replace(tzinfo=timezone.utc)
+    claims = {
+        "sub": user.user_id,
+        "user_type": user.user_type,
+        "email": user.email,
+        "name": user.name,
+        "picture": user.picture,
+        "created_at": int(created_at.timestamp()),
+        "sid": session_id(session_token),
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": now + JWT_TTL
+    }
+    return jwt.encode(claims, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-class ReviewCreate(BaseModel):
-    reviewed_id: str
-    rating: int
-    comment: Optional[str] = None
+class RevocationList:
+    """Ids of logged-out signed tokens, mirrored in memory so verification never hits the DB.
 
-class PublicPost(BaseModel):
-    post_id: str
-    user_id: str
-    user_name: str
-    user_type: str
-    picture: Optional[str] = None
-    profession: Optional[str] = None
-    phone: Optional[str] = None
-    email: str
-    city: Optional[str] = None
-    area: Optional[str] = None
-    skills: Optional[List[str]] = []
-    experience_years: Optional[int] = None
-    bio: Optional[str] = None
-    status: str = "active"  # "active", "inactive"
-    created_at: datetime
-    updated_at: datetime
+    Entries live until the token could no longer be renewed anyway; other workers
+    pick up revocations on the next sync.
+    """
+    
+    def __init__(self, sync_interval: float = REVOCATION_SYNC_SECONDS):
+        self.sync_interval = sync_interval
+        self.revoked: Dict[str, datetime] = {}
+        self.task: Optional[asyncio.Task] = None
+    
+    def __contains__(self, jti: str) -> bool:
+        return jti in self.revoked
+    
+    async def revoke(self, jti: str, expires_at: datetime):
+        await db.revoked_tokens.update_one(
+            {"jti": jti},
+            {"$set": {"jti": jti, "expires_at": expires_at, "revoked_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        self.revoked[jti] = expires_at
+    
+    def invalidate(self, jti: Optional[str]):
+        """Revocation seen on the invalidation bus; a token can't be renewed past JWT_TTL + JWT_RENEW_WINDOW from now"""
+        if jti is None:
+            asyncio.ensure_future(self.sync())
+        elif jti not in self.revoked:
+            self.revoked[jti] = datetime.now(timezone.utc) + JWT_TTL + JWT_RENEW_WINDOW
+    
+    async def sync(self):
+        now = datetime.now(timezone.utc)
+        docs = await db.revoked_tokens.find({"expires_at": {"$gt": now}}, {"_id": 0}).to_list(None)
+        # Keep local revocations a concurrent sync may not have seen yet
+        local = {
+            jti: expires_at for jti, expires_at in self.revoked.items()
+            if (expires_at if expires_at.tzinfo else expires_at.replace(tzinfo=timezone.utc)) > now
+        }
+        self.revoked = {**local, **{doc["jti"]: doc["expires_at"] for doc in docs}}
+    
+    async def run(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Failed to sync revoked tokens: {e}")
+            await asyncio.sleep(self.sync_interval)
+    
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+    
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
 
-class Advertisement(BaseModel):
-    ad_id: str
-    title: str
-    description: Optional[str] = None
-    image_base64: str  # Base64 encoded image
-    link_url: Optional[str] = None
-    location: str  # "home", "feed", "jobs", "all"
-    priority: int = 0  # Higher number = higher priority
-    status: str = "active"  # "active", "inactive"
-    start_date: Optional[datetime] = None
-    end_date: Optional[datetime] = None
-    created_by: str
-    created_at: datetime
-    updated_at: datetime
+revocation_list = RevocationList()
+invalidation_bus.subscribe("revoked_tokens", revocation_list.invalidate)
 
-class AdvertisementCreate(BaseModel):
-    title: str
-    description: Optional[str] = None
-    image_base64: str
-    link_url: Optional[str] = None
-    location: str = "all"
-    priority: int = 0
-    start_date: Optional[datetime] = None
-    end_date: Optional[datetime] = None
+async def user_from_signed_token(token: str, response: Response) -> Optional[User]:
+    """Verify a signed token in-process; expired tokens are renewed against their session"""
+    try:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        return await renew_signed_token(token, response)
+    except jwt.InvalidTokenError:
+        return None
+    
+    if claims["jti"] in revocation_list:
+        return None
+    
+    return User(
+        user_id=claims["sub"],
+        user_type=claims["user_type"],
+        email=claims["email"],
+        name=claims["name"],
+        picture=claims.get("picture"),
+        created_at=datetime.fromtimestamp(claims["created_at"], timezone.utc)
+    )
 
-class AdvertisementUpdate(BaseModel):
-    title: Optional[str] = None
-    description: Optional[str] = None
-    image_base64: Optional[str] = None
-    link_url: Optional[str] = None
-    location: Optional[str] = None
-    priority: Optional[int] = None
-    status: Optional[str] = None
-    start_date: Optional[datetime] = None
-    end_date: Optional[datetime] = None
+async def renew_signed_token(token: str, response: Response) -> Optional[User]:
+    """Re-issue an expired signed token if its underlying session is still active"""
+    try:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM], options={"verify_exp": False})
+    except jwt.InvalidTokenError:
+        return None
+    
+    if claims["jti"] in revocation_list:
+        return None
+    
+    if datetime.now(timezone.utc) - datetime.fromtimestamp(claims["exp"], timezone.utc) > JWT_RENEW_WINDOW:
+        return None
+    
+    session = await find_active_session(sid=claims["sid"])
+    if not session:
+        return None
+    
+    user_doc = await db.users.find_one({"user_id": session["user_id"]}, {"_id": 0})
+    if not user_doc:
+        return None
+    
+    user = User(**user_doc)
+    refresh_session(session["session_token"], session.get("expires_at"))
+    set_session_cookie(response, issue_signed_token(user, session["session_token"]))
+    return user
 
-class SessionData(BaseModel):
-    user_id: str
-    email: str
-    name: str
-    picture: Optional[str] = None
-    session_token: str
+async def revoke_signed_token(token: str):
+    """Revoke a signed token and end the session it renews from"""
+    try:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM], options={"verify_exp": False})
+    except jwt.InvalidTokenError:
+        return
+    
+    await revocation_list.revoke(claims["jti"], datetime.fromtimestamp(claims["exp"], timezone.utc) + JWT_RENEW_WINDOW)
+    await db.user_sessions.delete_one({"sid": claims["sid"]})
+
+async def full_profile(user: User) -> User:
+    """Signed-token users carry identity claims only; load the stored profile when it is needed"""
+    if SESSION_TOKEN_MODE != "jwt":
+        return user
+    
+    user_doc = await db.users.find_one({"user_id": user.user_id}, {"_id": 0})
+    return User(**user_doc) if user_doc else user
 
 # ============ Auth Helpers ============
 
-async def get_current_user(request: Request, authorization: Optional[str] = Header(None)) -> Optional[User]:
+async def get_current_user(
+    request: Request,
+    response: Response,
+    authorization: Optional[str] = Header(None)
+) -> Optional[User]:
     """Get current user from session token (cookie or Authorization header)"""
     session_token = request.cookies.get("session_token")
     
@@ -218,22 +2233,18 @@ async def get_current_user(request: Request, authorization: Optional[str] = Head
     if not session_token:
         return None
     
+    # Signed tokens are verified without touching the database
+    if is_signed_token(session_token):
+        return await user_from_signed_token(session_token, response)
+    
     # Find session
-    session = await db.user_sessions.find_one(
-        {"session_token": session_token},
-        {"_id": 0}
-    )
+    session = await find_active_session(session_token)
     
     if not session:
         return None
     
-    # Check expiry
-    expires_at = session.get("expires_at")
-    if expires_at:
-        if expires_at.tzinfo is None:
-            expires_at = expires_at.replace(tzinfo=timezone.utc)
-        if expires_at < datetime.now(timezone.utc):
-            return None
+    if refresh_session(session_token, session.get("expires_at")):
+        set_session_cookie(response, session_token)
     
     # Get user
     user_doc = await db.users.find_one(
@@ -252,12 +2263,152 @@ def require_auth(user: Optional[User] = Depends(get_current_user)) -> User:
         raise HTTPException(status_code=401, detail="Not authenticated")
     return user
 
+# Accounts allowed on operator-only routes (comma-separated emails)
+ADMIN_EMAILS = {
+    email.strip().lower()
+    for email in os.environ.get("ADMIN_EMAILS", "").split(",")
+    if email.strip()
+}
+
+def require_admin(user: User = Depends(require_auth)) -> User:
+    """Require an authenticated operator listed in ADMIN_EMAILS"""
+    if user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return user
+
+# ============ Rate Limiting ============
+
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")  # "memory" or "mongo"
+
+# Token bucket budgets as "burst/seconds": up to `burst` calls, refilled evenly over `seconds`
+RATE_LIMIT_DEFAULTS = {
+    "messages": "30/60",
+    "applications": "10/60",
+    "reviews": "5/60",
+    "search": "60/60",
+    "ad_events": "120/60",
+}
+
+def parse_rate_limit(spec: str) -> Tuple[float, float]:
+    """Parse "burst/seconds" into (capacity, tokens per second)"""
+    burst, seconds = spec.split("/")
+    return float(burst), float(burst) / float(seconds)
+
+RATE_LIMITS = {
+    bucket: parse_rate_limit(os.environ.get(f"RATE_LIMIT_{bucket.upper()}", default))
+    for bucket, default in RATE_LIMIT_DEFAULTS.items()
+}
+
+metrics.counter("rate_limited_requests_total", "Requests rejected with 429 by bucket")
+
+class InMemoryRateLimitStore:
+    """Token buckets held in this worker process (LRU-bounded)"""
+    
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self.buckets: OrderedDict = OrderedDict()
+    
+    async def take(self, key: str, capacity: float, refill_rate: float) -> float:
+        """Consume one token; returns 0 if allowed, else seconds until a token is available"""
+        now = time.monotonic()
+        tokens, updated = self.buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_rate)
+        
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / refill_rate
+        
+        self.buckets[key] = (tokens, now)
+        if len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        
+        return retry_after
+
+class MongoRateLimitStore:
+    """Token buckets shared by all workers, refilled and consumed in one atomic update"""
+    
+    async def take(self, key: str, capacity: float, refill_rate: float) -> float:
+        now = datetime.now(timezone.utc)
+        elapsed_seconds = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        
+        bucket = await db.rate_limits.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {
+                    "tokens": {"$min": [capacity, {"$add": [{"$ifNull": ["$tokens", capacity]}, {"$multiply": [elapsed_seconds, refill_rate]}]}]},
+                    "updated_at": now,
+                    # Idle buckets are full again after capacity / refill_rate; TTL index drops them
+                    "expires_at": now + timedelta(seconds=capacity / refill_rate)
+                }},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]}
+                }}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        
+        if bucket["allowed"]:
+            return 0.0
+        return (1 - bucket["tokens"]) / refill_rate
+
+rate_limit_store = MongoRateLimitStore() if RATE_LIMIT_BACKEND == "mongo" else InMemoryRateLimitStore()
+
+# Proxies in front of the app that append to X-Forwarded-For (the ingress); 0 ignores the header
+TRUSTED_PROXY_HOPS = int(os.environ.get("TRUSTED_PROXY_HOPS", "1"))
+
+def client_ip(request: Request) -> str:
+    """Client address as recorded by our own proxies in X-Forwarded-For"""
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and TRUSTED_PROXY_HOPS > 0:
+        # Entries left of the ones our proxies appended are whatever the client sent
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        if len(hops) >= TRUSTED_PROXY_HOPS:
+            return hops[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
+
+async def enforce_rate_limit(bucket: str, identity: str):
+    capacity, refill_rate = RATE_LIMITS[bucket]
+    retry_after = await rate_limit_store.take(f"{bucket}:{identity}", capacity, refill_rate)
+    
+    if retry_after > 0:
+        metrics.inc("rate_limited_requests_total", {"bucket": bucket})
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+def rate_limit(bucket: str, by_user: bool = True, query_param: Optional[str] = None):
+    """Dependency enforcing a per-route token bucket keyed by user (or client IP).
+
+    `by_user=False` keys by IP only, so public routes don't pay for a session lookup;
+    `query_param` limits only requests that carry that parameter (e.g. `search`).
+    """
+    if by_user:
+        async def dependency(request: Request, user: Optional[User] = Depends(get_current_user)):
+            if not RATE_LIMIT_ENABLED or (query_param and not request.query_params.get(query_param)):
+                return
+            identity = f"user:{user.user_id}" if user else f"ip:{client_ip(request)}"
+            await enforce_rate_limit(bucket, identity)
+    else:
+        async def dependency(request: Request):
+            if not RATE_LIMIT_ENABLED or (query_param and not request.query_params.get(query_param)):
+                return
+            await enforce_rate_limit(bucket, f"ip:{client_ip(request)}")
+    
+    return dependency
+
 # ============ Auth Endpoints ============
 
 @api_router.get("/auth/me")
 async def get_me(current_user: User = Depends(require_auth)):
     """Get current user info"""
-    return current_user
+    return await full_profile(current_user)
 
 @api_router.post("/auth/session")
 async def create_session(request: Request, response: Response):
@@ -269,7 +2420,8 @@ async def create_session(request: Request, response: Response):
     if not session_id:
         raise HTTPException(status_code=400, detail="session_id required")
     
-    # Exchange session_id for user data
+    # Exchange session_id for user data (httpx is only needed here, so it loads on first login)
+    import httpx
     async with httpx.AsyncClient() as client:
         try:
             resp = await client.get(
@@ -306,25 +2458,15 @@ async def create_session(request: Request, response: Response):
         await db.users.insert_one(new_user)
         user = User(**new_user)
     
-    # Create session
+    # Create session (upsert on the token, capped per user)
     session_token = user_data["session_token"]
-    await db.user_sessions.insert_one({
-        "user_id": user_id,
-        "session_token": session_token,
-        "expires_at": datetime.now(timezone.utc) + timedelta(days=7),
-        "created_at": datetime.now(timezone.utc)
-    })
+    await store_session(user_id, session_token)
     
-    # Set cookie
-    response.set_cookie(
-        key="session_token",
-        value=session_token,
-        httponly=True,
-        secure=True,
-        samesite="none",
-        max_age=7 * 24 * 60 * 60,
-        path="/"
-    )
+    # Set cookie (in jwt mode the client holds a signed token that renews from this session)
+    if SESSION_TOKEN_MODE == "jwt":
+        set_session_cookie(response, issue_signed_token(user, session_token))
+    else:
+        set_session_cookie(response, session_token)
     
     return user
 
@@ -334,13 +2476,41 @@ async def logout(request: Request, response: Response):
     session_token = request.cookies.get("session_token")
     
     if session_token:
-        await db.user_sessions.delete_one({"session_token": session_token})
+        if is_signed_token(session_token):
+            await revoke_signed_token(session_token)
+        else:
+            await db.user_sessions.delete_one({"session_token": session_token})
     
     response.delete_cookie("session_token", path="/")
     return {"message": "Logged out"}
 
 # ============ User Endpoints ============
 
+@task_queue.task(concurrency=2)
+async def propagate_profile(user_id: str):
+    """Copy editable profile fields into the user's public post"""
+    user = await db.users.find_one({"user_id": user_id}, {"_id": 0})
+    if not user:
+        return
+    
+    await db.public_posts.update_many(
+        {"user_id": user_id},
+        {"$set": {
+            "user_name": user["name"],
+            "picture": user.get("picture"),
+            "profession": user.get("profession"),
+            "phone": user.get("phone"),
+            "city": user.get("city"),
+            "area": user.get("area"),
+            "skills": user.get("skills") or [],
+            "experience_years": user.get("experience_years"),
+            "bio": user.get("bio")
+        }}
+    )
+    # Jobs, applications and reviews only copy the name, which UserUpdate can't change
+    await feed_cache.invalidate()
+    invalidation_bus.publish("public_posts", user_id)
+
 @api_router.put("/users/profile")
 async def update_profile(
     profile: UserUpdate,
@@ -350,10 +2520,19 @@ async def update_profile(
     update_data = profile.dict(exclude_none=True)
     
     if update_data:
+        update_data["updated_at"] = datetime.now(timezone.utc)
         await db.users.update_one(
             {"user_id": current_user.user_id},
             {"$set": update_data}
         )
+        await profile_cache.invalidate(current_user.user_id)
+        invalidation_bus.publish("users", current_user.user_id)
+        # The public post carries a copy of the profile
+        await task_queue.enqueue(
+            "propagate_profile",
+            {"user_id": current_user.user_id},
+            dedup_key=f"propagate_profile:{current_user.user_id}"
+        )
     
     updated_user = await db.users.find_one(
         {"user_id": current_user.user_id},
@@ -363,16 +2542,21 @@ async def update_profile(
     return User(**updated_user)
 
 @api_router.get("/users/{user_id}")
-async def get_user(user_id: str):
+async def get_user(user_id: str, request: Request, response: Response):
     """Get user profile by ID"""
-    user = await db.users.find_one(
-        {"user_id": user_id},
-        {"_id": 0}
+    user = await profile_cache.get_or_load(
+        user_id,
+        lambda: db.users.find_one({"user_id": user_id}, {"_id": 0})
     )
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    # Older users carry no updated_at, so version by content
+    not_modified = conditional_response(request, response, "user", make_etag(user))
+    if not_modified:
+        return not_modified
+    
     return User(**user)
 
 # ============ Job Endpoints ============
@@ -396,14 +2580,18 @@ async def create_job(
         "status": "active",
         "created_at": now,
         "updated_at": now,
+        # Applications by status, kept current by the application endpoints
+        "application_counts": {},
         **job.dict()
     }
     
     await db.jobs.insert_one(job_data)
+    job_feed.apply(job_data)
+    invalidation_bus.publish("jobs", job_id)
     
     return Job(**job_data)
 
-@api_router.get("/jobs", response_model=List[Job])
+@api_router.get("/jobs", dependencies=[Depends(rate_limit("search", by_user=False, query_param="search"))])
 async def get_jobs(
     job_type: Optional[str] = None,
     city: Optional[str] = None,
@@ -411,9 +2599,12 @@ async def get_jobs(
     max_salary: Optional[float] = None,
     search: Optional[str] = None,
     skip: int = 0,
-    limit: int = 50
+    limit: int = 50,
+    fields: Optional[str] = None,
+    view: str = "full"
 ):
-    """Get all jobs with filters"""
+    """Get all jobs with filters (`view=card` or `fields=a,b` for compact payloads)"""
+    projection, model = resolve_projection(Job, JobCard, "job_id", fields, view)
     query: Dict[str, Any] = {"status": "active"}
     
     if job_type:
@@ -434,18 +2625,37 @@ async def get_jobs(
             {"description": {"$regex": search, "$options": "i"}}
         ]
     
-    jobs = await db.jobs.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    # Unfiltered and city/job_type-only first pages come from the in-memory snapshots
+    jobs = None
+    if min_salary is None and max_salary is None and not search:
+        jobs = await job_feed.page(city, job_type, skip, limit)
+        if jobs is not None and model is None:
+            jobs = [{f: doc[f] for f in projection if f in doc} for doc in jobs]
     
-    return [Job(**job) for job in jobs]
+    if jobs is None:
+        jobs = await db_read.jobs.find(query, projection).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    
+    return project_documents(jobs, model)
 
 @api_router.get("/jobs/{job_id}", response_model=Job)
-async def get_job(job_id: str):
+async def get_job(job_id: str, request: Request, response: Response):
     """Get job by ID"""
-    job = await db.jobs.find_one({"job_id": job_id}, {"_id": 0})
+    job = await single_flight.do(
+        "job", job_id,
+        lambda: find_job(job_id)
+    )
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
+    not_modified = conditional_response(
+        request, response, "job",
+        make_etag(job["job_id"], job["updated_at"]),
+        job["updated_at"]
+    )
+    if not_modified:
+        return not_modified
+    
     return Job(**job)
 
 @api_router.get("/jobs/my/posted", response_model=List[Job])
@@ -479,16 +2689,21 @@ async def update_job_status(
     if job["employer_id"] != current_user.user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
+    now = datetime.now(timezone.utc)
     await db.jobs.update_one(
         {"job_id": job_id},
-        {"$set": {"status": status_data.status, "updated_at": datetime.now(timezone.utc)}}
+        {"$set": {"status": status_data.status, "updated_at": now}}
     )
+    job_feed.apply({**job, "status": status_data.status, "updated_at": now})
+    invalidation_bus.publish("jobs", job_id)
     
     return {"message": "Job status updated"}
 
 # ============ Application Endpoints ============
 
-@api_router.post("/applications", response_model=Application)
+APPLICATION_STATUSES = ("pending", "accepted", "rejected")
+
+@api_router.post("/applications", response_model=Application, dependencies=[Depends(rate_limit("applications"))])
 async def create_application(
     application: ApplicationCreate,
     current_user: User = Depends(require_auth)
@@ -502,16 +2717,15 @@ async def create_application(
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    # Check if already applied
-    existing = await db.applications.find_one({
-        "job_id": application.job_id,
-        "job_seeker_id": current_user.user_id
-    })
+    # Check if already applied (archived applications count: their job may have been reopened)
+    applied = {"job_id": application.job_id, "job_seeker_id": current_user.user_id}
+    existing = await db.applications.find_one(applied) or await db.applications_archive.find_one(applied)
     
     if existing:
         raise HTTPException(status_code=400, detail="Already applied to this job")
     
     application_id = f"app_{uuid.uuid4().hex[:12]}"
+    now = datetime.now(timezone.utc)
     
     app_data = {
         "application_id": application_id,
@@ -523,24 +2737,56 @@ async def create_application(
         "employer_id": job["employer_id"],
         "cover_letter": application.cover_letter,
         "status": "pending",
-        "created_at": datetime.now(timezone.utc)
+        # Counters, once present, are never removed; older jobs get theirs from the dashboard backfill
+        "counted": "application_counts" in job,
+        "created_at": now,
+        "updated_at": now
     }
     
     await db.applications.insert_one(app_data)
+    if app_data["counted"]:
+        await db.jobs.update_one(
+            {"job_id": application.job_id},
+            {"$inc": {"application_counts.pending": 1, "application_counts.total": 1}}
+        )
+    elif await db.jobs.count_documents({"job_id": application.job_id, "application_counts": {"$exists": True}}):
+        # Seeded since we read the job; the backfill may have run before this insert
+        await count_application("applications", application_id)
     
     return Application(**app_data)
 
 @api_router.get("/applications/my/submitted", response_model=List[Application])
-async def get_my_applications(current_user: User = Depends(require_auth)):
-    """Get applications submitted by current job seeker"""
+async def get_my_applications(
+    since: Optional[datetime] = None,
+    current_user: User = Depends(require_auth)
+):
+    """Get applications submitted by current job seeker.
+
+    With `since` (the newest `updated_at` already seen) only applications created or
+    changed after it are returned, oldest change first, so polling doesn't refetch the list.
+    """
     if current_user.user_type != "job_seeker":
         raise HTTPException(status_code=403, detail="Only job seekers can access this")
     
+    if since is not None:
+        apps = await db.applications.find(
+            {"job_seeker_id": current_user.user_id, "updated_at": {"$gt": since}},
+            {"_id": 0}
+        ).sort("updated_at", 1).to_list(100)
+        return [Application(**app) for app in apps]
+    
     apps = await db.applications.find(
         {"job_seeker_id": current_user.user_id},
         {"_id": 0}
     ).sort("created_at", -1).to_list(100)
     
+    # Older applications may have been archived; they sort after the live ones
+    if len(apps) < 100:
+        apps += await db.applications_archive.find(
+            {"job_seeker_id": current_user.user_id},
+            {"_id": 0, "archived_at": 0}
+        ).sort("created_at", -1).to_list(100 - len(apps))
+    
     return [Application(**app) for app in apps]
 
 @api_router.get("/applications/job/{job_id}")
@@ -550,7 +2796,7 @@ async def get_job_applications(
 ):
     """Get all applications for a specific job (employer only) with applicant details"""
     # Verify job ownership
-    job = await db.jobs.find_one({"job_id": job_id}, {"_id": 0})
+    job = await find_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
@@ -559,9 +2805,16 @@ async def get_job_applications(
     
     apps = await db.applications.find(
         {"job_id": job_id},
-        {"_id": 0}
+        {"_id": 0, "counted": 0}
     ).sort("created_at", -1).to_list(200)
     
+    # Older applications may have been archived; they sort after the live ones
+    if len(apps) < 200:
+        apps += await db.applications_archive.find(
+            {"job_id": job_id},
+            {"_id": 0, "archived_at": 0, "counted": 0}
+        ).sort("created_at", -1).to_list(200 - len(apps))
+    
     # Enrich with applicant phone numbers
     job_seeker_ids = list(set(app["job_seeker_id"] for app in apps))
     users_cursor = db.users.find(
@@ -575,33 +2828,205 @@ async def get_job_applications(
     for app in apps:
         app["job_seeker_phone"] = users_map.get(app["job_seeker_id"])
     
-    return apps
+    return apps
+
+@api_router.put("/applications/{application_id}/status")
+async def update_application_status(
+    application_id: str,
+    status_data: StatusUpdate,
+    current_user: User = Depends(require_auth)
+):
+    """Update application status (employer only)"""
+    app = await db.applications.find_one({"application_id": application_id}, {"_id": 0})
+    archived = app is None
+    if archived:
+        # Listed from the archive by get_job_applications; bring it back before changing it
+        app = await db.applications_archive.find_one({"application_id": application_id}, {"_id": 0, "archived_at": 0})
+    
+    if not app:
+        raise HTTPException(status_code=404, detail="Application not found")
+    
+    if app["employer_id"] != current_user.user_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    if status_data.status not in APPLICATION_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(APPLICATION_STATUSES)}")
+    
+    if archived:
+        await restore_documents("applications", {"application_id": application_id})
+    
+    now = datetime.now(timezone.utc)
+    # The status being replaced comes from the same atomic update, so concurrent changes count once;
+    # re-sending the current status changes nothing (no updated_at bump, no notification)
+    previous = await db.applications.find_one_and_update(
+        {"application_id": application_id, "status": {"$ne": status_data.status}},
+        {"$set": {"status": status_data.status, "updated_at": now}},
+        projection={"_id": 0, "status": 1, "counted": 1},
+        return_document=ReturnDocument.BEFORE
+    )
+    if previous:
+        # Not counted yet: whoever counts it later adds its status as of then
+        if previous.get("counted") is not False:
+            await db.jobs.update_one(
+                {"job_id": app["job_id"], "application_counts": {"$exists": True}},
+                {"$inc": {f"application_counts.{previous['status']}": -1, f"application_counts.{status_data.status}": 1}}
+            )
+        await notify_application_status(app, status_data.status, now)
+    
+    return {"message": "Application status updated"}
+
+# ============ Notifications ============
+
+NOTIFICATION_RETENTION_DAYS = int(os.environ.get("NOTIFICATION_RETENTION_DAYS", "90"))
+
+async def notify_application_status(app: Dict[str, Any], status: str, changed_at: datetime):
+    """Tell the job seeker their application changed: live over Socket.IO, and in their notification list"""
+    payload = {
+        "application_id": app["application_id"],
+        "job_id": app["job_id"],
+        "job_title": app["job_title"],
+        "status": status,
+        "updated_at": changed_at.isoformat()
+    }
+    await sio.emit('application_status', payload, room=app["job_seeker_id"])
+    
+    # One notification per application; rapid changes coalesce in the write-behind queue
+    write_behind.enqueue(
+        "notifications",
+        f"application:{app['application_id']}",
+        {"user_id": app["job_seeker_id"], "type": "application_status", "application_id": app["application_id"], "read": False},
+        {"job_id": app["job_id"], "job_title": app["job_title"], "status": status, "created_at": changed_at},
+        upsert=True,
+        set_on_insert={"notification_id": f"ntf_{uuid.uuid4().hex[:12]}"}
+    )
+
+@api_router.get("/notifications")
+async def get_notifications(
+    since: Optional[datetime] = None,
+    unread_only: bool = False,
+    current_user: User = Depends(require_auth)
+):
+    """Current user's notifications, newest first"""
+    query: Dict[str, Any] = {"user_id": current_user.user_id}
+    if since is not None:
+        query["created_at"] = {"$gt": since}
+    if unread_only:
+        query["read"] = False
+    
+    return await db.notifications.find(query, {"_id": 0}).sort("created_at", -1).to_list(50)
+
+@api_router.put("/notifications/read")
+async def mark_notifications_read(current_user: User = Depends(require_auth)):
+    """Mark all of the current user's notifications as read"""
+    result = await db.notifications.update_many(
+        {"user_id": current_user.user_id, "read": False},
+        {"$set": {"read": True}}
+    )
+    
+    return {"updated": result.modified_count}
+
+# ============ Employer Dashboard ============
+
+DASHBOARD_MAX_JOBS = int(os.environ.get("DASHBOARD_MAX_JOBS", "100"))
+DASHBOARD_RECENT_APPLICANTS = int(os.environ.get("DASHBOARD_RECENT_APPLICANTS", "10"))
+
+def with_status_counts(counts: Optional[Dict[str, int]]) -> Dict[str, int]:
+    """Application counters with every status present"""
+    return {status: 0 for status in (*APPLICATION_STATUSES, "total")} | (counts or {})
+
+async def count_application(collection: str, application_id: str) -> bool:
+    """Add an uncounted application to its job's counters; False if it was already counted"""
+    # Marking it counted is atomic, so a racing create_application and backfill add it once
+    app = await db[collection].find_one_and_update(
+        {"application_id": application_id, "counted": {"$ne": True}},
+        {"$set": {"counted": True}},
+        projection={"_id": 0, "job_id": 1, "status": 1}
+    )
+    if app is None:
+        return False
+    
+    await db.jobs.update_one(
+        {"job_id": app["job_id"]},
+        {"$inc": {f"application_counts.{app['status']}": 1, "application_counts.total": 1}}
+    )
+    return True
+
+async def backfill_application_counts(employer_id: str):
+    """Seed application_counts on an employer's jobs created before the counters were maintained.
+
+    Counters start at zero and each application is added by count_application, so an
+    application created while this runs is counted exactly once by one side or the other.
+    """
+    missing = await db.jobs.distinct("job_id", {"employer_id": employer_id, "application_counts": {"$exists": False}})
+    if not missing:
+        return
+    
+    await db.jobs.update_many(
+        {"job_id": {"$in": missing}, "application_counts": {"$exists": False}},
+        {"$set": {"application_counts": {"total": 0}}}
+    )
+    # Archived applications still count: live counters are never decremented on archival
+    for collection in ("applications", "applications_archive"):
+        uncounted = await db[collection].distinct(
+            "application_id", {"job_id": {"$in": missing}, "counted": {"$ne": True}}
+        )
+        for application_id in uncounted:
+            await count_application(collection, application_id)
 
-@api_router.put("/applications/{application_id}/status")
-async def update_application_status(
-    application_id: str,
-    status_data: StatusUpdate,
-    current_user: User = Depends(require_auth)
-):
-    """Update application status (employer only)"""
-    app = await db.applications.find_one({"application_id": application_id}, {"_id": 0})
+@api_router.get("/employer/dashboard")
+async def get_employer_dashboard(current_user: User = Depends(require_auth)):
+    """Posted jobs with applicant counts by status, newest applicants and unread messages in one call"""
+    if current_user.user_type != "employer":
+        raise HTTPException(status_code=403, detail="Only employers can access this")
     
-    if not app:
-        raise HTTPException(status_code=404, detail="Application not found")
+    await backfill_application_counts(current_user.user_id)
     
-    if app["employer_id"] != current_user.user_id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    # Per-job counters are read straight off the jobs; one pipeline lists them and totals them
+    jobs_pipeline = [
+        {"$match": {"employer_id": current_user.user_id}},
+        {"$sort": {"created_at": -1}},
+        {"$facet": {
+            "jobs": [
+                {"$limit": DASHBOARD_MAX_JOBS},
+                {"$project": {"_id": 0, "job_id": 1, "title": 1, "status": 1, "city": 1, "created_at": 1, "application_counts": 1}}
+            ],
+            "job_statuses": [
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+            ],
+            "application_statuses": [
+                {"$project": {"counts": {"$objectToArray": {"$ifNull": ["$application_counts", {}]}}}},
+                {"$unwind": "$counts"},
+                {"$group": {"_id": "$counts.k", "count": {"$sum": "$counts.v"}}}
+            ]
+        }}
+    ]
     
-    await db.applications.update_one(
-        {"application_id": application_id},
-        {"$set": {"status": status_data.status}}
+    facets, recent_applicants, unread_messages = await asyncio.gather(
+        db.jobs.aggregate(jobs_pipeline).to_list(1),
+        db.applications.find(
+            {"employer_id": current_user.user_id},
+            {"_id": 0, "application_id": 1, "job_id": 1, "job_title": 1, "job_seeker_id": 1, "job_seeker_name": 1, "status": 1, "created_at": 1}
+        ).sort("created_at", -1).to_list(DASHBOARD_RECENT_APPLICANTS),
+        db.messages.count_documents({"receiver_id": current_user.user_id, "read": False})
     )
+    facets = facets[0] if facets else {"jobs": [], "job_statuses": [], "application_statuses": []}
     
-    return {"message": "Application status updated"}
+    for job in facets["jobs"]:
+        job["application_counts"] = with_status_counts(job.get("application_counts"))
+    
+    return {
+        "jobs": facets["jobs"],
+        "totals": {
+            "jobs": {row["_id"]: row["count"] for row in facets["job_statuses"]},
+            "applications": with_status_counts({row["_id"]: row["count"] for row in facets["application_statuses"]})
+        },
+        "recent_applicants": recent_applicants,
+        "unread_messages": unread_messages
+    }
 
 # ============ Message Endpoints ============
 
-@api_router.post("/messages", response_model=Message)
+@api_router.post("/messages", response_model=Message, dependencies=[Depends(rate_limit("messages"))])
 async def send_message(
     message: MessageCreate,
     current_user: User = Depends(require_auth)
@@ -632,20 +3057,16 @@ async def get_conversation(
     current_user: User = Depends(require_auth)
 ):
     """Get conversation between current user and another user"""
-    messages = await db.messages.find(
-        {
-            "$or": [
-                {"sender_id": current_user.user_id, "receiver_id": user_id},
-                {"sender_id": user_id, "receiver_id": current_user.user_id}
-            ]
-        },
-        {"_id": 0}
-    ).sort("created_at", 1).to_list(500)
+    messages = await conversation_history(current_user.user_id, user_id)
     
-    # Mark messages as read
-    await db.messages.update_many(
-        {"sender_id": user_id, "receiver_id": current_user.user_id, "read": False},
-        {"$set": {"read": True}}
+    # Mark messages as read (batched; only messages that existed when the conversation was opened)
+    opened_at = datetime.now(timezone.utc)
+    write_behind.enqueue(
+        "messages",
+        f"read:{user_id}:{current_user.user_id}",
+        {"sender_id": user_id, "receiver_id": current_user.user_id, "read": False, "created_at": {"$lte": opened_at}},
+        {"read": True},
+        many=True
     )
     
     return [Message(**msg) for msg in messages]
@@ -680,6 +3101,31 @@ async def get_conversations(current_user: User = Depends(require_auth)):
         if msg["receiver_id"] == current_user.user_id and not msg["read"]:
             conversations[partner_id]["unread_count"] += 1
     
+    # Conversations whose messages were all compacted or archived only appear there (never unread);
+    # newest storage first, so the first message seen per partner is the latest
+    async def last_in_buckets(collection: str) -> List[Dict[str, Any]]:
+        buckets = await db[collection].find(
+            {"participants": current_user.user_id},
+            {"_id": 0, "messages": {"$slice": -1}}
+        ).sort("end", -1).limit(200).to_list(200)
+        return [bucket["messages"][0] for bucket in buckets]
+    
+    archived = await db.messages_archive.find(
+        {"$or": [{"sender_id": current_user.user_id}, {"receiver_id": current_user.user_id}]},
+        {"_id": 0, "archived_at": 0}
+    ).sort("created_at", -1).to_list(1000)
+    older = await last_in_buckets("message_buckets") + archived + await last_in_buckets("message_buckets_archive")
+    
+    for msg in older:
+        partner_id = msg["receiver_id"] if msg["sender_id"] == current_user.user_id else msg["sender_id"]
+        if partner_id not in conversations:
+            conversations[partner_id] = {
+                "user_id": partner_id,
+                "last_message": msg["content"],
+                "last_message_time": msg["created_at"],
+                "unread_count": 0
+            }
+    
     # Get user details for all conversation partners in one query (fix N+1 query)
     partner_ids = list(conversations.keys())
     users_cursor = db.users.find(
@@ -704,7 +3150,7 @@ async def get_conversations(current_user: User = Depends(require_auth)):
 
 # ============ Review Endpoints ============
 
-@api_router.post("/reviews", response_model=Review)
+@api_router.post("/reviews", response_model=Review, dependencies=[Depends(rate_limit("reviews"))])
 async def create_review(
     review: ReviewCreate,
     current_user: User = Depends(require_auth)
@@ -739,9 +3185,8 @@ async def get_user_reviews(user_id: str):
     
     return [Review(**rev) for rev in reviews]
 
-@api_router.get("/reviews/stats/{user_id}")
-async def get_review_stats(user_id: str):
-    """Get review statistics for a user"""
+async def compute_review_stats(user_id: str) -> Dict[str, Any]:
+    """Average rating and rating distribution for a user"""
     reviews = await db.reviews.find({"reviewed_id": user_id}, {"_id": 0, "rating": 1}).to_list(1000)
     
     if not reviews:
@@ -764,11 +3209,23 @@ async def get_review_stats(user_id: str):
         "rating_distribution": distribution
     }
 
+@api_router.get("/reviews/stats/{user_id}")
+async def get_review_stats(user_id: str, request: Request, response: Response):
+    """Get review statistics for a user"""
+    stats = await single_flight.do("review_stats", user_id, lambda: compute_review_stats(user_id))
+    
+    not_modified = conditional_response(request, response, "review_stats", make_etag(stats))
+    if not_modified:
+        return not_modified
+    
+    return stats
+
 # ============ Public Posts Endpoints ============
 
 @api_router.post("/posts/publish")
 async def publish_post(current_user: User = Depends(require_auth)):
     """Publish user profile to public feed"""
+    current_user = await full_profile(current_user)
     post_id = f"post_{uuid.uuid4().hex[:12]}"
     now = datetime.now(timezone.utc)
     
@@ -778,11 +3235,13 @@ async def publish_post(current_user: User = Depends(require_auth)):
     )
     
     if existing_post:
-        # Update existing post
+        # Bump existing post; invalidate only once it has landed so no read re-caches the old order
         await db.public_posts.update_one(
-            {"user_id": current_user.user_id},
+            {"post_id": existing_post["post_id"]},
             {"$set": {"updated_at": now}}
         )
+        await feed_cache.invalidate()
+        invalidation_bus.publish("public_posts", current_user.user_id)
         return {"message": "Post updated", "post_id": existing_post["post_id"]}
     
     post_data = {
@@ -805,6 +3264,8 @@ async def publish_post(current_user: User = Depends(require_auth)):
     }
     
     await db.public_posts.insert_one(post_data)
+    await feed_cache.invalidate()
+    invalidation_bus.publish("public_posts", current_user.user_id)
     
     return {"message": "Post published", "post_id": post_id}
 
@@ -819,18 +3280,24 @@ async def unpublish_post(current_user: User = Depends(require_auth)):
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="No active post found")
     
+    await feed_cache.invalidate()
+    invalidation_bus.publish("public_posts", current_user.user_id)
+    
     return {"message": "Post removed from public feed"}
 
-@api_router.get("/posts/public")
+@api_router.get("/posts/public", dependencies=[Depends(rate_limit("search", by_user=False, query_param="search"))])
 async def get_public_posts(
     profession: Optional[str] = None,
     city: Optional[str] = None,
     user_type: Optional[str] = None,
     search: Optional[str] = None,
     skip: int = 0,
-    limit: int = 50
+    limit: int = 50,
+    fields: Optional[str] = None,
+    view: str = "full"
 ):
-    """Get all public posts with filters"""
+    """Get all public posts with filters (`view=card` or `fields=a,b` for compact payloads)"""
+    projection, model = resolve_projection(PublicPost, PublicPostCard, "post_id", fields, view)
     query: Dict[str, Any] = {"status": "active"}
     
     if profession:
@@ -850,12 +3317,20 @@ async def get_public_posts(
             {"skills": {"$regex": search, "$options": "i"}}
         ]
     
-    posts = await db.public_posts.find(
-        query,
-        {"_id": 0}
-    ).sort("updated_at", -1).skip(skip).limit(limit).to_list(limit)
+    def load():
+        return db_read.public_posts.find(
+            query,
+            projection
+        ).sort("updated_at", -1).skip(skip).limit(limit).to_list(limit)
+    
+    # Free-text searches are too varied to cache; filter combinations on early pages repeat
+    if search or skip >= FEED_CACHE_MAX_SKIP:
+        posts = await load()
+    else:
+        key = json.dumps([profession, city, user_type, skip, limit, projection], sort_keys=True)
+        posts = await feed_cache.get_or_load(key, load)
     
-    return posts
+    return project_documents(posts, model)
 
 @api_router.get("/posts/my-status")
 async def get_my_post_status(current_user: User = Depends(require_auth)):
@@ -871,17 +3346,437 @@ async def get_my_post_status(current_user: User = Depends(require_auth)):
     }
 
 @api_router.get("/posts/professions")
-async def get_all_professions():
+async def get_all_professions(request: Request, response: Response):
     """Get list of all unique professions"""
-    professions = await db.public_posts.distinct(
+    professions = await db_read.public_posts.distinct(
         "profession",
         {"status": "active", "profession": {"$ne": None, "$ne": ""}}
     )
+    professions = sorted(professions)
+    
+    not_modified = conditional_response(request, response, "professions", make_etag(professions))
+    if not_modified:
+        return not_modified
+    
+    return professions
+
+# ============ Ad Image Uploads ============
+
+AD_IMAGE_DIR = Path(os.environ.get("AD_IMAGE_DIR", str(ROOT_DIR / "uploads" / "ads")))
+# Public URL the variants are served under (point at a CDN fronting AD_IMAGE_DIR in production)
+AD_IMAGE_URL_PREFIX = os.environ.get("AD_IMAGE_URL_PREFIX", "/api/media/ads").rstrip("/")
+AD_IMAGE_MAX_BYTES = int(os.environ.get("AD_IMAGE_MAX_BYTES", str(5 * 1024 * 1024)))
+AD_IMAGE_MAX_PIXELS = int(os.environ.get("AD_IMAGE_MAX_PIXELS", str(40_000_000)))
+AD_IMAGE_WORKERS = int(os.environ.get("AD_IMAGE_WORKERS", "2"))
+# Longest edge per variant, in pixels
+AD_IMAGE_VARIANTS = {"thumb": 160, "feed": 640, "full": 1600}
+# Allowance for multipart boundaries and part headers when checking Content-Length
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+
+_image_pool = None
+
+def image_pool():
+    """Process pool for image decoding/resizing, kept off the event loop and out of the GIL"""
+    global _image_pool
+    if _image_pool is None:
+        from concurrent.futures import ProcessPoolExecutor
+        _image_pool = ProcessPoolExecutor(max_workers=AD_IMAGE_WORKERS)
+    return _image_pool
+
+def shutdown_image_pool():
+    global _image_pool
+    if _image_pool is not None:
+        _image_pool.shutdown(wait=False, cancel_futures=True)
+        _image_pool = None
+
+async def receive_upload(request: Request, field: str, destination: Path, max_bytes: int) -> str:
+    """Stream one multipart file field to `destination` chunk by chunk; returns its sha256 hex digest"""
+    from python_multipart.multipart import MultipartParser, parse_options_header
+    
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data")
+    
+    # Reject oversized bodies before reading a byte when the client declares the length
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes + MULTIPART_OVERHEAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Image exceeds {max_bytes} bytes")
+    
+    part: Dict[str, Any] = {"headers": {}, "name": b"", "value": b"", "active": False}
+    state = {"found": False, "size": 0}
+    pending: List[bytes] = []
+    digest = hashlib.sha256()
+    
+    def on_part_begin():
+        part.update(headers={}, name=b"", value=b"", active=False)
+    
+    def on_header_field(data: bytes, start: int, end: int):
+        part["name"] += data[start:end]
+    
+    def on_header_value(data: bytes, start: int, end: int):
+        part["value"] += data[start:end]
+    
+    def on_header_end():
+        part["headers"][part["name"].lower()] = part["value"]
+        part.update(name=b"", value=b"")
+    
+    def on_headers_finished():
+        _, disposition = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        part["active"] = (
+            not state["found"]
+            and disposition.get(b"name") == field.encode()
+            and b"filename" in disposition
+        )
+    
+    def on_part_data(data: bytes, start: int, end: int):
+        if part["active"]:
+            pending.append(data[start:end])
+    
+    def on_part_end():
+        if part["active"]:
+            state["found"] = True
+            part["active"] = False
+    
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    
+    with open(destination, "wb") as out:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if not pending:
+                continue
+            data = b"".join(pending)
+            pending.clear()
+            state["size"] += len(data)
+            if state["size"] > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Image exceeds {max_bytes} bytes")
+            digest.update(data)
+            await asyncio.to_thread(out.write, data)
+        parser.finalize()
+    
+    if not state["found"] or not state["size"]:
+        raise HTTPException(status_code=400, detail=f"Missing file field '{field}'")
+    return digest.hexdigest()
+
+def render_ad_image(source: str, target_dir: str, stem: str) -> Dict[str, str]:
+    """Decode an uploaded image and write one JPEG per AD_IMAGE_VARIANTS entry (runs in a worker process)"""
+    from PIL import Image, ImageOps
+    
+    Image.MAX_IMAGE_PIXELS = AD_IMAGE_MAX_PIXELS
+    try:
+        with Image.open(source) as original:
+            if original.format not in ("JPEG", "PNG", "WEBP", "GIF"):
+                raise ValueError(f"Unsupported image format: {original.format}")
+            image = ImageOps.exif_transpose(original)
+            if image.mode in ("RGBA", "LA", "P"):
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            else:
+                image = image.convert("RGB")
+    except (OSError, Image.DecompressionBombError):
+        raise ValueError("Not a valid image")
+    
+    files = {}
+    for variant, edge in AD_IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((edge, edge), Image.LANCZOS)
+        name = f"{stem}_{variant}.jpg"
+        resized.save(Path(target_dir) / name, "JPEG", quality=85, optimize=True, progressive=True)
+        files[variant] = name
+    return files
+
+def remove_ad_images(images: Optional[Dict[str, str]], keep: Optional[Dict[str, str]] = None):
+    """Delete variant files no longer referenced by an ad"""
+    kept = set((keep or {}).values())
+    for url in (images or {}).values():
+        if url not in kept:
+            (AD_IMAGE_DIR / url.rsplit("/", 1)[-1]).unlink(missing_ok=True)
+
+class ImmutableStaticFiles(StaticFiles):
+    """Variant names embed a content hash, so responses never need revalidation"""
+    
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+# ============ Ad Event Tracking ============
+
+AD_EVENT_TYPES = {"impression": "impressions", "click": "clicks"}
+# Events clients may report through /ads/events
+CLIENT_AD_EVENTS = {"click"}
+AD_EVENTS_FLUSH_INTERVAL = float(os.environ.get("AD_EVENTS_FLUSH_INTERVAL_SECONDS", "5"))
+AD_EVENTS_MAX_PENDING = int(os.environ.get("AD_EVENTS_MAX_PENDING", "5000"))
+AD_EVENTS_MAX_BATCH = int(os.environ.get("AD_EVENTS_MAX_BATCH", "100"))
+# Client timestamps further off than this (queued offline, bad clocks) are counted as "now"
+AD_EVENTS_MAX_SKEW = timedelta(hours=int(os.environ.get("AD_EVENTS_MAX_SKEW_HOURS", "24")))
+AD_STATS_RETENTION_DAYS = int(os.environ.get("AD_STATS_RETENTION_DAYS", "400"))
+
+metrics.counter("ad_events_total", "Ad events accepted into the in-memory aggregator by event")
+metrics.counter("ad_events_dropped_total", "Ad events discarded by reason")
+metrics.counter("ad_stats_flushed_total", "Per-minute ad counter upserts written with bulk_write")
+metrics.counter("ad_stats_flush_failures_total", "Failed ad counter flushes")
+metrics.gauge("ad_events_pending", "Per-ad per-minute counters waiting to be flushed")
+
+class AdEventAggregator(PeriodicFlusher):
+    """Sum impression/click events per (ad, minute) in memory and flush them as `$inc` upserts.
+
+    Recording is a dict update, so the ingestion endpoint never waits on MongoDB.
+    Counters are flushed every AD_EVENTS_FLUSH_INTERVAL, early once
+    AD_EVENTS_MAX_PENDING minutes are waiting, and once more on shutdown.
+    Each worker flushes its own counters; `$inc` makes their writes additive.
+    """
+    
+    def __init__(self, interval: float = AD_EVENTS_FLUSH_INTERVAL, max_pending: int = AD_EVENTS_MAX_PENDING):
+        super().__init__(interval)
+        self.max_pending = max_pending
+        self.pending: Dict[Tuple[str, datetime], Dict[str, int]] = {}
+    
+    def record(self, ad_id: str, event: str, at: Optional[datetime] = None, count: int = 1) -> bool:
+        now = datetime.now(timezone.utc)
+        at = as_utc(at) if at else now
+        if abs(now - at) > AD_EVENTS_MAX_SKEW:
+            at = now
+        key = (ad_id, at.replace(second=0, microsecond=0))
+        
+        counters = self.pending.get(key)
+        if counters is None:
+            # Past this point MongoDB is not keeping up; shed load instead of growing without bound
+            if len(self.pending) >= self.max_pending * 10:
+                metrics.inc("ad_events_dropped_total", {"reason": "backlog"}, count)
+                return False
+            counters = self.pending[key] = {}
+            if len(self.pending) >= self.max_pending:
+                self.wakeup.set()
+        
+        field = AD_EVENT_TYPES[event]
+        counters[field] = counters.get(field, 0) + count
+        metrics.inc("ad_events_total", {"event": event}, count)
+        return True
+    
+    def merge(self, pending: Dict[Tuple[str, datetime], Dict[str, int]]):
+        """Add counters back for the next flush"""
+        for key, counters in pending.items():
+            merged = self.pending.setdefault(key, {})
+            for field, count in counters.items():
+                merged[field] = merged.get(field, 0) + count
     
-    return sorted(professions)
+    async def flush(self):
+        pending, self.pending = self.pending, {}
+        if not pending:
+            return
+        try:
+            await self.write(pending)
+        except asyncio.CancelledError:
+            # Cancelled mid-flush: keep the counters rather than drop them (at-least-once, like a failed write)
+            self.merge(pending)
+            raise
+    
+    async def write(self, pending: Dict[Tuple[str, datetime], Dict[str, int]]):
+        # One lookup per flush keeps made-up ad ids out of ad_stats without touching the request path
+        known = set(await db.advertisements.distinct("ad_id", {"ad_id": {"$in": list({ad_id for ad_id, _ in pending})}}))
+        unknown = [key for key in pending if key[0] not in known]
+        for key in unknown:
+            metrics.inc("ad_events_dropped_total", {"reason": "unknown_ad"}, sum(pending.pop(key).values()))
+        
+        keys = list(pending)
+        operations = [
+            UpdateOne(
+                {"ad_id": ad_id, "minute": minute},
+                {"$inc": pending[(ad_id, minute)]},
+                upsert=True
+            )
+            for ad_id, minute in keys
+        ]
+        if not operations:
+            return
+        
+        try:
+            await db.ad_stats.bulk_write(operations, ordered=False)
+            metrics.inc("ad_stats_flushed_total", value=len(operations))
+        except BulkWriteError as e:
+            # Only the failed upserts (e.g. two workers racing to create a minute) are retried
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            metrics.inc("ad_stats_flushed_total", value=len(operations) - len(failed))
+            metrics.inc("ad_stats_flush_failures_total")
+            self.merge({keys[index]: pending[keys[index]] for index in failed})
+        except Exception as e:
+            # Nothing is known to have been applied, so everything is retried (at-least-once)
+            logger.error(f"Ad stats flush failed: {e}")
+            metrics.inc("ad_stats_flush_failures_total")
+            self.merge(pending)
+        finally:
+            metrics.set("ad_events_pending", len(self.pending))
+    
+    def has_pending(self) -> bool:
+        return bool(self.pending)
+
+ad_events = AdEventAggregator()
+
+# ============ Ad Selection ============
+
+AD_INDEX_TTL = float(os.environ.get("AD_INDEX_TTL_SECONDS", "60"))
+AD_SERVE_MAX_COUNT = int(os.environ.get("AD_SERVE_MAX_COUNT", "10"))
+# Default impressions of one ad per viewer per window; ads can override with frequency_cap
+AD_FREQUENCY_CAP = int(os.environ.get("AD_FREQUENCY_CAP", "5"))
+AD_FREQUENCY_WINDOW = float(os.environ.get("AD_FREQUENCY_WINDOW_HOURS", "24")) * 3600
+AD_FREQUENCY_MAX_VIEWERS = int(os.environ.get("AD_FREQUENCY_MAX_VIEWERS", "200000"))
+# Share of a daily budget an ad may run ahead of an even spread across the (UTC) day
+AD_PACING_HEADROOM = float(os.environ.get("AD_PACING_HEADROOM", "0.05"))
+
+metrics.counter("ads_served_total", "Ads returned by /api/ads/serve")
+metrics.counter("ad_selection_skipped_total", "Eligible ads left out of a selection by reason")
+
+class AdSelector:
+    """Pick the ads to display from an in-memory index of servable ads.
+
+    The index holds active, in-date ads (without inline images) grouped by
+    location. It is rebuilt every AD_INDEX_TTL or after an advertisements
+    invalidation. Selection is priority-weighted sampling without replacement
+    over ads that are under their per-viewer frequency cap and on pace for
+    their daily impression budget. Every ad returned counts as an impression.
+
+    Frequency counts live in this worker; budget spend is reloaded from ad_stats
+    with the index, so with several workers both are approximate between refreshes.
+    """
+    
+    def __init__(self, ttl: float = AD_INDEX_TTL):
+        self.ttl = ttl
+        self.ads: List[Dict[str, Any]] = []
+        self.by_location: Dict[str, List[Dict[str, Any]]] = {}
+        self.spent: Dict[str, int] = {}
+        self.day: Optional[datetime] = None
+        self.loaded_at = 0.0
+        self.version = 0
+        self.loaded_version = -1
+        self.views: OrderedDict = OrderedDict()
+        self.rng = random.Random()
+    
+    async def ensure_loaded(self):
+        if self.loaded_version == self.version and time.monotonic() - self.loaded_at < self.ttl:
+            return
+        await single_flight.do("ad_index", "all", self.load)
+    
+    async def load(self):
+        version = self.version
+        now = datetime.now(timezone.utc)
+        ads = await db_read.advertisements.find(
+            {
+                "status": "active",
+                "$and": [
+                    {"$or": [{"start_date": None}, {"start_date": {"$lte": now}}]},
+                    {"$or": [{"end_date": None}, {"end_date": {"$gt": now}}]}
+                ]
+            },
+            {"_id": 0, "image_base64": 0}
+        ).to_list(None)
+        
+        by_location: Dict[str, List[Dict[str, Any]]] = {}
+        for ad in ads:
+            by_location.setdefault(ad.get("location") or "all", []).append(ad)
+        # Ads for "all" are candidates everywhere
+        everywhere = by_location.get("all", [])
+        for location, located in by_location.items():
+            if location != "all":
+                located.extend(everywhere)
+        
+        day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        budgeted = {ad["ad_id"] for ad in ads if ad.get("daily_budget")}
+        spent: Dict[str, int] = {}
+        if budgeted:
+            rows = await db_read.ad_stats.aggregate([
+                {"$match": {"ad_id": {"$in": list(budgeted)}, "minute": {"$gte": day}}},
+                {"$group": {"_id": "$ad_id", "impressions": {"$sum": "$impressions"}}}
+            ]).to_list(None)
+            spent = {row["_id"]: row["impressions"] for row in rows}
+            # Impressions this worker recorded but has not flushed yet
+            for (ad_id, minute), counters in ad_events.pending.items():
+                if ad_id in budgeted and minute >= day:
+                    spent[ad_id] = spent.get(ad_id, 0) + counters.get("impressions", 0)
+        
+        self.ads, self.by_location, self.spent, self.day = ads, by_location, spent, day
+        self.loaded_at = time.monotonic()
+        self.loaded_version = version
+    
+    def on_invalidation(self, ad_id: Optional[str]):
+        self.version += 1
+    
+    def paced_out(self, ad: Dict[str, Any], now: datetime) -> bool:
+        budget = ad.get("daily_budget")
+        if not budget:
+            return False
+        spent = self.spent.get(ad["ad_id"], 0)
+        elapsed = (now - self.day).total_seconds() / 86400
+        # Spread the budget evenly over the day instead of burning it in the morning peak
+        return spent >= budget or spent >= budget * (elapsed + AD_PACING_HEADROOM)
+    
+    def capped(self, ad: Dict[str, Any], viewer: str, now: float) -> bool:
+        seen = self.views.get((viewer, ad["ad_id"]))
+        if seen is None or now - seen[1] > AD_FREQUENCY_WINDOW:
+            return False
+        return seen[0] >= (ad.get("frequency_cap") or AD_FREQUENCY_CAP)
+    
+    def record_view(self, ad_id: str, viewer: str, now: float):
+        key = (viewer, ad_id)
+        count, started = self.views.pop(key, (0, now))
+        if now - started > AD_FREQUENCY_WINDOW:
+            count, started = 0, now
+        self.views[key] = (count + 1, started)
+        if len(self.views) > AD_FREQUENCY_MAX_VIEWERS:
+            self.views.popitem(last=False)
+    
+    async def select(self, location: Optional[str], viewer: str, count: int) -> List[Dict[str, Any]]:
+        await self.ensure_loaded()
+        now = datetime.now(timezone.utc)
+        if self.day != now.replace(hour=0, minute=0, second=0, microsecond=0):
+            # New UTC day: budgets start over
+            self.spent, self.day = {}, now.replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        if not location or location == "all":
+            candidates = self.ads
+        else:
+            candidates = self.by_location.get(location, self.by_location.get("all", []))
+        
+        clock = time.monotonic()
+        weighted = []
+        for ad in candidates:
+            if ad.get("end_date") and as_utc(ad["end_date"]) <= now:
+                continue
+            if self.capped(ad, viewer, clock):
+                metrics.inc("ad_selection_skipped_total", {"reason": "frequency_cap"})
+                continue
+            if self.paced_out(ad, now):
+                metrics.inc("ad_selection_skipped_total", {"reason": "pacing"})
+                continue
+            # Efraimidis-Spirakis keys: top-k of u^(1/w) is a weighted sample without replacement
+            weight = 1 + max(0, ad.get("priority") or 0)
+            weighted.append((self.rng.random() ** (1 / weight), ad))
+        
+        chosen = [ad for _, ad in heapq.nlargest(count, weighted, key=lambda pair: pair[0])]
+        for ad in chosen:
+            self.record_view(ad["ad_id"], viewer, clock)
+            self.spent[ad["ad_id"]] = self.spent.get(ad["ad_id"], 0) + 1
+            ad_events.record(ad["ad_id"], "impression")
+        metrics.inc("ads_served_total", value=len(chosen))
+        return chosen
+
+ad_selector = AdSelector()
+invalidation_bus.subscribe("advertisements", ad_selector.on_invalidation)
 
 # ============ Advertisement Endpoints ============
 
+# $dateToString formats that truncate ad_stats minutes to each reporting period
+AD_STATS_GRANULARITY = {"hour": "%Y-%m-%dT%H:00:00Z", "day": "%Y-%m-%d"}
+
 @api_router.post("/ads", response_model=Advertisement)
 async def create_advertisement(
     ad: AdvertisementCreate,
@@ -901,17 +3796,21 @@ async def create_advertisement(
     }
     
     await db.advertisements.insert_one(ad_data)
+    invalidation_bus.publish("advertisements", ad_id)
     
     return Advertisement(**ad_data)
 
-@api_router.get("/ads", response_model=List[Advertisement])
+@api_router.get("/ads")
 async def get_advertisements(
     location: Optional[str] = None,
     status: str = "active",
     skip: int = 0,
-    limit: int = 20
+    limit: int = 20,
+    fields: Optional[str] = None,
+    view: str = "full"
 ):
-    """Get all advertisements with filters"""
+    """Get all advertisements with filters (`view=card` or `fields=a,b` to skip image payloads)"""
+    projection, model = resolve_projection(Advertisement, AdvertisementCard, "ad_id", fields, view)
     query: Dict[str, Any] = {"status": status}
     
     # Check if ad is within date range
@@ -938,12 +3837,95 @@ async def get_advertisements(
             {"$or": [{"location": location}, {"location": "all"}]}
         ]
     
-    ads = await db.advertisements.find(
+    ads = await db_read.advertisements.find(
         {"status": status},
-        {"_id": 0}
+        projection
     ).sort("priority", -1).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
     
-    return [Advertisement(**ad) for ad in ads]
+    return project_documents(ads, model)
+
+@api_router.post("/ads/events", status_code=202, dependencies=[Depends(rate_limit("ad_events", by_user=False))])
+async def track_ad_events(batch: AdEventBatch):
+    """Record a batch of clicks; counters are aggregated in memory and flushed in the background"""
+    if len(batch.events) > AD_EVENTS_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {AD_EVENTS_MAX_BATCH} events per request")
+    
+    accepted = 0
+    for event in batch.events:
+        # /ads/serve already counted the impression; accepting client ones would double count
+        if event.event not in CLIENT_AD_EVENTS:
+            metrics.inc("ad_events_dropped_total", {"reason": "invalid"})
+            continue
+        accepted += ad_events.record(event.ad_id, event.event, event.at)
+    
+    return {"accepted": accepted}
+
+@api_router.get("/ads/{ad_id}/stats")
+async def get_advertisement_stats(
+    ad_id: str,
+    granularity: str = "day",
+    days: int = 30,
+    current_user: User = Depends(require_auth)
+):
+    """Impressions, clicks and CTR for an ad (owner only), totals plus a series by hour or day"""
+    if granularity not in AD_STATS_GRANULARITY:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(AD_STATS_GRANULARITY)}")
+    
+    ad = await db.advertisements.find_one({"ad_id": ad_id}, {"_id": 0, "created_by": 1})
+    
+    if not ad:
+        raise HTTPException(status_code=404, detail="Advertisement not found")
+    
+    if ad["created_by"] != current_user.user_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    since = datetime.now(timezone.utc) - timedelta(days=max(1, min(days, AD_STATS_RETENTION_DAYS)))
+    rows = await db_read.ad_stats.aggregate([
+        {"$match": {"ad_id": ad_id, "minute": {"$gte": since}}},
+        {"$group": {
+            "_id": {"$dateToString": {"format": AD_STATS_GRANULARITY[granularity], "date": "$minute"}},
+            "impressions": {"$sum": "$impressions"},
+            "clicks": {"$sum": "$clicks"}
+        }},
+        {"$sort": {"_id": 1}}
+    ]).to_list(None)
+    
+    def with_ctr(impressions: int, clicks: int) -> Dict[str, Any]:
+        return {
+            "impressions": impressions,
+            "clicks": clicks,
+            "ctr": round(clicks / impressions, 4) if impressions else 0.0
+        }
+    
+    return {
+        "ad_id": ad_id,
+        "since": since,
+        "totals": with_ctr(sum(row["impressions"] for row in rows), sum(row["clicks"] for row in rows)),
+        "series": [{"period": row["_id"], **with_ctr(row["impressions"], row["clicks"])} for row in rows]
+    }
+
+@api_router.get("/ads/serve", response_model=List[ServedAdvertisement])
+async def serve_advertisements(
+    request: Request,
+    location: Optional[str] = None,
+    count: int = 3,
+    current_user: Optional[User] = Depends(get_current_user)
+):
+    """Ads to display now for a location, already counted as impressions (clients report only clicks)"""
+    viewer = f"user:{current_user.user_id}" if current_user else f"ip:{client_ip(request)}"
+    ads = await ad_selector.select(location, viewer, max(0, min(count, AD_SERVE_MAX_COUNT)))
+    
+    # The index leaves inline images out; fetch them only for legacy ads that have no variants
+    legacy = [ad["ad_id"] for ad in ads if not ad.get("images")]
+    inline = {}
+    if legacy:
+        docs = await db_read.advertisements.find(
+            {"ad_id": {"$in": legacy}},
+            {"_id": 0, "ad_id": 1, "image_base64": 1}
+        ).to_list(len(legacy))
+        inline = {doc["ad_id"]: doc.get("image_base64") for doc in docs}
+    
+    return [ServedAdvertisement(**ad, image_base64=inline.get(ad["ad_id"])) for ad in ads]
 
 @api_router.get("/ads/my", response_model=List[Advertisement])
 async def get_my_advertisements(current_user: User = Depends(require_auth)):
@@ -956,13 +3938,21 @@ async def get_my_advertisements(current_user: User = Depends(require_auth)):
     return [Advertisement(**ad) for ad in ads]
 
 @api_router.get("/ads/{ad_id}", response_model=Advertisement)
-async def get_advertisement(ad_id: str):
+async def get_advertisement(ad_id: str, request: Request, response: Response):
     """Get advertisement by ID"""
     ad = await db.advertisements.find_one({"ad_id": ad_id}, {"_id": 0})
     
     if not ad:
         raise HTTPException(status_code=404, detail="Advertisement not found")
     
+    not_modified = conditional_response(
+        request, response, "ad",
+        make_etag(ad["ad_id"], ad["updated_at"]),
+        ad["updated_at"]
+    )
+    if not_modified:
+        return not_modified
+    
     return Advertisement(**ad)
 
 @api_router.put("/ads/{ad_id}", response_model=Advertisement)
@@ -987,6 +3977,52 @@ async def update_advertisement(
         {"ad_id": ad_id},
         {"$set": update_data}
     )
+    invalidation_bus.publish("advertisements", ad_id)
+    
+    updated_ad = await db.advertisements.find_one({"ad_id": ad_id}, {"_id": 0})
+    
+    return Advertisement(**updated_ad)
+
+@api_router.post("/ads/{ad_id}/image", response_model=Advertisement)
+async def upload_advertisement_image(
+    ad_id: str,
+    request: Request,
+    current_user: User = Depends(require_auth)
+):
+    """Stream an ad image (multipart field `image`) to disk and attach thumb/feed/full variants"""
+    ad = await db.advertisements.find_one({"ad_id": ad_id}, {"_id": 0})
+    
+    if not ad:
+        raise HTTPException(status_code=404, detail="Advertisement not found")
+    
+    if ad["created_by"] != current_user.user_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    AD_IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+    upload = AD_IMAGE_DIR / f".upload_{uuid.uuid4().hex}"
+    try:
+        digest = await receive_upload(request, "image", upload, AD_IMAGE_MAX_BYTES)
+        try:
+            files = await asyncio.get_running_loop().run_in_executor(
+                image_pool(), render_ad_image, str(upload), str(AD_IMAGE_DIR), f"{ad_id}_{digest[:16]}"
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        upload.unlink(missing_ok=True)
+    
+    images = {variant: f"{AD_IMAGE_URL_PREFIX}/{name}" for variant, name in files.items()}
+    
+    # Variants replace any inline base64 image so list payloads stay small
+    await db.advertisements.update_one(
+        {"ad_id": ad_id},
+        {
+            "$set": {"images": images, "updated_at": datetime.now(timezone.utc)},
+            "$unset": {"image_base64": ""}
+        }
+    )
+    invalidation_bus.publish("advertisements", ad_id)
+    remove_ad_images(ad.get("images"), keep=images)
     
     updated_ad = await db.advertisements.find_one({"ad_id": ad_id}, {"_id": 0})
     
@@ -1007,6 +4043,8 @@ async def delete_advertisement(
         raise HTTPException(status_code=403, detail="Not authorized")
     
     await db.advertisements.delete_one({"ad_id": ad_id})
+    invalidation_bus.publish("advertisements", ad_id)
+    remove_ad_images(ad.get("images"))
     
     return {"message": "Advertisement deleted"}
 
@@ -1027,20 +4065,384 @@ async def join(sid, data):
         sio.enter_room(sid, user_id)
         logger.info(f"User {user_id} joined room")
 
-# Include the router in the main app
-app.include_router(api_router)
-
-# Mount Socket.IO
-socket_app = socketio.ASGIApp(sio, app)
+# ============ Response Compression ============
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
+COMPRESSION_MINIMUM_SIZE = int(os.environ.get("COMPRESSION_MINIMUM_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_CONTENT_TYPES = tuple(
+    t.strip() for t in os.environ.get(
+        "COMPRESSION_CONTENT_TYPES",
+        "application/json,text/,application/javascript,image/svg+xml"
+    ).split(",") if t.strip()
 )
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+class GzipCompressor:
+    def __init__(self, level: int):
+        # wbits=31 writes a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+    
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+    
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+class BrotliCompressor:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+    
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+    
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+    
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+class CompressionMiddleware:
+    """Compress responses with brotli or gzip.
+
+    Responses below `minimum_size`, outside the content-type allowlist, already
+    encoded or without a body pass through untouched. Streaming responses are
+    compressed chunk by chunk and flushed so clients still see data as it is sent.
+    """
+    
+    def __init__(
+        self,
+        app,
+        minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+        gzip_level: int = COMPRESSION_GZIP_LEVEL,
+        brotli_quality: int = COMPRESSION_BROTLI_QUALITY,
+        content_types: Tuple[str, ...] = COMPRESSION_CONTENT_TYPES
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.content_types = content_types
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        encoding = self.choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+        
+        responder = CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+    
+    def choose_encoding(self, accept_encoding: str) -> Optional[str]:
+        """Pick brotli or gzip from an Accept-Encoding header, honouring q=0"""
+        accepted = {}
+        for item in accept_encoding.lower().split(","):
+            name, _, params = item.strip().partition(";")
+            quality = 1.0
+            if params.strip().startswith("q="):
+                try:
+                    quality = float(params.strip()[2:])
+                except ValueError:
+                    quality = 0.0
+            accepted[name.strip()] = quality
+        
+        if brotli is not None and accepted.get("br", 0) > 0:
+            return "br"
+        if accepted.get("gzip", 0) > 0:
+            return "gzip"
+        return None
+    
+    def make_compressor(self, encoding: str):
+        if encoding == "br":
+            return BrotliCompressor(self.brotli_quality)
+        return GzipCompressor(self.gzip_level)
+    
+    def is_compressible(self, headers: MutableHeaders) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return any(content_type.startswith(allowed) for allowed in self.content_types)
+
+class CompressionResponder:
+    """Per-request send wrapper that decides on compression at the first body chunk"""
+    
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send_downstream = send
+        self.start_message = None
+        self.compressor = None
+        self.passthrough = False
+    
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        
+        if message["type"] != "http.response.body":
+            await self.send_downstream(message)
+            return
+        
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        
+        if self.passthrough:
+            await self.send_downstream(message)
+            return
+        
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            status = self.start_message["status"]
+            declared_length = headers.get("content-length")
+            
+            too_small = (
+                len(body) < self.middleware.minimum_size
+                if not more_body
+                else declared_length is not None and int(declared_length) < self.middleware.minimum_size
+            )
+            if status < 200 or status in (204, 304) or too_small or not self.middleware.is_compressible(headers):
+                self.passthrough = True
+                await self.send_downstream(self.start_message)
+                await self.send_downstream(message)
+                return
+            
+            self.compressor = self.middleware.make_compressor(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            
+            if not more_body:
+                # Whole body is in hand: compress once and send a sized response
+                compressed = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(compressed))
+                await self.send_downstream(self.start_message)
+                await self.send_downstream({"type": "http.response.body", "body": compressed})
+                return
+            
+            # Streaming: the final length is unknown, fall back to chunked transfer
+            del headers["Content-Length"]
+            await self.send_downstream(self.start_message)
+        
+        if more_body:
+            chunk = self.compressor.compress(body) + self.compressor.flush()
+        else:
+            chunk = self.compressor.compress(body) + self.compressor.finish()
+        
+        await self.send_downstream({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+# ============ Request Metrics ============
+
+class MetricsMiddleware:
+    """Record latency, status and MongoDB usage per route template"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = {"code": 500}
+        stats = {"count": 0, "duration": 0.0, "scope": scope}
+        token = request_db_stats.set(stats)
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+        
+        metrics.inc("http_requests_in_flight")
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.inc("http_requests_in_flight", value=-1)
+            request_db_stats.reset(token)
+            
+            # Label by route template, never the raw path, to keep cardinality bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            labels = {"method": scope["method"], "route": route_path}
+            
+            metrics.inc("http_requests_total", {**labels, "status": str(status["code"])})
+            metrics.observe("http_request_duration_seconds", elapsed, labels)
+            metrics.observe("http_request_mongo_commands", stats["count"], {"route": route_path})
+            metrics.observe("http_request_mongo_seconds", stats["duration"], {"route": route_path})
+
+@root_router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@api_router.get("/debug/slow-queries", dependencies=[Depends(require_admin)])
+async def get_slow_queries():
+    """Aggregated slow query report (PROFILING_ENABLED only)"""
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    
+    return slow_query_log.report()
+
+@api_router.delete("/debug/slow-queries", dependencies=[Depends(require_admin)])
+async def reset_slow_queries():
+    """Clear the slow query report (PROFILING_ENABLED only)"""
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    
+    slow_query_log.reset()
+    return {"message": "Slow query log cleared"}
+
+# ============ Health ============
+
+@root_router.get("/health", include_in_schema=False)
+async def health():
+    """Liveness plus connection pool utilization and checkout wait times"""
+    start = time.perf_counter()
+    try:
+        await db.command("ping")
+        database = {"status": "ok", "ping_ms": round((time.perf_counter() - start) * 1000, 3)}
+    except Exception as e:
+        database = {"status": "unavailable", "error": str(e)}
+    
+    body = {
+        "status": "ok" if database["status"] == "ok" else "degraded",
+        "database": database,
+        "pool": pool_monitor.report(),
+        "client_options": MONGO_CLIENT_OPTIONS,
+        "listing_read_preference": LISTING_READ_PREFERENCE.mongos_mode
+    }
+    return JSONResponse(body, status_code=200 if database["status"] == "ok" else 503)
+
+# (collection, keys, options) created at startup; create_index is a no-op when it already exists
+INDEXES = [
+    ("user_sessions", "session_token", {"unique": True}),
+    ("user_sessions", "sid", {}),
+    ("user_sessions", "expires_at", {"expireAfterSeconds": 0}),
+    ("user_sessions", [("user_id", 1), ("expires_at", -1)], {}),
+]
+
+if RATE_LIMIT_BACKEND == "mongo":
+    INDEXES.append(("rate_limits", "expires_at", {"expireAfterSeconds": 0}))
+
+# Lifecycle scans plus the bucket/archive lookups behind job detail, job applications and conversations
+INDEXES += [
+    ("jobs", [("status", 1), ("updated_at", 1)], {}),
+    ("applications", "created_at", {}),
+    ("messages", "created_at", {}),
+    ("jobs_archive", "job_id", {"unique": True}),
+    ("applications_archive", [("job_id", 1), ("created_at", -1)], {}),
+    ("applications_archive", [("job_seeker_id", 1), ("created_at", -1)], {}),
+    ("messages_archive", [("sender_id", 1), ("receiver_id", 1), ("created_at", 1)], {}),
+    ("message_buckets", "bucket_id", {"unique": True}),
+    ("message_buckets", [("conversation", 1), ("start", 1)], {}),
+    ("message_buckets", [("participants", 1), ("end", -1)], {}),
+    ("message_buckets", "messages.message_id", {}),
+    ("message_buckets", "end", {}),
+    ("message_buckets_archive", [("conversation", 1), ("start", 1)], {}),
+    ("message_buckets_archive", [("participants", 1), ("end", -1)], {}),
+    ("messages_archive", [("receiver_id", 1), ("created_at", -1)], {}),
+]
+
+# Employer dashboard badges, the seeker's changed-since application feed and notifications
+INDEXES += [
+    ("applications", [("employer_id", 1), ("created_at", -1)], {}),
+    ("messages", [("receiver_id", 1), ("read", 1)], {}),
+    ("applications", [("job_seeker_id", 1), ("updated_at", 1)], {}),
+    ("notifications", [("user_id", 1), ("created_at", -1)], {}),
+    ("notifications", "application_id", {}),
+    ("notifications", "created_at", {"expireAfterSeconds": NOTIFICATION_RETENTION_DAYS * 86400}),
+]
+
+INDEXES += [
+    ("ad_stats", [("ad_id", 1), ("minute", 1)], {"unique": True}),
+    ("ad_stats", "minute", {"expireAfterSeconds": AD_STATS_RETENTION_DAYS * 86400}),
+]
+
+if CACHE_BACKEND == "mongo":
+    INDEXES.append(("cache_entries", "expires_at", {"expireAfterSeconds": 0}))
+    INDEXES.append(("cache_entries", "namespace", {}))
+
+if SESSION_TOKEN_MODE == "jwt":
+    INDEXES.append(("revoked_tokens", "jti", {"unique": True}))
+    INDEXES.append(("revoked_tokens", "expires_at", {"expireAfterSeconds": 0}))
+
+INDEXES += [
+    ("background_tasks", "task_id", {"unique": True}),
+    ("background_tasks", [("status", 1), ("name", 1), ("priority", -1), ("run_at", 1)], {}),
+    ("background_tasks", "dedup_key", {"unique": True, "partialFilterExpression": {"status": "pending", "dedup_key": {"$exists": True}}}),
+    ("background_tasks", "finished_at", {"expireAfterSeconds": int(TASK_RETENTION.total_seconds())}),
+]
+
+# The polling invalidation source scans each watched collection by its change field
+if INVALIDATION_SOURCE != "local":
+    for collection, (_, change_field) in INVALIDATION_COLLECTIONS.items():
+        INDEXES.append((collection, change_field, {}))
+
+async def ensure_indexes():
+    """Create indexes the performance subsystems rely on"""
+    for collection, keys, options in INDEXES:
+        try:
+            await db[collection].create_index(keys, **options)
+        except Exception as e:
+            logger.error(f"Failed to create index {keys} on {collection}: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    connect_database()
+    slow_query_log.loop = asyncio.get_running_loop()
+    write_behind.start()
+    ad_events.start()
+    if SESSION_TOKEN_MODE == "jwt":
+        revocation_list.start()
+    await invalidation_bus.start()
+    task_queue.start()
+    if LIFECYCLE_ENABLED:
+        lifecycle_scheduler.start()
+    # create_index round trips are idempotent; don't hold up readiness for them
+    index_task = asyncio.create_task(ensure_indexes())
+    
+    yield
+    
+    # Stop background work and flush batched writes before the client goes away
+    index_task.cancel()
+    await lifecycle_scheduler.stop()
+    await task_queue.stop()
+    await invalidation_bus.stop()
+    await revocation_list.stop()
+    await ad_events.stop()
+    await write_behind.stop()
+    shutdown_image_pool()
+    if client is not None:
+        client.close()
+
+def create_app() -> FastAPI:
+    """Build the FastAPI app: routes, middleware and the startup/shutdown lifespan"""
+    app = FastAPI(lifespan=lifespan)
+    api_router.install(app)
+    root_router.install(app)
+    # Uploaded ad image variants, unless a CDN serves them; the directory appears with the first upload
+    if AD_IMAGE_URL_PREFIX.startswith("/"):
+        app.mount(AD_IMAGE_URL_PREFIX, ImmutableStaticFiles(directory=AD_IMAGE_DIR, check_dir=False), name="ad_images")
+    
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    
+    app.add_middleware(CompressionMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    return app
+
+app = create_app()
+
+# Mount Socket.IO
+socket_app = socketio.ASGIApp(sio, app)
@@ -0,0 +1,103 @@
+"""
+Shared helpers for the benchmark scripts: importing the backend, in-memory
+database stand-in, latency statistics and baseline comparison.
+"""
+
+import json
+import math
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BENCHMARK_DIR = Path(__file__).parent
+BACKEND_DIR = BENCHMARK_DIR.parent / "backend"
+BASELINE_DIR = BENCHMARK_DIR / "baselines"
+
+
+SERVER_ENV_DEFAULTS = {
+    "MONGO_URL": "mongodb://localhost:27017",
+    "DB_NAME": "benchmark_database",
+    # Scenarios deliberately exceed per-client budgets from a single address
+    "RATE_LIMIT_ENABLED": "false",
+    # A single in-process app has no other workers to hear invalidations from
+    "INVALIDATION_SOURCE": "local",
+}
+
+
+def load_server():
+    """Import backend/server.py with benchmark-friendly environment defaults"""
+    for name, value in SERVER_ENV_DEFAULTS.items():
+        os.environ.setdefault(name, value)
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+
+    import server
+    return server
+
+
+def use_database(server, mongomock: bool):
+    """Point the server at the benchmark database (local MongoDB or an in-memory stand-in)"""
+    if mongomock:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("❌ --mongomock needs mongomock-motor (pip install mongomock-motor)")
+        server.db = server.db_read = AsyncMongoMockClient()[os.environ["DB_NAME"]]
+    else:
+        server.connect_database()
+    return server.db
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies_ms: List[float], errors: int, elapsed_s: float) -> Dict[str, Any]:
+    """p50/p95/p99 and throughput for one scenario"""
+    return {
+        "requests": len(latencies_ms),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+        "throughput_rps": round(len(latencies_ms) / elapsed_s, 2) if elapsed_s else 0.0,
+    }
+
+
+def print_table(results: Dict[str, Dict[str, Any]], columns: List[str]):
+    print(f"{'scenario':<28}" + "".join(f"{c:>16}" for c in columns))
+    for name, row in results.items():
+        print(f"{name:<28}" + "".join(f"{row.get(c, ''):>16}" for c in columns))
+
+
+def save_baseline(path: Path, results: Dict[str, Any], meta: Optional[Dict[str, Any]] = None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"meta": meta or {}, "results": results}, f, indent=2, default=str)
+    print(f"💾 Baseline saved to {path}")
+
+
+def compare_baseline(path: Path, results: Dict[str, Dict[str, Any]], tolerance: float,
+                     lower_is_better: List[str], higher_is_better: List[str]) -> List[str]:
+    """Return a list of regressions beyond `tolerance` (fractional) against a saved baseline"""
+    with open(path) as f:
+        baseline = json.load(f)["results"]
+
+    regressions = []
+    for name, row in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric in lower_is_better:
+            if base.get(metric) and row.get(metric, 0) > base[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {row[metric]} > baseline {base[metric]} (+{tolerance:.0%})")
+        for metric in higher_is_better:
+            if base.get(metric) and row.get(metric, 0) < base[metric] * (1 - tolerance):
+                regressions.append(f"{name}: {metric} {row[metric]} < baseline {base[metric]} (-{tolerance:.0%})")
+    return regressions
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Compression Benchmark
+Measures bytes-on-wire and CPU cost of CompressionMiddleware for typical payloads
+
+Usage: python benchmarks/compression_bench.py [--repeat 50]
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from common import load_server
+
+server = load_server()
+
+
+def build_payloads():
+    """Representative response bodies for the heaviest list endpoints"""
+    now = datetime.now(timezone.utc).isoformat()
+    jobs = [{
+        "job_id": f"job_{i:012d}",
+        "employer_id": f"user_{i % 7:012d}",
+        "employer_name": "شركة البناء الحديث",
+        "title": f"مطور برمجيات {i}",
+        "description": "نبحث عن مطور ذو خبرة في تطوير تطبيقات الويب والهاتف. " * 8,
+        "job_type": "full_time",
+        "salary_type": ["monthly"],
+        "salary_min": 3000.0,
+        "salary_max": 6000.0,
+        "salary_negotiable": True,
+        "city": "الرياض",
+        "area": "العليا",
+        "requirements": "خبرة لا تقل عن ثلاث سنوات، إجادة اللغة الإنجليزية. " * 3,
+        "status": "active",
+        "created_at": now,
+        "updated_at": now
+    } for i in range(50)]
+
+    messages = [{
+        "message_id": f"msg_{i:012d}",
+        "sender_id": "user_a" if i % 2 else "user_b",
+        "receiver_id": "user_b" if i % 2 else "user_a",
+        "sender_name": "أحمد" if i % 2 else "فاطمة",
+        "content": f"مرحبا، هل الوظيفة ما زالت متاحة؟ رسالة رقم {i}",
+        "read": True,
+        "created_at": now
+    } for i in range(500)]
+
+    # Real images are already compressed, so random bytes are a fair stand-in
+    ads = [{
+        "ad_id": f"ad_{i:012d}",
+        "title": f"إعلان {i}",
+        "description": "عرض خاص لفترة محدودة",
+        "image_base64": base64.b64encode(os.urandom(30_000)).decode(),
+        "link_url": "https://example.com",
+        "location": "all",
+        "priority": i,
+        "status": "active",
+        "created_by": "user_admin",
+        "created_at": now,
+        "updated_at": now
+    } for i in range(20)]
+
+    return {
+        "jobs (50)": json.dumps(jobs, ensure_ascii=False).encode(),
+        "conversation (500 msgs)": json.dumps(messages, ensure_ascii=False).encode(),
+        "ads (20, base64)": json.dumps(ads, ensure_ascii=False).encode(),
+        "user profile": json.dumps(jobs[0], ensure_ascii=False).encode()[:600],
+    }
+
+
+async def measure(middleware, body: bytes, accept_encoding: str, repeat: int):
+    """Run one body through the middleware `repeat` times, returning (bytes_sent, cpu_ms_per_call)"""
+
+    async def endpoint(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    middleware.app = endpoint
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    sent = []
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            sent.append(len(message.get("body", b"")))
+
+    async def receive():
+        return {"type": "http.request"}
+
+    start = time.process_time()
+    for _ in range(repeat):
+        sent.clear()
+        await middleware(scope, receive, send)
+    cpu_ms = (time.process_time() - start) * 1000 / repeat
+
+    return sum(sent), cpu_ms
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    encodings = [("identity", "identity")]
+    encodings += [(f"gzip-{level}", "gzip") for level in (1, 6, 9)]
+    if server.brotli is not None:
+        encodings += [(f"br-{quality}", "br") for quality in (1, 4, 8)]
+    else:
+        print("ℹ️  brotli not installed, skipping br encodings")
+
+    print(f"{'payload':<26}{'encoding':<12}{'bytes':>12}{'ratio':>8}{'cpu ms':>10}")
+    for name, body in build_payloads().items():
+        for label, accept in encodings:
+            middleware = server.CompressionMiddleware(None)
+            if label.startswith("gzip-"):
+                middleware.gzip_level = int(label.split("-")[1])
+            elif label.startswith("br-"):
+                middleware.brotli_quality = int(label.split("-")[1])
+
+            size, cpu_ms = await measure(middleware, body, accept, args.repeat)
+            print(f"{name:<26}{label:<12}{size:>12,}{size / len(body):>8.2f}{cpu_ms:>10.3f}")
+        print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
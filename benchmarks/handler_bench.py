@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Handler Micro-Benchmark
+Per-request CPU cost of hot handlers through the ASGI app in-process
+(httpx ASGITransport) against an in-memory Motor stand-in, so DB latency is
+taken out of the picture. Reports mean / p50 / p95 wall time and CPU time per
+call and appends every run to a history file for tracking over time.
+
+Usage:
+  python benchmarks/handler_bench.py [--iterations 300] [--scale tiny]
+  python benchmarks/handler_bench.py --baseline benchmarks/baselines/handlers.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from common import BASELINE_DIR, compare_baseline, load_server, percentile, print_table, save_baseline, use_database
+from seed_data import EMPLOYER_TOKEN, SEEKER_TOKEN, seed
+
+HISTORY_FILE = BASELINE_DIR / "handler_history.jsonl"
+
+# One busy employer and seeker so grouping/serialization work is realistic
+EMPLOYER_HEADERS = {"Authorization": f"Bearer {EMPLOYER_TOKEN.format(0)}"}
+SEEKER_HEADERS = {"Authorization": f"Bearer {SEEKER_TOKEN.format(0)}"}
+
+CASES = {
+    "get_current_user": ("GET", "/api/auth/me", EMPLOYER_HEADERS, {}),
+    "get_jobs": ("GET", "/api/jobs", {}, {}),
+    "get_jobs_card": ("GET", "/api/jobs", {}, {"view": "card"}),
+    "get_job": ("GET", "/api/jobs/bench_job_0", {}, {}),
+    "get_conversations": ("GET", "/api/messages/conversations", SEEKER_HEADERS, {}),
+    "get_review_stats": ("GET", "/api/reviews/stats/bench_emp_0", {}, {}),
+    "get_public_posts": ("GET", "/api/posts/public", {}, {}),
+}
+
+
+async def bench_case(client: httpx.AsyncClient, method: str, path: str, headers: Dict[str, str],
+                     params: Dict[str, str], iterations: int, warmup: int) -> Dict[str, Any]:
+    for _ in range(warmup):
+        await client.request(method, path, headers=headers, params=params)
+
+    wall_ms: List[float] = []
+    cpu_ms: List[float] = []
+    size = 0
+    for _ in range(iterations):
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        response = await client.request(method, path, headers=headers, params=params)
+        wall_ms.append((time.perf_counter() - start) * 1000)
+        cpu_ms.append((time.process_time() - cpu_start) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"{method} {path} returned {response.status_code}: {response.text[:200]}")
+        size = len(response.content)
+
+    return {
+        "mean_ms": round(statistics.mean(wall_ms), 3),
+        "p50_ms": round(percentile(wall_ms, 50), 3),
+        "p95_ms": round(percentile(wall_ms, 95), 3),
+        "cpu_ms": round(statistics.mean(cpu_ms), 3),
+        "bytes": size,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--jobs", type=int, default=1_000, help="seeded dataset size (jobs)")
+    parser.add_argument("--only", nargs="*", choices=CASES.keys(), help="run a subset of handlers")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", nargs="?", const="", help="write results as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--no-history", action="store_true", help="do not append to the history file")
+    args = parser.parse_args()
+
+    server = load_server()
+    db = use_database(server, mongomock=True)
+    print(f"🌱 Seeding in-memory dataset ({args.jobs:,} jobs)...")
+    await seed(db, args.jobs, drop=True)
+
+    results = {}
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for name in args.only or CASES:
+            method, path, headers, params = CASES[name]
+            results[name] = await bench_case(client, method, path, headers, params, args.iterations, args.warmup)
+
+    print_table(results, ["mean_ms", "p50_ms", "p95_ms", "cpu_ms", "bytes"])
+
+    meta = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "iterations": args.iterations,
+        "jobs": args.jobs,
+        "at": datetime.now(timezone.utc).isoformat(),
+    }
+    if not args.no_history:
+        HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(HISTORY_FILE, "a") as f:
+            f.write(json.dumps({"meta": meta, "results": results}) + "\n")
+        print(f"📈 Appended run to {HISTORY_FILE}")
+
+    if args.save_baseline is not None:
+        save_baseline(Path(args.save_baseline) if args.save_baseline else BASELINE_DIR / "handlers.json", results, meta)
+
+    if args.baseline:
+        regressions = compare_baseline(args.baseline, results, args.tolerance, ["cpu_ms", "p50_ms"], [])
+        if regressions:
+            print("❌ Handler cost regressions:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print("✅ Within baseline tolerance")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
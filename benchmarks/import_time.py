@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Cold Start Profiler
+Imports backend/server.py in fresh interpreters under `python -X importtime`
+and reports the median cost of the import as a whole, of server.py's own
+module body (route and model construction) and of each package it pulls in.
+Saved baselines make it a regression gate for worker startup time.
+
+Usage:
+  python benchmarks/import_time.py [--runs 7] [--top 15]
+  python benchmarks/import_time.py --save-baseline
+  python benchmarks/import_time.py --baseline benchmarks/baselines/import_time.json
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from common import BACKEND_DIR, BASELINE_DIR, SERVER_ENV_DEFAULTS, compare_baseline, print_table, save_baseline
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def run_import(env: Dict[str, str]) -> Tuple[float, Dict[str, Tuple[int, float, float]]]:
+    """One cold import; returns wall ms and {module: (depth, self_ms, cumulative_ms)}"""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        sys.exit(f"❌ import server failed:\n{proc.stderr[-2000:]}")
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules[name] = (len(indent) // 2, int(self_us) / 1000, int(cumulative_us) / 1000)
+    return wall_ms, modules
+
+
+def interpreter_ms(env: Dict[str, str]) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], env=env, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--top", type=int, default=15, help="packages to list by cumulative import time")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", nargs="?", const="", help="write results as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    env = {**SERVER_ENV_DEFAULTS, **os.environ}
+    # Discarded run so every measured run reads warm bytecode caches, as a restarted worker would
+    run_import(env)
+
+    walls: List[float] = []
+    interpreters: List[float] = []
+    samples: Dict[str, List[Tuple[int, float, float]]] = {}
+    for _ in range(args.runs):
+        interpreters.append(interpreter_ms(env))
+        wall_ms, modules = run_import(env)
+        walls.append(wall_ms)
+        for name, sample in modules.items():
+            samples.setdefault(name, []).append(sample)
+
+    def median(name: str, index: int) -> float:
+        return round(statistics.median(sample[index] for sample in samples[name]), 3)
+
+    results = {
+        "import server": {
+            "wall_ms": round(statistics.median(walls), 3),
+            "interpreter_ms": round(statistics.median(interpreters), 3),
+            "import_ms": median("server", 2),
+            "self_ms": median("server", 1),
+        }
+    }
+    print_table(results, ["wall_ms", "interpreter_ms", "import_ms", "self_ms"])
+
+    # Packages imported directly by server.py (depth 1 in the import tree)
+    direct = [name for name, runs in samples.items() if runs[0][0] == 1 and len(runs) == args.runs]
+    direct.sort(key=lambda name: median(name, 2), reverse=True)
+    packages = {name: {"cumulative_ms": median(name, 2), "self_ms": median(name, 1)} for name in direct[:args.top]}
+    print()
+    print_table(packages, ["cumulative_ms", "self_ms"])
+    results.update(packages)
+
+    meta = {"runs": args.runs, "python": sys.version.split()[0]}
+    if args.save_baseline is not None:
+        save_baseline(Path(args.save_baseline) if args.save_baseline else BASELINE_DIR / "import_time.json", results, meta)
+
+    if args.baseline:
+        regressions = compare_baseline(args.baseline, {"import server": results["import server"]}, args.tolerance,
+                                       ["import_ms", "self_ms"], [])
+        if regressions:
+            print("❌ Cold start regressions:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print("✅ Within baseline tolerance")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Load Testing Suite for Job Portal Backend
+Concurrent scenarios (browse jobs, apply, chat, inbox polling) against a seeded
+dataset, reporting p50/p95/p99 latency and throughput per scenario.
+
+Runs in-process through the ASGI app (local MongoDB or --mongomock stand-in)
+or against a live deployment with --url. Saved baselines turn the run into a
+regression gate: any scenario beyond --tolerance exits non-zero.
+
+Usage:
+  python benchmarks/load_test.py --mongomock --scale tiny --duration 10
+  python benchmarks/load_test.py --scale small --seed-data --save-baseline
+  python benchmarks/load_test.py --url https://host/api --baseline benchmarks/baselines/load_small.json
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from common import BASELINE_DIR, compare_baseline, load_server, print_table, save_baseline, summarize, use_database
+from seed_data import CITIES, EMPLOYER_TOKEN, JOB_TYPES, SCALES, SEEKER_TOKEN, dataset_sizes, seed
+
+
+class JobPortalLoadTester:
+    def __init__(self, client: httpx.AsyncClient, sizes: Dict[str, int], rng: random.Random):
+        self.client = client
+        self.sizes = sizes
+        self.rng = rng
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def seeker_headers(self) -> Dict[str, str]:
+        index = self.rng.randrange(self.sizes["seekers"])
+        return {"Authorization": f"Bearer {SEEKER_TOKEN.format(index)}"}
+
+    def employer_headers(self) -> Dict[str, str]:
+        index = self.rng.randrange(self.sizes["employers"])
+        return {"Authorization": f"Bearer {EMPLOYER_TOKEN.format(index)}"}
+
+    async def timed(self, scenario: str, method: str, url: str, ok_statuses=(200,), **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[scenario] = self.errors.get(scenario, 0) + 1
+            return None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.latencies.setdefault(scenario, []).append(elapsed_ms)
+        if response.status_code not in ok_statuses:
+            self.errors[scenario] = self.errors.get(scenario, 0) + 1
+        return response
+
+    # ============ Scenarios ============
+
+    async def browse_jobs(self):
+        """Feed with a random filter, then open one job"""
+        params = self.rng.choice([
+            {},
+            {"city": self.rng.choice(CITIES)},
+            {"job_type": self.rng.choice(JOB_TYPES)},
+            {"search": "مطلوب"},
+            {"view": "card"},
+        ])
+        response = await self.timed("browse_jobs", "GET", "/jobs", params=params)
+        if response is not None and response.status_code == 200 and response.json():
+            job_id = self.rng.choice(response.json())["job_id"]
+            await self.timed("job_detail", "GET", f"/jobs/{job_id}")
+
+    async def apply(self):
+        """Job seeker applies to a random job (duplicates are an expected 400)"""
+        job_id = f"bench_job_{self.rng.randrange(self.sizes['jobs'])}"
+        await self.timed(
+            "apply", "POST", "/applications", ok_statuses=(200, 400),
+            json={"job_id": job_id, "cover_letter": "أرغب بالتقديم"},
+            headers=self.seeker_headers()
+        )
+
+    async def chat(self):
+        """Send a message and reload the conversation"""
+        seeker = self.rng.randrange(self.sizes["seekers"])
+        employer = f"bench_emp_{(seeker * 7) % self.sizes['employers']}"
+        headers = {"Authorization": f"Bearer {SEEKER_TOKEN.format(seeker)}"}
+        await self.timed("chat_send", "POST", "/messages", json={"receiver_id": employer, "content": "مرحبا"}, headers=headers)
+        await self.timed("chat_conversation", "GET", f"/messages/conversation/{employer}", headers=headers)
+
+    async def inbox_polling(self):
+        """Inbox refresh, the most frequent authenticated call"""
+        headers = self.rng.choice([self.seeker_headers, self.employer_headers])()
+        await self.timed("inbox_polling", "GET", "/messages/conversations", headers=headers)
+
+    async def worker(self, scenarios: List[Callable], weights: List[int], deadline: float):
+        while time.perf_counter() < deadline:
+            scenario = self.rng.choices(scenarios, weights)[0]
+            await scenario()
+
+    async def run(self, concurrency: int, duration: float, mix: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
+        scenarios = [getattr(self, name) for name in mix]
+        weights = list(mix.values())
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(self.worker(scenarios, weights, deadline) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+        return {
+            name: summarize(latencies, self.errors.get(name, 0), elapsed)
+            for name, latencies in sorted(self.latencies.items())
+        }
+
+
+# Relative frequency of each scenario, roughly matching mobile traffic
+DEFAULT_MIX = {"browse_jobs": 5, "inbox_polling": 3, "chat": 1, "apply": 1}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="live API base URL (ending in /api); default runs in-process")
+    parser.add_argument("--mongomock", action="store_true", help="in-process with an in-memory MongoDB stand-in")
+    parser.add_argument("--scale", choices=SCALES.keys(), default="tiny")
+    parser.add_argument("--seed-data", action="store_true", help="seed the dataset before running (implied by --mongomock)")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds")
+    parser.add_argument("--random-seed", type=int, default=7)
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", nargs="?", const="", help="write results as a baseline (default path per scale)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed fractional regression")
+    args = parser.parse_args()
+
+    sizes = dataset_sizes(SCALES[args.scale])
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=30)
+    else:
+        server = load_server()
+        db = use_database(server, args.mongomock)
+        if args.seed_data or args.mongomock:
+            print(f"🌱 Seeding '{args.scale}' dataset...")
+            await seed(db, SCALES[args.scale], drop=True)
+        transport = httpx.ASGITransport(app=server.app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://benchmark/api", timeout=30)
+
+    print(f"🚀 {args.concurrency} workers for {args.duration:.0f}s against {args.url or 'in-process app'}")
+    async with client:
+        tester = JobPortalLoadTester(client, sizes, random.Random(args.random_seed))
+        results = await tester.run(args.concurrency, args.duration, DEFAULT_MIX)
+
+    print_table(results, ["requests", "errors", "p50_ms", "p95_ms", "p99_ms", "throughput_rps"])
+
+    if args.save_baseline is not None:
+        path = Path(args.save_baseline) if args.save_baseline else BASELINE_DIR / f"load_{args.scale}.json"
+        save_baseline(path, results, {"scale": args.scale, "concurrency": args.concurrency, "duration": args.duration, "target": args.url or "in-process"})
+
+    if args.baseline:
+        regressions = compare_baseline(args.baseline, results, args.tolerance, ["p95_ms", "p99_ms"], ["throughput_rps"])
+        if regressions:
+            print("❌ Performance regressions:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print("✅ Within baseline tolerance")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Benchmark Dataset Seeder
+Loads a reproducible job portal dataset (users, sessions, jobs, applications,
+messages, reviews, public posts) into MongoDB
+
+Usage: python benchmarks/seed_data.py --scale small [--drop]
+"""
+
+import argparse
+import asyncio
+import random
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict
+
+from common import load_server
+
+# jobs count drives everything else; users/messages scale with it
+SCALES = {
+    "tiny": 1_000,
+    "small": 10_000,
+    "medium": 100_000,
+    "large": 1_000_000,
+}
+
+CITIES = ["الرياض", "جدة", "مكة", "المدينة", "الدمام", "الخبر", "تبوك", "أبها"]
+AREAS = ["العليا", "الحمراء", "النسيم", "الملز", "الشاطئ", "الروضة"]
+PROFESSIONS = ["سباك", "كهربائي", "مطور برمجيات", "محاسب", "نجار", "سائق", "مصمم", "ممرض"]
+JOB_TYPES = ["full_time", "part_time", "remote"]
+BATCH_SIZE = 5_000
+
+# Benchmark sessions use predictable tokens so scenarios can authenticate
+EMPLOYER_TOKEN = "bench_employer_session_{}"
+SEEKER_TOKEN = "bench_seeker_session_{}"
+
+
+def dataset_sizes(jobs: int) -> Dict[str, int]:
+    return {
+        "employers": max(10, jobs // 20),
+        "seekers": max(50, jobs // 5),
+        "jobs": jobs,
+        "applications": jobs * 3,
+        "messages": jobs * 5,
+        "reviews": jobs // 2,
+        "public_posts": max(50, jobs // 10),
+    }
+
+
+async def insert_batched(collection, make_doc, count: int):
+    batch = []
+    for i in range(count):
+        batch.append(make_doc(i))
+        if len(batch) >= BATCH_SIZE:
+            await collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+
+
+async def seed(db, jobs: int, seed_value: int = 42, drop: bool = False) -> Dict[str, Any]:
+    """Seed `db` with a dataset sized from `jobs`; returns the sizes used"""
+    rng = random.Random(seed_value)
+    sizes = dataset_sizes(jobs)
+    now = datetime.now(timezone.utc)
+
+    if drop:
+        for name in ("users", "user_sessions", "jobs", "applications", "messages", "message_buckets", "reviews", "public_posts"):
+            await db[name].drop()
+
+    def ago(max_days: int) -> datetime:
+        return now - timedelta(seconds=rng.randint(0, max_days * 86400))
+
+    def employer(i):
+        return {
+            "user_id": f"bench_emp_{i}",
+            "email": f"employer{i}@bench.local",
+            "name": f"صاحب عمل {i}",
+            "picture": None,
+            "user_type": "employer",
+            "city": rng.choice(CITIES),
+            "area": rng.choice(AREAS),
+            "skills": [],
+            "created_at": ago(365),
+        }
+
+    def seeker(i):
+        return {
+            "user_id": f"bench_seeker_{i}",
+            "email": f"seeker{i}@bench.local",
+            "name": f"باحث عن عمل {i}",
+            "picture": None,
+            "user_type": "job_seeker",
+            "phone": f"+9665{i:08d}",
+            "profession": rng.choice(PROFESSIONS),
+            "skills": rng.sample(PROFESSIONS, 2),
+            "experience_years": rng.randint(0, 20),
+            "bio": "خبرة طويلة في المجال والعمل ضمن فريق. " * 3,
+            "city": rng.choice(CITIES),
+            "area": rng.choice(AREAS),
+            "created_at": ago(365),
+        }
+
+    await insert_batched(db.users, employer, sizes["employers"])
+    await insert_batched(db.users, seeker, sizes["seekers"])
+
+    def session(i):
+        is_employer = i < sizes["employers"]
+        index = i if is_employer else i - sizes["employers"]
+        return {
+            "user_id": f"bench_emp_{index}" if is_employer else f"bench_seeker_{index}",
+            "session_token": (EMPLOYER_TOKEN if is_employer else SEEKER_TOKEN).format(index),
+            "expires_at": now + timedelta(days=30),
+            "created_at": now,
+        }
+
+    await insert_batched(db.user_sessions, session, sizes["employers"] + sizes["seekers"])
+
+    def job(i):
+        employer_index = rng.randrange(sizes["employers"])
+        created = ago(120)
+        salary_min = rng.choice([None, 1500.0, 3000.0, 5000.0])
+        return {
+            "job_id": f"bench_job_{i}",
+            "employer_id": f"bench_emp_{employer_index}",
+            "employer_name": f"صاحب عمل {employer_index}",
+            "title": f"{rng.choice(PROFESSIONS)} مطلوب {i}",
+            "description": "نبحث عن موظف ملتزم للعمل في بيئة احترافية مع فريق متعاون. " * 6,
+            "job_type": rng.choice(JOB_TYPES),
+            "salary_type": [rng.choice(["daily", "weekly", "monthly"])],
+            "salary_min": salary_min,
+            "salary_max": salary_min * 2 if salary_min else None,
+            "salary_negotiable": rng.random() < 0.3,
+            "city": rng.choice(CITIES),
+            "area": rng.choice(AREAS),
+            "requirements": "خبرة سنتين على الأقل. " * 3,
+            "status": "active" if rng.random() < 0.8 else rng.choice(["closed", "filled"]),
+            "created_at": created,
+            "updated_at": created,
+        }
+
+    await insert_batched(db.jobs, job, sizes["jobs"])
+
+    def application(i):
+        job_index = rng.randrange(sizes["jobs"])
+        seeker_index = rng.randrange(sizes["seekers"])
+        return {
+            "application_id": f"bench_app_{i}",
+            "job_id": f"bench_job_{job_index}",
+            "job_title": f"وظيفة {job_index}",
+            "job_seeker_id": f"bench_seeker_{seeker_index}",
+            "job_seeker_name": f"باحث عن عمل {seeker_index}",
+            "job_seeker_email": f"seeker{seeker_index}@bench.local",
+            "employer_id": f"bench_emp_{rng.randrange(sizes['employers'])}",
+            "cover_letter": "أرغب بالتقديم على هذه الوظيفة.",
+            "status": rng.choice(["pending", "pending", "accepted", "rejected"]),
+            "created_at": ago(90),
+        }
+
+    await insert_batched(db.applications, application, sizes["applications"])
+
+    def message(i):
+        # Conversations cluster around a small set of partners per user, like real inboxes
+        seeker_index = rng.randrange(sizes["seekers"])
+        employer_index = (seeker_index * 7 + rng.randrange(5)) % sizes["employers"]
+        from_seeker = rng.random() < 0.5
+        seeker_id, employer_id = f"bench_seeker_{seeker_index}", f"bench_emp_{employer_index}"
+        return {
+            "message_id": f"bench_msg_{i}",
+            "sender_id": seeker_id if from_seeker else employer_id,
+            "receiver_id": employer_id if from_seeker else seeker_id,
+            "sender_name": "مستخدم",
+            "content": f"مرحبا، بخصوص الوظيفة رقم {i % 1000}",
+            "read": rng.random() < 0.7,
+            "created_at": ago(60),
+        }
+
+    await insert_batched(db.messages, message, sizes["messages"])
+
+    def review(i):
+        return {
+            "review_id": f"bench_rev_{i}",
+            "reviewer_id": f"bench_seeker_{rng.randrange(sizes['seekers'])}",
+            "reviewed_id": f"bench_emp_{rng.randrange(sizes['employers'])}",
+            "reviewer_name": "مقيم",
+            "rating": rng.randint(1, 5),
+            "comment": "تجربة جيدة",
+            "created_at": ago(180),
+        }
+
+    await insert_batched(db.reviews, review, sizes["reviews"])
+
+    def public_post(i):
+        updated = ago(30)
+        return {
+            "post_id": f"bench_post_{i}",
+            "user_id": f"bench_seeker_{i % sizes['seekers']}",
+            "user_name": f"باحث عن عمل {i}",
+            "user_type": "job_seeker",
+            "picture": None,
+            "profession": rng.choice(PROFESSIONS),
+            "phone": f"+9665{i:08d}",
+            "email": f"seeker{i}@bench.local",
+            "city": rng.choice(CITIES),
+            "area": rng.choice(AREAS),
+            "skills": rng.sample(PROFESSIONS, 2),
+            "experience_years": rng.randint(0, 20),
+            "bio": "خبرة طويلة في المجال والعمل ضمن فريق. " * 3,
+            "status": "active",
+            "created_at": updated,
+            "updated_at": updated,
+        }
+
+    await insert_batched(db.public_posts, public_post, sizes["public_posts"])
+
+    return sizes
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES.keys(), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--drop", action="store_true", help="drop benchmark collections first")
+    args = parser.parse_args()
+
+    server = load_server()
+    server.connect_database()
+    print(f"🌱 Seeding '{args.scale}' dataset into {server.db.name}...")
+    sizes = await seed(server.db, SCALES[args.scale], args.seed, args.drop)
+    for name, count in sizes.items():
+        print(f"   {name:<14}{count:>12,}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""
+Shared fixtures: the backend app on an in-memory database, driven in-process with httpx.
+"""
+
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+
+for name, value in {
+    "MONGO_URL": "mongodb://localhost:27017",
+    "DB_NAME": "test_database",
+    "RATE_LIMIT_ENABLED": "false",
+    "INVALIDATION_SOURCE": "local",
+}.items():
+    os.environ.setdefault(name, value)
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import server as backend  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def server():
+    """The server module on a fresh database with its in-memory caches emptied"""
+    backend.db = backend.db_read = AsyncMongoMockClient()[f"test_{uuid.uuid4().hex[:8]}"]
+    backend.feed_cache.drop_local()
+    backend.profile_cache.drop_local()
+    backend.job_feed.buckets.clear()
+    backend.job_feed.version += 1
+    backend.ad_selector.version += 1
+    backend.ad_selector.views.clear()
+    backend.ad_events.pending.clear()
+    backend.rate_limit_store.buckets.clear()
+    return backend
+
+
+@pytest.fixture
+async def client(server):
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def create_user(server):
+    """Insert a user with an active session; returns (user document, session token)"""
+    async def create(user_type: str = "job_seeker"):
+        now = datetime.now(timezone.utc)
+        user = {
+            "user_id": f"user_{uuid.uuid4().hex[:12]}",
+            "email": f"{uuid.uuid4().hex[:8]}@example.com",
+            "name": "Test User",
+            "user_type": user_type,
+            "created_at": now,
+        }
+        session_token = uuid.uuid4().hex
+        await server.db.users.insert_one(dict(user))
+        await server.db.user_sessions.insert_one({
+            "user_id": user["user_id"],
+            "session_token": session_token,
+            "sid": server.session_id(session_token),
+            "expires_at": now + timedelta(days=1),
+            "created_at": now,
+        })
+        return user, session_token
+    return create
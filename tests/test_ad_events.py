@@ -0,0 +1,21 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_counters_are_summed_per_minute_and_flushed_on_stop(server):
+    await server.db.advertisements.insert_one({"ad_id": "ad_1"})
+    aggregator = server.AdEventAggregator(interval=60)
+    aggregator.start()
+
+    at = datetime.now(timezone.utc)
+    for event in ("impression", "impression", "click"):
+        aggregator.record("ad_1", event, at)
+    aggregator.record("ad_unknown", "click", at)
+    await aggregator.stop()
+
+    rows = await server.db.ad_stats.find({}, {"_id": 0, "ad_id": 1, "impressions": 1, "clicks": 1}).to_list(None)
+    assert rows == [{"ad_id": "ad_1", "impressions": 2, "clicks": 1}]
+    assert not aggregator.has_pending() and aggregator.task is None
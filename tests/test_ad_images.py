@@ -0,0 +1,120 @@
+import io
+from datetime import datetime, timezone
+
+import pytest
+from PIL import Image
+
+pytestmark = pytest.mark.anyio
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def png(color, size=(800, 400)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def image_dir(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "AD_IMAGE_DIR", tmp_path)
+    # Render in a thread instead of a worker process
+    monkeypatch.setattr(server, "image_pool", lambda: None)
+    return tmp_path
+
+
+@pytest.fixture
+async def owner(server, create_user):
+    user, token = await create_user("employer")
+    now = datetime.now(timezone.utc)
+    await server.db.advertisements.insert_one({
+        "ad_id": "ad_1",
+        "title": "Ad",
+        "image_base64": "legacy",
+        "location": "all",
+        "status": "active",
+        "created_by": user["user_id"],
+        "created_at": now,
+        "updated_at": now,
+    })
+    return token
+
+
+def files_in(directory):
+    return sorted(path.name for path in directory.iterdir())
+
+
+async def upload(client, token, data, **kwargs):
+    return await client.post(
+        "/api/ads/ad_1/image", files={"image": ("ad.png", data, "image/png")}, headers=bearer(token), **kwargs
+    )
+
+
+async def test_upload_writes_variants(server, image_dir, owner, client):
+    response = await upload(client, owner, png("red"))
+    assert response.status_code == 200
+
+    ad = response.json()
+    assert set(ad["images"]) == set(server.AD_IMAGE_VARIANTS)
+    assert ad["image_base64"] is None
+    names = [url.rsplit("/", 1)[-1] for url in ad["images"].values()]
+    assert all(url.startswith("/api/media/ads/") for url in ad["images"].values())
+    assert files_in(image_dir) == sorted(names)
+
+    with Image.open(image_dir / ad["images"]["thumb"].rsplit("/", 1)[-1]) as thumb:
+        assert thumb.format == "JPEG" and max(thumb.size) == server.AD_IMAGE_VARIANTS["thumb"]
+
+
+async def test_replacing_the_image_removes_old_variants(server, image_dir, owner, client):
+    first = (await upload(client, owner, png("red"))).json()["images"]
+    second = (await upload(client, owner, png("blue"))).json()["images"]
+
+    assert first != second
+    assert files_in(image_dir) == sorted(url.rsplit("/", 1)[-1] for url in second.values())
+
+
+async def test_non_image_is_rejected(server, image_dir, owner, client):
+    response = await upload(client, owner, b"not an image at all")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Not a valid image"
+    assert files_in(image_dir) == []
+
+
+async def test_declared_oversize_body_is_rejected_up_front(server, image_dir, owner, client, monkeypatch):
+    monkeypatch.setattr(server, "AD_IMAGE_MAX_BYTES", 1024)
+
+    response = await upload(client, owner, b"x" * (server.MULTIPART_OVERHEAD_BYTES + 4096))
+    assert response.status_code == 413
+    assert files_in(image_dir) == []
+
+
+async def test_streamed_oversize_body_is_rejected(server, image_dir, owner, client, monkeypatch):
+    monkeypatch.setattr(server, "AD_IMAGE_MAX_BYTES", 1024)
+    boundary = "test-boundary"
+    body = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="image"; filename="ad.png"\r\n'
+        "Content-Type: image/png\r\n\r\n"
+    ).encode() + b"x" * 8192 + f"\r\n--{boundary}--\r\n".encode()
+
+    async def chunks():
+        # No Content-Length: the limit is enforced while streaming
+        for i in range(0, len(body), 512):
+            yield body[i:i + 512]
+
+    response = await client.post(
+        "/api/ads/ad_1/image",
+        content=chunks(),
+        headers={**bearer(owner), "Content-Type": f"multipart/form-data; boundary={boundary}"}
+    )
+    assert response.status_code == 413
+    assert files_in(image_dir) == []
+
+
+async def test_only_the_owner_can_upload(server, image_dir, owner, create_user, client):
+    _, other = await create_user("employer")
+
+    response = await upload(client, other, png("red"))
+    assert response.status_code == 403
@@ -0,0 +1,106 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def make_ad(ad_id, **fields):
+    now = datetime.now(timezone.utc)
+    return {
+        "ad_id": ad_id,
+        "title": ad_id,
+        "location": "all",
+        "priority": 0,
+        "status": "active",
+        "created_by": "user_admin",
+        "created_at": now,
+        "updated_at": now,
+        **fields,
+    }
+
+
+@pytest.fixture
+def cap(server, monkeypatch):
+    monkeypatch.setattr(server, "AD_FREQUENCY_CAP", 2)
+
+
+async def served(selector, viewer, rounds, count=3):
+    seen = []
+    for _ in range(rounds):
+        seen += [ad["ad_id"] for ad in await selector.select(None, viewer, count)]
+    return seen
+
+
+async def test_viewer_sees_an_ad_at_most_cap_times(server, cap):
+    await server.db.advertisements.insert_many([make_ad("ad_1"), make_ad("ad_2")])
+    selector = server.AdSelector()
+
+    seen = await served(selector, "user:a", 5)
+    assert sorted(seen) == ["ad_1", "ad_1", "ad_2", "ad_2"]
+    # Other viewers have their own counts
+    assert sorted(await served(selector, "user:b", 1)) == ["ad_1", "ad_2"]
+
+
+async def test_ad_frequency_cap_overrides_the_default(server, cap):
+    await server.db.advertisements.insert_many([
+        make_ad("ad_once", frequency_cap=1),
+        make_ad("ad_often", frequency_cap=4),
+    ])
+    selector = server.AdSelector()
+
+    seen = await served(selector, "user:a", 6)
+    assert seen.count("ad_once") == 1
+    assert seen.count("ad_often") == 4
+
+
+async def test_cap_resets_after_the_window(server, cap):
+    await server.db.advertisements.insert_one(make_ad("ad_1"))
+    selector = server.AdSelector()
+    assert await served(selector, "user:a", 3) == ["ad_1", "ad_1"]
+
+    count, _ = selector.views[("user:a", "ad_1")]
+    selector.views[("user:a", "ad_1")] = (count, time.monotonic() - server.AD_FREQUENCY_WINDOW - 1)
+
+    assert await served(selector, "user:a", 1) == ["ad_1"]
+    assert selector.views[("user:a", "ad_1")][0] == 1
+
+
+async def test_served_ads_are_counted_as_impressions(server, cap):
+    await server.db.advertisements.insert_one(make_ad("ad_1"))
+    selector = server.AdSelector()
+
+    await served(selector, "user:a", 3)
+
+    impressions = sum(
+        counters.get("impressions", 0)
+        for (ad_id, _), counters in server.ad_events.pending.items() if ad_id == "ad_1"
+    )
+    assert impressions == 2
+
+
+async def test_inactive_and_out_of_date_ads_are_not_served(server):
+    now = datetime.now(timezone.utc)
+    await server.db.advertisements.insert_many([
+        make_ad("ad_live"),
+        make_ad("ad_inactive", status="inactive"),
+        make_ad("ad_ended", end_date=now - timedelta(days=1)),
+        make_ad("ad_upcoming", start_date=now + timedelta(days=1)),
+    ])
+
+    assert await served(server.AdSelector(), "user:a", 1, count=10) == ["ad_live"]
+
+
+async def test_serve_endpoint_caps_per_client(server, cap, client):
+    await server.db.advertisements.insert_one(make_ad("ad_1", location="home"))
+    headers = {"X-Forwarded-For": "10.0.0.1"}
+
+    counts = []
+    for _ in range(3):
+        response = await client.get("/api/ads/serve", params={"location": "home"}, headers=headers)
+        counts.append(len(response.json()))
+    assert counts == [1, 1, 0]
+
+    other = await client.get("/api/ads/serve", params={"location": "home"}, headers={"X-Forwarded-For": "10.0.0.2"})
+    assert [ad["ad_id"] for ad in other.json()] == ["ad_1"]
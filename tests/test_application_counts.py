@@ -0,0 +1,180 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def make_job(job_id, employer_id, counters=True):
+    now = datetime.now(timezone.utc)
+    job = {
+        "job_id": job_id,
+        "employer_id": employer_id,
+        "employer_name": "Employer",
+        "title": job_id,
+        "description": "Description",
+        "job_type": "full_time",
+        "salary_type": ["monthly"],
+        "city": "Baghdad",
+        "area": "Centre",
+        "status": "active",
+        "created_at": now,
+        "updated_at": now,
+    }
+    if counters:
+        job["application_counts"] = {}
+    return job
+
+
+def make_legacy_application(application_id, job_id, employer_id, status):
+    now = datetime.now(timezone.utc)
+    return {
+        "application_id": application_id,
+        "job_id": job_id,
+        "job_title": job_id,
+        "job_seeker_id": f"user_{application_id}",
+        "job_seeker_name": "Seeker",
+        "job_seeker_email": "seeker@example.com",
+        "employer_id": employer_id,
+        "status": status,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+async def counts(server, job_id):
+    job = await server.db.jobs.find_one({"job_id": job_id})
+    return server.with_status_counts(job.get("application_counts")) if "application_counts" in job else None
+
+
+@pytest.fixture
+async def employer(create_user):
+    user, token = await create_user("employer")
+    return user["user_id"], token
+
+
+async def apply(client, create_user, job_id):
+    _, token = await create_user("job_seeker")
+    response = await client.post("/api/applications", json={"job_id": job_id}, headers=bearer(token))
+    assert response.status_code == 200
+    return response.json()["application_id"]
+
+
+async def test_counters_follow_applications_and_status_changes(server, employer, create_user, client):
+    employer_id, token = employer
+    await server.db.jobs.insert_one(make_job("job_1", employer_id))
+
+    first = await apply(client, create_user, "job_1")
+    await apply(client, create_user, "job_1")
+    assert await counts(server, "job_1") == {"pending": 2, "accepted": 0, "rejected": 0, "total": 2}
+
+    for _ in range(2):
+        # Re-sending the current status changes nothing
+        response = await client.put(
+            f"/api/applications/{first}/status", json={"status": "accepted"}, headers=bearer(token)
+        )
+        assert response.status_code == 200
+    assert await counts(server, "job_1") == {"pending": 1, "accepted": 1, "rejected": 0, "total": 2}
+
+    dashboard = (await client.get("/api/employer/dashboard", headers=bearer(token))).json()
+    assert dashboard["jobs"][0]["application_counts"] == {"pending": 1, "accepted": 1, "rejected": 0, "total": 2}
+    assert dashboard["totals"]["applications"]["total"] == 2
+
+
+async def test_backfill_seeds_legacy_jobs(server, employer, create_user, client):
+    employer_id, token = employer
+    await server.db.jobs.insert_one(make_job("job_legacy", employer_id, counters=False))
+    await server.db.applications.insert_many([
+        make_legacy_application("app_1", "job_legacy", employer_id, "pending"),
+        make_legacy_application("app_2", "job_legacy", employer_id, "accepted"),
+    ])
+    await server.db.applications_archive.insert_one(
+        make_legacy_application("app_3", "job_legacy", employer_id, "rejected")
+    )
+
+    # Applying before the backfill leaves the application for it to count
+    await apply(client, create_user, "job_legacy")
+    assert await counts(server, "job_legacy") is None
+
+    for _ in range(2):
+        await client.get("/api/employer/dashboard", headers=bearer(token))
+    assert await counts(server, "job_legacy") == {"pending": 2, "accepted": 1, "rejected": 1, "total": 4}
+
+    await apply(client, create_user, "job_legacy")
+    assert (await counts(server, "job_legacy"))["total"] == 5
+
+
+async def test_status_change_before_backfill_is_counted_once(server, employer, create_user, client):
+    employer_id, token = employer
+    await server.db.jobs.insert_one(make_job("job_legacy", employer_id, counters=False))
+    application_id = await apply(client, create_user, "job_legacy")
+
+    await client.put(
+        f"/api/applications/{application_id}/status", json={"status": "rejected"}, headers=bearer(token)
+    )
+    await server.backfill_application_counts(employer_id)
+
+    assert await counts(server, "job_legacy") == {"pending": 0, "accepted": 0, "rejected": 1, "total": 1}
+
+
+class Interleaved:
+    """Database that runs `before` once, just ahead of the first `collection.method` call"""
+
+    def __init__(self, db, collection, method, before):
+        self.db = db
+        self.collection = collection
+        self.method = method
+        self.before = before
+
+    def __getattr__(self, name):
+        return self[name]
+
+    def __getitem__(self, name):
+        collection = self.db[name]
+        if name != self.collection or self.before is None:
+            return collection
+        interleaved = self
+
+        class Collection:
+            def __getattr__(self, attr):
+                method = getattr(collection, attr)
+                if attr != interleaved.method or interleaved.before is None:
+                    return method
+
+                async def call(*args, **kwargs):
+                    before, interleaved.before = interleaved.before, None
+                    await before()
+                    return await method(*args, **kwargs)
+                return call
+        return Collection()
+
+
+@pytest.mark.parametrize("collection, method", [
+    # Before the backfill seeds the counters, and between seeding them and counting applications
+    ("jobs", "update_many"),
+    ("applications", "distinct"),
+])
+async def test_application_racing_the_backfill_is_counted(server, employer, create_user, client, monkeypatch, collection, method):
+    employer_id, _ = employer
+    db = server.db
+    await db.jobs.insert_one(make_job("job_legacy", employer_id, counters=False))
+    await db.applications.insert_one(make_legacy_application("app_1", "job_legacy", employer_id, "pending"))
+
+    monkeypatch.setattr(server, "db", Interleaved(db, collection, method, lambda: apply(client, create_user, "job_legacy")))
+    await server.backfill_application_counts(employer_id)
+
+    assert await counts(server, "job_legacy") == {"pending": 2, "accepted": 0, "rejected": 0, "total": 2}
+
+
+async def test_an_application_is_counted_only_once(server, employer):
+    employer_id, _ = employer
+    await server.db.jobs.insert_one(make_job("job_1", employer_id))
+    await server.db.applications.insert_one(make_legacy_application("app_1", "job_1", employer_id, "pending"))
+
+    assert await server.count_application("applications", "app_1")
+    assert not await server.count_application("applications", "app_1")
+    assert await counts(server, "job_1") == {"pending": 1, "accepted": 0, "rejected": 0, "total": 1}
@@ -0,0 +1,60 @@
+import gzip
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+pytestmark = pytest.mark.anyio
+
+LARGE = {"items": [{"id": i, "title": f"Job {i}"} for i in range(200)]}
+
+
+def make_client(server, **options):
+    routes = [
+        Route("/small", lambda request: JSONResponse({"ok": True})),
+        Route("/large", lambda request: JSONResponse(LARGE)),
+        Route("/binary", lambda request: PlainTextResponse("x" * 4096, media_type="application/octet-stream")),
+    ]
+    app = server.CompressionMiddleware(Starlette(routes=routes), **options)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def test_small_response_is_not_compressed(server):
+    async with make_client(server, minimum_size=1024) as client:
+        response = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"ok": True}
+
+
+async def test_large_response_is_gzipped_with_vary(server):
+    async with make_client(server, minimum_size=1024) as client:
+        response = await client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json() == LARGE
+
+
+async def test_minimum_size_is_configurable(server):
+    async with make_client(server, minimum_size=5) as client:
+        response = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+
+
+async def test_no_accepted_encoding_or_type_passes_through(server):
+    async with make_client(server, minimum_size=1024) as client:
+        refused = await client.get("/large", headers={"Accept-Encoding": "gzip;q=0"})
+        binary = await client.get("/binary", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in refused.headers
+    assert "content-encoding" not in binary.headers
+
+
+async def test_gzip_body_round_trips(server):
+    transport = httpx.ASGITransport(app=server.CompressionMiddleware(
+        Starlette(routes=[Route("/large", lambda request: JSONResponse(LARGE))])
+    ))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async with client.stream("GET", "/large", headers={"Accept-Encoding": "gzip"}) as response:
+            raw = b"".join([chunk async for chunk in response.aiter_raw()])
+    assert gzip.decompress(raw) == JSONResponse(LARGE).body
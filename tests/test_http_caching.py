@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def insert_ad(server, updated_at):
+    ad = {
+        "ad_id": "ad_cache",
+        "title": "Cached ad",
+        "location": "all",
+        "priority": 0,
+        "status": "active",
+        "created_by": "user_admin",
+        "created_at": updated_at,
+        "updated_at": updated_at,
+    }
+    await server.db.advertisements.insert_one(dict(ad))
+    return ad
+
+
+async def test_etag_match_returns_304(server, client):
+    await insert_ad(server, datetime(2024, 1, 1, tzinfo=timezone.utc))
+
+    first = await client.get("/api/ads/ad_cache")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+
+    second = await client.get("/api/ads/ad_cache", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+
+
+async def test_etag_changes_when_document_is_updated(server, client):
+    await insert_ad(server, datetime(2024, 1, 1, tzinfo=timezone.utc))
+    etag = (await client.get("/api/ads/ad_cache")).headers["etag"]
+
+    await server.db.advertisements.update_one(
+        {"ad_id": "ad_cache"},
+        {"$set": {"updated_at": datetime(2024, 1, 2, tzinfo=timezone.utc)}}
+    )
+
+    response = await client.get("/api/ads/ad_cache", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+async def test_if_modified_since(server, client):
+    updated_at = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    await insert_ad(server, updated_at)
+
+    first = await client.get("/api/ads/ad_cache")
+    assert first.headers["last-modified"] == format_datetime(updated_at, usegmt=True)
+
+    current = await client.get("/api/ads/ad_cache", headers={"If-Modified-Since": first.headers["last-modified"]})
+    assert current.status_code == 304
+
+    stale = format_datetime(updated_at - timedelta(hours=1), usegmt=True)
+    response = await client.get("/api/ads/ad_cache", headers={"If-Modified-Since": stale})
+    assert response.status_code == 200
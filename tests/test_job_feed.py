@@ -0,0 +1,94 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+CITIES = ["Baghdad", "Basra", "Erbil", "Mosul"]
+JOB_TYPES = ["full_time", "part_time", "remote"]
+FILTERS = [(None, None), ("baghdad", None), ("BAS", None), (None, "remote"), ("erbil", "part_time")]
+PAGES = [(0, 5), (5, 5), (0, 20), (15, 10), (25, 10)]
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def make_job(i, rng, **fields):
+    created_at = START + timedelta(minutes=i)
+    return {
+        "job_id": f"job_{i:04d}",
+        "employer_id": "user_employer",
+        "employer_name": "Employer",
+        "title": f"Job {i}",
+        "description": "Description",
+        "job_type": rng.choice(JOB_TYPES),
+        "salary_type": ["monthly"],
+        "city": rng.choice(CITIES),
+        "area": "Centre",
+        "status": rng.choice(["active", "active", "active", "closed"]),
+        "created_at": created_at,
+        "updated_at": created_at,
+        **fields,
+    }
+
+
+@pytest.fixture
+async def rng(server, monkeypatch):
+    """Seed 120 jobs; returns the random source for further changes"""
+    # A small snapshot so pages run past its end and buckets are partial
+    monkeypatch.setattr(server, "FEED_SNAPSHOT_SIZE", 20)
+    rng = random.Random(7)
+    docs = [make_job(i, rng) for i in range(120)]
+    await server.db.jobs.insert_many([dict(doc) for doc in docs])
+    return rng
+
+
+async def direct_page(server, city, job_type, skip, limit):
+    query = {"status": "active"}
+    if job_type:
+        query["job_type"] = job_type
+    if city:
+        query["city"] = {"$regex": city, "$options": "i"}
+    return await server.db.jobs.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+
+
+async def assert_pages_match(server):
+    for city, job_type in FILTERS:
+        for skip, limit in PAGES:
+            expected = await direct_page(server, city, job_type, skip, limit)
+            snapshot = await server.job_feed.page(city, job_type, skip, limit)
+            if snapshot is not None:
+                assert snapshot == expected, (city, job_type, skip, limit)
+
+
+async def test_snapshot_pages_match_the_direct_query(server, rng):
+    await assert_pages_match(server)
+    assert server.job_feed.buckets
+    # Pages past the snapshot fall through to the query
+    assert await server.job_feed.page(None, None, 15, 10) is None
+
+
+async def test_snapshots_stay_current_as_jobs_change(server, rng):
+    await assert_pages_match(server)
+
+    for i in range(120, 140):
+        job = make_job(i, rng)
+        await server.db.jobs.insert_one(dict(job))
+        server.job_feed.apply(job)
+
+    active = await server.db.jobs.find({"status": "active"}, {"_id": 0}).to_list(None)
+    for job in rng.sample(active, 15):
+        changed = {**job, "status": "closed"} if rng.random() < 0.5 else {**job, "city": rng.choice(CITIES)}
+        await server.db.jobs.replace_one({"job_id": job["job_id"]}, dict(changed))
+        server.job_feed.apply(changed)
+
+    await assert_pages_match(server)
+
+
+async def test_get_jobs_serves_the_same_page(server, rng, client):
+    for city, job_type in FILTERS:
+        params = {k: v for k, v in {"city": city, "job_type": job_type, "limit": 10}.items() if v}
+        expected = await direct_page(server, city, job_type, 0, 10)
+
+        response = await client.get("/api/jobs", params=params)
+        assert [job["job_id"] for job in response.json()] == [job["job_id"] for job in expected]
@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+NOW = datetime.now(timezone.utc)
+
+
+def days_ago(days):
+    return NOW - timedelta(days=days)
+
+
+def make_job(job_id, employer_id, status="active", created_at=None, updated_at=None):
+    return {
+        "job_id": job_id,
+        "employer_id": employer_id,
+        "employer_name": "Employer",
+        "title": job_id,
+        "description": "Description",
+        "job_type": "full_time",
+        "salary_type": ["monthly"],
+        "city": "Baghdad",
+        "area": "Centre",
+        "status": status,
+        "created_at": created_at or days_ago(400),
+        "updated_at": updated_at or days_ago(1),
+    }
+
+
+def make_application(application_id, job_id, employer_id, seeker_id, created_at):
+    return {
+        "application_id": application_id,
+        "job_id": job_id,
+        "job_title": job_id,
+        "job_seeker_id": seeker_id,
+        "job_seeker_name": "Seeker",
+        "job_seeker_email": "seeker@example.com",
+        "employer_id": employer_id,
+        "cover_letter": None,
+        "status": "pending",
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+async def hiring(server, create_user):
+    """An employer with open, recently closed and long-closed jobs, each with an old application"""
+    employer, employer_token = await create_user("employer")
+    seeker, seeker_token = await create_user("job_seeker")
+    employer_id, seeker_id = employer["user_id"], seeker["user_id"]
+
+    await server.db.jobs.insert_many([
+        make_job("job_open", employer_id),
+        make_job("job_stale", employer_id, updated_at=days_ago(90)),
+        make_job("job_closed", employer_id, status="closed", updated_at=days_ago(10)),
+        make_job("job_old", employer_id, status="filled", updated_at=days_ago(60)),
+    ])
+    await server.db.applications.insert_many([
+        make_application("app_open", "job_open", employer_id, seeker_id, days_ago(200)),
+        make_application("app_closed", "job_closed", employer_id, seeker_id, days_ago(200)),
+        make_application("app_old", "job_old", employer_id, seeker_id, days_ago(200)),
+        make_application("app_recent", "job_old", employer_id, "user_other", days_ago(20)),
+    ])
+    return {"employer": employer_token, "seeker": seeker_token}
+
+
+async def live_ids(server, collection, field):
+    return sorted(await server.db[collection].distinct(field))
+
+
+async def test_lifecycle_expires_and_archives(server, hiring):
+    await server.run_lifecycle()
+
+    expired = await server.db.jobs.find_one({"job_id": "job_stale"})
+    assert expired["status"] == "expired"
+    assert await live_ids(server, "jobs", "job_id") == ["job_closed", "job_open", "job_stale"]
+    assert await live_ids(server, "jobs_archive", "job_id") == ["job_old"]
+
+    # Age alone is not enough: applications stay live while their job is open
+    assert await live_ids(server, "applications", "application_id") == ["app_open", "app_recent"]
+    assert await live_ids(server, "applications_archive", "application_id") == ["app_closed", "app_old"]
+
+
+async def test_archived_records_are_still_readable(server, hiring, client):
+    await server.run_lifecycle()
+
+    job = await client.get("/api/jobs/job_old")
+    assert job.status_code == 200 and job.json()["status"] == "filled"
+
+    mine = await client.get("/api/applications/my/submitted", headers=bearer(hiring["seeker"]))
+    assert sorted(app["application_id"] for app in mine.json()) == ["app_closed", "app_old", "app_open"]
+
+    listed = await client.get("/api/applications/job/job_old", headers=bearer(hiring["employer"]))
+    assert [app["application_id"] for app in listed.json()] == ["app_recent", "app_old"]
+
+
+async def test_archived_application_blocks_reapplying(server, hiring, client):
+    await server.run_lifecycle()
+    await server.db.jobs.update_one({"job_id": "job_closed"}, {"$set": {"status": "active"}})
+
+    response = await client.post(
+        "/api/applications", json={"job_id": "job_closed"}, headers=bearer(hiring["seeker"])
+    )
+    assert response.status_code == 400
+    assert await server.db.applications.count_documents({"job_id": "job_closed"}) == 0
+
+
+async def test_status_update_restores_an_archived_application(server, hiring, client):
+    await server.run_lifecycle()
+
+    response = await client.put(
+        "/api/applications/app_old/status", json={"status": "accepted"}, headers=bearer(hiring["employer"])
+    )
+    assert response.status_code == 200
+
+    app = await server.db.applications.find_one({"application_id": "app_old"})
+    assert app["status"] == "accepted" and "archived_at" not in app
+    assert await server.db.applications_archive.find_one({"application_id": "app_old"}) is None
+
+
+def make_message(message_id, sender_id, receiver_id, created_at, read=True):
+    return {
+        "message_id": message_id,
+        "sender_id": sender_id,
+        "receiver_id": receiver_id,
+        "sender_name": "Sender",
+        "content": message_id,
+        "read": read,
+        "created_at": created_at,
+    }
+
+
+async def test_old_messages_are_archived_but_stay_in_the_inbox(server, create_user, client, monkeypatch):
+    employer, token = await create_user("employer")
+    unread_from, _ = await create_user()
+    bucketed_with, _ = await create_user()
+    archived_with, _ = await create_user()
+    me = employer["user_id"]
+
+    await server.db.messages.insert_many([
+        make_message("msg_unread", unread_from["user_id"], me, days_ago(400), read=False),
+        make_message("msg_bucketed", bucketed_with["user_id"], me, days_ago(400)),
+    ])
+    # Compacted into a bucket (and then archived) in the first run
+    await server.run_lifecycle()
+
+    # With compaction off, old read messages are archived individually
+    monkeypatch.setattr(server, "MESSAGE_COMPACT_AFTER_DAYS", 0)
+    await server.db.messages.insert_one(make_message("msg_archived", me, archived_with["user_id"], days_ago(400)))
+    await server.run_lifecycle()
+
+    assert await live_ids(server, "messages", "message_id") == ["msg_unread"]
+    assert await live_ids(server, "messages_archive", "message_id") == ["msg_archived"]
+    assert await server.db.message_buckets.count_documents({}) == 0
+    assert await server.db.message_buckets_archive.count_documents({}) == 1
+
+    inbox = await client.get("/api/messages/conversations", headers=bearer(token))
+    conversations = {conv["user_id"]: conv for conv in inbox.json()}
+    assert conversations[unread_from["user_id"]]["unread_count"] == 1
+    assert conversations[bucketed_with["user_id"]]["last_message"] == "msg_bucketed"
+    assert conversations[archived_with["user_id"]]["last_message"] == "msg_archived"
+
+    dashboard = await client.get("/api/employer/dashboard", headers=bearer(token))
+    assert dashboard.json()["unread_messages"] == 1
+
+    for partner, message_id in ((bucketed_with, "msg_bucketed"), (archived_with, "msg_archived")):
+        history = await server.conversation_history(me, partner["user_id"])
+        assert [msg["message_id"] for msg in history] == [message_id]
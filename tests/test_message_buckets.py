@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def small_buckets(server, monkeypatch):
+    # Tiny buckets and batches so compaction tops up buckets and runs several batches
+    monkeypatch.setattr(server, "MESSAGE_BUCKET_SIZE", 4)
+    monkeypatch.setattr(server, "ARCHIVE_BATCH_SIZE", 5)
+
+
+async def insert_conversation(server, count, start, read=True):
+    messages = [
+        {
+            "message_id": f"msg_{start.timestamp():.0f}_{i:03d}",
+            "sender_id": "user_a" if i % 3 else "user_b",
+            "receiver_id": "user_b" if i % 3 else "user_a",
+            "sender_name": "Sender",
+            "content": f"Message {i}",
+            "read": read,
+            "created_at": start + timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+    await server.db.messages.insert_many([dict(msg) for msg in messages])
+    return messages
+
+
+async def test_history_is_unchanged_by_compaction(server, small_buckets):
+    now = datetime.now(timezone.utc)
+    await insert_conversation(server, 23, now - timedelta(days=30))
+    await insert_conversation(server, 3, now - timedelta(days=20), read=False)
+    await insert_conversation(server, 6, now - timedelta(hours=1))
+    # Another conversation that must stay out of this one's history
+    await server.db.messages.insert_one({
+        "message_id": "msg_other", "sender_id": "user_a", "receiver_id": "user_c",
+        "content": "Elsewhere", "read": True, "created_at": now - timedelta(days=30),
+    })
+
+    before = {limit: await server.conversation_history("user_a", "user_b", limit) for limit in (500, 10, 1)}
+
+    assert await server.compact_messages() == 24
+    assert await server.db.messages.count_documents({}) == 9
+    buckets = await server.db.message_buckets.find({"conversation": "user_a:user_b"}).to_list(None)
+    assert sorted(bucket["count"] for bucket in buckets) == [3, 4, 4, 4, 4, 4]
+
+    for limit, expected in before.items():
+        assert await server.conversation_history("user_b", "user_a", limit) == expected
+
+
+async def test_compaction_tops_up_the_newest_bucket(server, small_buckets):
+    now = datetime.now(timezone.utc)
+    first = await insert_conversation(server, 2, now - timedelta(days=30))
+    await server.compact_messages()
+
+    second = await insert_conversation(server, 3, now - timedelta(days=20))
+    await server.compact_messages()
+
+    buckets = await server.db.message_buckets.find({}, {"_id": 0}).sort("start", 1).to_list(None)
+    assert [bucket["count"] for bucket in buckets] == [4, 1]
+    stored = [msg["message_id"] for bucket in buckets for msg in bucket["messages"]]
+    assert stored == [msg["message_id"] for msg in first + second]
+
+
+async def test_rerun_after_interrupted_batch_does_not_duplicate(server, small_buckets):
+    now = datetime.now(timezone.utc)
+    messages = await insert_conversation(server, 3, now - timedelta(days=30))
+    # A batch that reached the buckets but not its delete
+    await server.append_to_buckets("user_a:user_b", messages)
+
+    await server.compact_messages()
+
+    history = await server.conversation_history("user_a", "user_b")
+    assert [msg["message_id"] for msg in history] == [msg["message_id"] for msg in messages]
@@ -0,0 +1,28 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def feed_order(client):
+    response = await client.get("/api/posts/public")
+    return [post["user_id"] for post in response.json()]
+
+
+async def test_republishing_moves_the_post_to_the_top_at_once(server, create_user, client):
+    first, first_token = await create_user()
+    second, second_token = await create_user()
+    await client.post("/api/posts/publish", headers=bearer(first_token))
+    await client.post("/api/posts/publish", headers=bearer(second_token))
+
+    # Cached by the first read
+    assert await feed_order(client) == [second["user_id"], first["user_id"]]
+
+    response = await client.post("/api/posts/publish", headers=bearer(first_token))
+    assert response.json()["message"] == "Post updated"
+
+    assert await feed_order(client) == [first["user_id"], second["user_id"]]
+    assert await server.db.public_posts.count_documents({}) == 2
@@ -0,0 +1,43 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def search_limit(server, monkeypatch):
+    """Two searches per client, refilled at one token every 10 seconds"""
+    monkeypatch.setattr(server, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setitem(server.RATE_LIMITS, "search", (2, 0.1))
+
+
+async def test_bucket_exhaustion_returns_429_with_retry_after(search_limit, client):
+    for _ in range(2):
+        assert (await client.get("/api/jobs", params={"search": "driver"})).status_code == 200
+
+    response = await client.get("/api/jobs", params={"search": "driver"})
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["retry-after"]) <= 10
+
+
+async def test_requests_without_the_query_param_are_not_limited(search_limit, client):
+    for _ in range(5):
+        assert (await client.get("/api/jobs")).status_code == 200
+
+
+async def test_clients_have_separate_buckets(search_limit, client):
+    for _ in range(3):
+        await client.get("/api/jobs", params={"search": "a"}, headers={"X-Forwarded-For": "10.0.0.1"})
+
+    response = await client.get("/api/jobs", params={"search": "a"}, headers={"X-Forwarded-For": "10.0.0.2"})
+    assert response.status_code == 200
+
+
+async def test_spoofed_forwarded_for_does_not_reset_the_bucket(search_limit, client):
+    # The ingress appends the real peer; anything to its left comes from the client
+    for _ in range(2):
+        await client.get("/api/jobs", params={"search": "a"}, headers={"X-Forwarded-For": "10.0.0.1"})
+
+    response = await client.get(
+        "/api/jobs", params={"search": "a"}, headers={"X-Forwarded-For": "1.2.3.4, 10.0.0.1"}
+    )
+    assert response.status_code == 429
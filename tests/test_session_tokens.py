@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, timezone
+from http.cookies import SimpleCookie
+
+import jwt
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+SECRET = "test-secret"
+
+
+@pytest.fixture
+def jwt_mode(server, monkeypatch):
+    monkeypatch.setattr(server, "SESSION_TOKEN_MODE", "jwt")
+    monkeypatch.setattr(server, "JWT_SECRET", SECRET)
+
+
+@pytest.fixture
+def signed_token(server, jwt_mode, create_user, monkeypatch):
+    """Create a user and session, and sign a token for it (expired `expired_for` ago if given)"""
+    async def sign(expired_for=None):
+        user, session_token = await create_user()
+        if expired_for:
+            monkeypatch.setattr(server, "JWT_TTL", -expired_for)
+        token = server.issue_signed_token(server.User(**user), session_token)
+        monkeypatch.setattr(server, "JWT_TTL", timedelta(minutes=15))
+        return user, session_token, token
+    return sign
+
+
+def cookie_token(response):
+    cookie = SimpleCookie(response.headers.get("set-cookie", ""))
+    return cookie["session_token"].value if "session_token" in cookie else None
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def test_valid_token_is_verified_without_the_session(server, signed_token, client):
+    user, session_token, token = await signed_token()
+    await server.db.user_sessions.delete_one({"session_token": session_token})
+
+    response = await client.get("/api/auth/me", headers=bearer(token))
+    assert response.status_code == 200
+    assert response.json()["user_id"] == user["user_id"]
+    assert cookie_token(response) is None
+
+
+async def test_expired_token_is_renewed_from_its_session(server, signed_token, client):
+    user, session_token, token = await signed_token(expired_for=timedelta(minutes=1))
+
+    response = await client.get("/api/auth/me", headers=bearer(token))
+    assert response.status_code == 200
+    assert response.json()["user_id"] == user["user_id"]
+
+    renewed = cookie_token(response)
+    assert renewed and renewed != token
+    claims = jwt.decode(renewed, SECRET, algorithms=[server.JWT_ALGORITHM])
+    assert claims["sub"] == user["user_id"] and claims["sid"] == server.session_id(session_token)
+    assert claims["exp"] > datetime.now(timezone.utc).timestamp()
+
+
+async def test_token_does_not_carry_the_session_token(signed_token):
+    _, session_token, token = await signed_token()
+
+    claims = jwt.decode(token, options={"verify_signature": False})
+    assert session_token not in token and session_token not in claims.values()
+
+
+async def test_token_expired_past_the_renew_window_is_rejected(server, signed_token, client):
+    _, _, token = await signed_token(expired_for=server.JWT_RENEW_WINDOW + timedelta(minutes=1))
+
+    response = await client.get("/api/auth/me", headers=bearer(token))
+    assert response.status_code == 401
+    assert cookie_token(response) is None
+
+
+async def test_expired_token_without_session_is_rejected(server, signed_token, client):
+    _, session_token, token = await signed_token(expired_for=timedelta(minutes=1))
+    await server.db.user_sessions.delete_one({"session_token": session_token})
+
+    response = await client.get("/api/auth/me", headers=bearer(token))
+    assert response.status_code == 401
+
+
+async def test_tampered_token_is_rejected(signed_token, client):
+    _, _, token = await signed_token()
+    forged = jwt.encode(
+        {**jwt.decode(token, options={"verify_signature": False}), "user_type": "admin"},
+        "wrong-secret", algorithm="HS256"
+    )
+
+    response = await client.get("/api/auth/me", headers=bearer(forged))
+    assert response.status_code == 401
+
+
+async def test_logout_revokes_the_token_and_its_session(server, signed_token, client):
+    _, session_token, token = await signed_token()
+
+    response = await client.post("/api/auth/logout", headers={"Cookie": f"session_token={token}"})
+    assert response.status_code == 200
+
+    claims = jwt.decode(token, SECRET, algorithms=[server.JWT_ALGORITHM])
+    assert claims["jti"] in server.revocation_list
+    assert await server.db.revoked_tokens.find_one({"jti": claims["jti"]}) is not None
+    assert await server.db.user_sessions.find_one({"session_token": session_token}) is None
+
+    assert (await client.get("/api/auth/me", headers=bearer(token))).status_code == 401
+
+
+async def test_revoked_token_is_not_renewed(server, signed_token, client):
+    _, session_token, token = await signed_token(expired_for=timedelta(minutes=1))
+    claims = jwt.decode(token, SECRET, algorithms=[server.JWT_ALGORITHM], options={"verify_exp": False})
+    await server.revocation_list.revoke(claims["jti"], datetime.fromtimestamp(claims["exp"], timezone.utc))
+
+    response = await client.get("/api/auth/me", headers=bearer(token))
+    assert response.status_code == 401
+    assert cookie_token(response) is None
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_callers_share_one_load(server):
+    flight = server.SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"job_id": "job_1"}
+
+    waiters = [asyncio.ensure_future(flight.do("job", "job_1", loader)) for _ in range(10)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert flight.inflight == {}
+
+
+async def test_different_keys_load_separately(server):
+    flight = server.SingleFlight()
+    loaded = []
+
+    async def loader(key):
+        loaded.append(key)
+        await asyncio.sleep(0)
+        return key
+
+    results = await asyncio.gather(
+        flight.do("job", "a", lambda: loader("a")),
+        flight.do("job", "b", lambda: loader("b")),
+        flight.do("user", "a", lambda: loader("user:a")),
+    )
+
+    assert results == ["a", "b", "user:a"]
+    assert sorted(loaded) == ["a", "b", "user:a"]
+
+
+async def test_sequential_calls_load_again(server):
+    flight = server.SingleFlight()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await flight.do("job", "a", loader) == 1
+    assert await flight.do("job", "a", loader) == 2
+
+
+async def test_errors_reach_every_waiter(server):
+    flight = server.SingleFlight()
+
+    async def loader():
+        await asyncio.sleep(0)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        *[flight.do("job", "a", loader) for _ in range(3)],
+        return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.inflight == {}
+
+
+async def test_cancelled_caller_does_not_cancel_the_load(server):
+    flight = server.SingleFlight()
+    release = asyncio.Event()
+
+    async def loader():
+        await release.wait()
+        return "done"
+
+    first = asyncio.ensure_future(flight.do("job", "a", loader))
+    second = asyncio.ensure_future(flight.do("job", "a", loader))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == "done"
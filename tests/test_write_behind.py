@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+class SlowCollection:
+    def __init__(self, collection, started: asyncio.Event):
+        self.collection = collection
+        self.started = started
+
+    async def bulk_write(self, operations, **options):
+        self.started.set()
+        await asyncio.sleep(0.05)
+        return await self.collection.bulk_write(operations, **options)
+
+
+class SlowDatabase:
+    """Database whose bulk writes take a while, to catch shutdown in the middle of one"""
+
+    def __init__(self, db):
+        self.db = db
+        self.started = asyncio.Event()
+
+    def __getitem__(self, name):
+        return SlowCollection(self.db[name], self.started)
+
+
+def enqueue_update(queue, user_id, **fields):
+    queue.enqueue("users", user_id, {"user_id": user_id}, fields)
+
+
+async def test_writes_for_one_key_are_coalesced(server):
+    await server.db.users.insert_one({"user_id": "u1", "name": "Old", "city": "Baghdad"})
+    queue = server.WriteBehindQueue(interval=60)
+
+    enqueue_update(queue, "u1", name="First")
+    enqueue_update(queue, "u1", name="Second", last_seen="now")
+    assert queue.size == 1
+
+    await queue.flush()
+
+    user = await server.db.users.find_one({"user_id": "u1"}, {"_id": 0})
+    assert user == {"user_id": "u1", "name": "Second", "city": "Baghdad", "last_seen": "now"}
+    assert queue.size == 0 and queue.pending == {}
+
+
+async def test_max_pending_wakes_the_flusher(server):
+    queue = server.WriteBehindQueue(interval=60, max_pending=2)
+
+    enqueue_update(queue, "u1", name="a")
+    assert not queue.wakeup.is_set()
+    enqueue_update(queue, "u2", name="b")
+    assert queue.wakeup.is_set()
+
+
+async def test_stop_flushes_pending_writes(server):
+    await server.db.users.insert_many([{"user_id": "u1"}, {"user_id": "u2"}])
+    queue = server.WriteBehindQueue(interval=60)
+    queue.start()
+
+    enqueue_update(queue, "u1", name="One")
+    enqueue_update(queue, "u2", name="Two")
+    await queue.stop()
+
+    names = {doc["user_id"]: doc["name"] async for doc in server.db.users.find({}, {"_id": 0})}
+    assert names == {"u1": "One", "u2": "Two"}
+
+
+async def test_stop_during_a_flush_keeps_the_batch(server, monkeypatch):
+    await server.db.users.insert_many([{"user_id": "u1"}, {"user_id": "u2"}])
+    slow = SlowDatabase(server.db)
+    monkeypatch.setattr(server, "db", slow)
+    queue = server.WriteBehindQueue(interval=60, max_pending=1)
+    queue.start()
+
+    enqueue_update(queue, "u1", name="In flight")
+    await slow.started.wait()
+    enqueue_update(queue, "u2", name="Queued")
+    await queue.stop()
+
+    names = {doc["user_id"]: doc["name"] async for doc in slow.db.users.find({}, {"_id": 0})}
+    assert names == {"u1": "In flight", "u2": "Queued"}
+
+
+async def test_cancelled_flush_requeues_its_batch(server, monkeypatch):
+    slow = SlowDatabase(server.db)
+    monkeypatch.setattr(server, "db", slow)
+    queue = server.WriteBehindQueue(interval=60)
+
+    enqueue_update(queue, "u1", name="Old")
+    flush = asyncio.ensure_future(queue.flush())
+    await slow.started.wait()
+    enqueue_update(queue, "u1", name="Newer")
+    flush.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await flush
+
+    # The newer write for the key wins over the requeued one
+    assert queue.size == 1
+    assert queue.pending["users"]["u1"]["set"] == {"name": "Newer"}